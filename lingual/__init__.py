@@ -38,10 +38,26 @@ class Config:
         ASYNC_EMAIL_ERROR_WAIT_SECONDS  =      1.5 # Seconds to wait for async email errors before giving up and proceeding
 
     WANIKANI_API_KEY                =      os.getenv('WANIKANI_API_KEY', None)  # API key for WaniKani integration
+    KANJI_OFFLINE                   =      os.getenv('KANJI_OFFLINE', 'false').lower() in ['true', '1', 'yes'] # Serve kanji only from the snapshot below, never calling WaniKani
+    KANJI_SNAPSHOT_PATH             =      os.getenv('KANJI_SNAPSHOT_PATH', os.path.join(os.path.abspath(os.path.dirname(__file__)), 'modules', 'nihongo', 'data', 'kanji.snapshot.json')) # Kanji data snapshot, written with `flask kanji export`
+    KANJI_BATCH_MAX                 =      int(os.getenv('KANJI_BATCH_MAX', '100')) # Most kanji one batch request may ask for, larger batches are refused (413)
 
     SQLALCHEMY_DATABASE_URI         =      os.getenv('SQLALCHEMY_DATABASE_URI', f"sqlite:///{os.path.join(os.path.abspath(os.path.dirname(__file__)), 'core', 'data', 'lingual.db')}")
     SQLALCHEMY_TRACK_MODIFICATIONS  =      False
 
+    LESSON_CACHE_SIZE               =      int(os.getenv('LESSON_CACHE_SIZE', '64')) # Rendered lessons kept in memory per processor
+    LESSON_CACHE_POLICY             =      os.getenv('LESSON_CACHE_POLICY', 'lru') # Eviction policy: lru, lfu or fifo
+    LESSON_INDEX_DIR                =      os.getenv('LESSON_INDEX_DIR', os.path.join(os.path.abspath(os.path.dirname(__file__)), 'core', 'data')) # Where lesson metadata indexes are saved
+    LESSON_INDEX_CHECK_SECONDS      =      float(os.getenv('LESSON_INDEX_CHECK_SECONDS', '2')) # Minimum seconds between checks for added, removed or edited lesson files
+    QUIZ_CACHE_SIZE                 =      int(os.getenv('QUIZ_CACHE_SIZE', '128')) # Transformed quiz banks kept in memory per processor
+    QUIZ_CACHE_CHECK_SECONDS        =      float(os.getenv('QUIZ_CACHE_CHECK_SECONDS', '2')) # Minimum seconds between checks for edited quiz files
+    LESSON_PROFILING                =      os.getenv('LESSON_PROFILING', 'false').lower() in ['true', '1', 'yes'] # Record lesson pipeline timings (see `flask lessons profile`, and /debug/lesson-profile in debug mode)
+    LESSON_BUNDLE_PATH              =      os.getenv('LESSON_BUNDLE_PATH', os.path.join(os.path.abspath(os.path.dirname(__file__)), 'core', 'data', 'lessons.bundle.json')) # Pre-rendered lessons, built with `flask lessons build`
+    QUIZ_SESSION_BACKEND            =      os.getenv('QUIZ_SESSION_BACKEND', 'memory') # Where active quizzes are kept: memory (single worker) or sqlite (shared by workers)
+    QUIZ_SESSION_DB_PATH            =      os.getenv('QUIZ_SESSION_DB_PATH', os.path.join(os.path.abspath(os.path.dirname(__file__)), 'core', 'data', 'quiz_sessions.db')) # SQLite file for the sqlite backend
+    QUIZ_SESSION_TTL_SECONDS        =      float(os.getenv('QUIZ_SESSION_TTL_SECONDS', str(3 * 60 * 60))) # Seconds an active quiz is kept after it was generated
+    QUIZ_SESSION_MAX                =      int(os.getenv('QUIZ_SESSION_MAX', '10000')) # Maximum active quizzes kept, least recently used are dropped first. 0 for unbounded
+
     PUBLIC_BASE_URL                 =      os.getenv('PUBLIC_BASE_URL', 'http://127.0.0.1:5000').rstrip('/')
     SERVER_NAME                     =      None # Keep unset to prevent CORS issues
     PREFERRED_URL_SCHEME            =      'https' if PUBLIC_BASE_URL.startswith('https://') else 'http'
@@ -81,4 +97,24 @@ def create_app():
     from lingual.utils.filters import init_app as init_filters
     init_filters(app)
 
+    # Register custom CLI commands (flask lessons ...)
+    from lingual.utils.commands import init_app as init_commands
+    init_commands(app)
+
+    # Enable lesson pipeline timings if configured
+    from lingual.utils.lesson_profiler import init_app as init_lesson_profiler
+    init_lesson_profiler(app)
+
+    # Serve lessons from the pre-rendered bundle, if one has been built
+    from lingual.utils.lesson_bundle import init_app as init_lesson_bundle
+    init_lesson_bundle(app)
+
+    # Store active quizzes in the configured backend
+    from lingual.utils.quiz_sessions import init_app as init_quiz_sessions
+    init_quiz_sessions(app)
+
+    # Serve kanji from the bundled snapshot in offline mode
+    from lingual.modules.nihongo.utils.kanji_snapshot import init_app as init_kanji_snapshot
+    init_kanji_snapshot(app)
+
     return app
@@ -1,6 +1,6 @@
 import traceback
 from werkzeug.exceptions import HTTPException
-from flask import jsonify, redirect, render_template, request, session, current_app, flash, url_for
+from flask import abort, jsonify, redirect, render_template, request, session, current_app, flash, url_for
 from flask.blueprints import Blueprint
 from flask_login import current_user, login_required
 from lingual import db
@@ -26,6 +26,15 @@ main_bp = Blueprint(
 def landing():
     return render_template('landing.html', get_translatable=get_translatable)
 
+@main_bp.route('/debug/lesson-profile')
+@login_required
+def lesson_profile():
+    # Lesson pipeline timings, only available in debug mode with LESSON_PROFILING enabled (they reveal lesson sources and server load)
+    from lingual.utils.lesson_profiler import PROFILER
+    if not PROFILER.enabled or not current_app.debug:
+        abort(404)
+    return jsonify({"profile": PROFILER.report(request.args.get('prefix', '', type=str))})
+
 @main_bp.route('/welcome')
 @login_required
 def welcome():
@@ -1,13 +1,19 @@
+import gzip
 import os
+import queue
 import re
-from flask import Blueprint, abort, current_app, flash, jsonify, redirect, render_template, request, session, url_for
+import threading
+from flask import Blueprint, Response, abort, copy_current_request_context, current_app, flash, jsonify, make_response, redirect, render_template, request, session, stream_with_context, url_for
 from flask_login import current_user, login_required
 from lingual import db, GIT_REPO_URL
-from lingual.modules.nihongo.utils.kanji_processor import Kanji
+from lingual.modules.nihongo.utils import kanji_projection
+from lingual.modules.nihongo.utils.kanji_processor import Kanji, validate_kanji
+from lingual.modules.nihongo.utils.wanikani_client import WaniKaniUnavailable
 from lingual.modules.nihongo.utils import quiz_utils
 from lingual.modules.nihongo.utils.grammar_lesson_processor import get_processor
 from lingual.modules.nihongo.utils.particle_tiles_processor import ParticleTilesProcessor
 from lingual.utils.form_manager import flash_all_form_errors
+from lingual.utils import http_cache, quiz_sessions
 from lingual.utils.languages import Languages
 from lingual.utils.tiles_utils import TileSection
 
@@ -24,8 +30,8 @@ nihongo_bp = Blueprint(
 # Regular expression to validate lesson slugs, allowing only alphanumeric characters and hyphens to prevent directory traversal and ensure valid slugs.
 VALID_SLUG = re.compile(r'^[a-zA-Z0-9\-]+$')
 
-# T-FE03 --> Server-side quiz cache: {quiz_id: {type, title, data}}
-_quiz_cache = {}
+GZIP_MIN_BYTES = 1024 # Smaller kanji API responses aren't worth compressing
+NDJSON_MIMETYPE = 'application/x-ndjson' # Streamed kanji batches, one JSON object per line
 
 _particles_processor = ParticleTilesProcessor()
 
@@ -153,6 +159,15 @@ def home():
 def grammar(slug=None):
     # Validate slug to prevent directory traversal attacks
     if slug and VALID_SLUG.match(slug):
+        # The page is built from the lesson source and the user's language (header), so the ETag covers both.
+        # Pending flash messages are rendered into the page, so those responses are never cached.
+        etag = None
+        digest = get_processor().source_digest("lessons", slug) # From the bundle when attached, no file I/O
+        if digest and "_flashes" not in session:
+            etag = http_cache.make_etag(http_cache.release_id(), digest, current_user.get_id(), getattr(current_user, "last_language", None))
+            cached = http_cache.not_modified(etag)
+            if cached: return cached # Browser already has this version of the page
+
         try:
             # Attempt to load the lesson data using the processor, applying transformations
             lesson_data = get_processor().load(slug)
@@ -169,17 +184,27 @@ def grammar(slug=None):
         from lingual.modules.nihongo import GIT_GRAMMAR_DIRECTORY
         lesson_data['source_url'] = f"{GIT_GRAMMAR_DIRECTORY}/lessons/{slug}.md"
 
-        return render_template(
+        response = make_response(render_template(
             # Render lesson page
             'nihongo-lesson.html',
             lesson=lesson_data,
             data_root=lesson_data.get("data_root")
-        )
+        ))
+        if etag: http_cache.apply_cache_headers(response, etag)
+        return response
 
     lessons = get_processor().get_lessons() # Get all grammar lessons and categories
     return render_template('nihongo-grammar.html', lessons=lessons) # Render the grammar directory with the list of lessons and categories
 
 
+@nihongo_bp.route('/grammar/api/search', methods=['GET'])
+@login_required
+def grammar_search():
+    # Ranked search over the grammar lessons, used by the lesson directory search box
+    query = request.args.get('q', '', type=str)[:100] # Cap query length
+    limit = max(1, min(request.args.get('limit', 50, type=int), 100)) # Clamp number of results
+    return jsonify({"query": query, "results": get_processor().search(query, limit=limit)})
+
 @nihongo_bp.route('/grammar/api/quiz/<lesson_slug>', methods=['GET'])
 def get_quizzes(lesson_slug):
     # Validate slug to prevent directory traversal attacks
@@ -193,6 +218,13 @@ def get_quizzes(lesson_slug):
     if not os.path.realpath(path).startswith(os.path.realpath(base_dir)):
         abort(400, description="Invalid path.")
 
+    # Quiz data only depends on the quiz file (and the transforms, covered by the release id)
+    digest = get_processor().source_digest("quizzes", lesson_slug)
+    etag = http_cache.make_etag(http_cache.release_id(), digest) if digest else None
+    if etag:
+        cached = http_cache.not_modified(etag, private=False)
+        if cached: return cached
+
     try:
         data = quiz_utils.load_quiz_data(lesson_slug) # Load quiz data for the specified lesson slug, applying any necessary transformations using the lesson processor
     except Exception:
@@ -201,7 +233,9 @@ def get_quizzes(lesson_slug):
     if not data:
         return jsonify({"error": "Quiz not found."}), 404
 
-    return jsonify(data) # Return the quiz data as JSON
+    response = jsonify(data) # Return the quiz data as JSON
+    if etag: http_cache.apply_cache_headers(response, etag, private=False)
+    return response
 
 @nihongo_bp.route('/grammar/api/quiz-complete', methods=['POST'])
 @login_required
@@ -229,16 +263,52 @@ def kanji():
 
     return render_template('nihongo-kanji.html', tile_section=section.to_dict())
 
+@nihongo_bp.route('/kanji/api/prescribed', methods=['GET'])
+@login_required
+def kanji_prescribed():
+    """Returns the details of every prescribed kanji in one pre-encoded (and, if accepted, gzipped) response."""
+    from lingual.modules.nihongo.utils.kanji_bundle import get_prescribed_bundle
+    bundle = get_prescribed_bundle()
+
+    use_gzip = 'gzip' in request.accept_encodings
+    etag = f"{bundle.etag}.gz" if use_gzip else bundle.etag # Each encoding gets its own strong ETag
+    cached = http_cache.not_modified(etag, max_age=http_cache.KANJI_MAX_AGE)
+    if cached: return cached
+
+    response = make_response(bundle.gzipped if use_gzip else bundle.body)
+    response.mimetype = 'application/json'
+    if use_gzip: response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return http_cache.apply_cache_headers(response, etag, max_age=http_cache.KANJI_MAX_AGE)
+
+@nihongo_bp.route('/kanji/api/search', methods=['GET'])
+@login_required
+def kanji_search():
+    # Ranked search over the prescribed kanji by English meaning, kana reading or romaji
+    from lingual.modules.nihongo.utils.kanji_search import get_search
+    query = request.args.get('q', '', type=str)[:50] # Cap query length
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100)) # Clamp number of results
+    return jsonify({"query": query, "results": get_search().search(query, limit=limit)})
+
 @nihongo_bp.route('/kanji/api/<kanji_char>', methods=['GET'])
 @login_required
 def kanji_lookup(kanji_char):
-    """Retrieves kanji data for a specific kanji character.
+    """Retrieves kanji data for a specific kanji character, with its related kanji.
     If not cached, performs a synchronous fetch from the WaniKani API.
+    Only the fields the kanji page uses are returned, unless more are requested with `?fields=` (see kanji_projection).
     """
+    from lingual.modules.nihongo.utils.kanji_graph import get_graph
 
     if not kanji_char or kanji_char.isspace():
         # Abort if char missing or just whitespace
         abort(400, description="Invalid kanji.")
+    fields = _requested_kanji_fields()
+    use_gzip = _accepts_gzip()
+
+    # Kanji records are effectively immutable, so the ETag is the hash of the cached record
+    # (plus the graph version, as related kanji change when other kanji are cached)
+    cached = _kanji_not_modified([kanji_char], fields, get_graph().version, use_gzip)
+    if cached: return cached
 
     try:
         # Try getting kanji data, which will fetch from WaniKani if not cached
@@ -246,36 +316,171 @@ def kanji_lookup(kanji_char):
     except KeyError:
         current_app.logger.error("WaniKani API key not configured.")
         abort(503, description="WaniKani API key not configured.")
+    except WaniKaniUnavailable as e:
+        # WaniKani is down or busy: fail fast instead of holding the worker (cached kanji are still served)
+        current_app.logger.warning(f"Kanji lookup for {kanji_char} rejected: {str(e)}")
+        abort(503, description=str(e))
     except Exception as e:
         # Log any unexpected errors that occur during kanji lookup and abort with a generic error message
         current_app.logger.error(f"Failed to fetch kanji data for {kanji_char}: {str(e)}")
         abort(400, description=f"Failed to fetch kanji data: {str(e)}")
 
-    return jsonify({"status": "ready", "data": kanji.data}) # Return the kanji data as JSON
+    graph = get_graph() # Rebuilt if the lookup cached a new kanji
+    response = _kanji_json({"status": "ready", "data": kanji_projection.project(kanji, fields), "related": graph.related(kanji.kanji_char)}, use_gzip)
+    return _with_kanji_cache_headers(response, [kanji_char], fields, graph.version, use_gzip)
 
-@nihongo_bp.route('/kanji/api/batch', methods=['POST'])
+def _requested_kanji_fields() -> tuple[str, ...] | None:
+    """ Fields of kanji records to return, from the `fields` query parameter. None returns whole records. """
+    try:
+        return kanji_projection.parse_fields(request.args.get('fields', '', type=str))
+    except ValueError as e:
+        abort(400, description=str(e))
+
+def _accepts_gzip() -> bool:
+    return 'gzip' in request.accept_encodings
+
+def _kanji_json(payload: dict, use_gzip: bool = False):
+    """
+    Compactly encoded JSON response (see `kanji_projection.encode`), gzipped if the client accepts it and it's worth it.
+    The ETag of a response must include `use_gzip`, as each encoding needs its own strong ETag.
+    """
+    body = kanji_projection.encode(payload)
+    use_gzip = use_gzip and len(body) >= GZIP_MIN_BYTES
+    response = make_response(gzip.compress(body, compresslevel=6) if use_gzip else body)
+    response.mimetype = 'application/json'
+    if use_gzip: response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+def _kanji_etag(kanji_chars: list[str], fields: tuple[str, ...] | None, *extra) -> str | None:
+    """
+    ETag for a response built from the given fields of the cached records of the given kanji, or None if any record isn't cached.
+    `extra` values are mixed in for responses that also depend on other data. The release id and payload format are always
+    mixed in, as responses may be reused for a day and a deploy can change how records are rendered.
+    """
+    cached = Kanji.cache_digests(kanji_chars) # Stored content hashes, one query for the whole list
+    digests = []
+    for kanji_char in kanji_chars:
+        digest = cached.get(kanji_char)
+        if digest is None:
+            try:
+                validate_kanji(kanji_char)
+            except ValueError:
+                digest = "invalid" # Invalid characters are skipped in responses, so they don't affect the content
+            else:
+                return None
+        digests.append(f"{kanji_char}:{digest}")
+    return http_cache.make_etag(http_cache.release_id(), kanji_projection.payload_version(fields), *digests, *extra)
+
+def _kanji_not_modified(kanji_chars: list[str], fields: tuple[str, ...] | None, *extra):
+    """ Returns a 304 response if the client already has these kanji records, otherwise None. """
+    etag = _kanji_etag(kanji_chars, fields, *extra)
+    return http_cache.not_modified(etag, max_age=http_cache.KANJI_MAX_AGE) if etag else None
+
+def _with_kanji_cache_headers(response, kanji_chars: list[str], fields: tuple[str, ...] | None, *extra):
+    """ Adds ETag and Cache-Control headers to a kanji response. """
+    etag = _kanji_etag(kanji_chars, fields, *extra)
+    if etag: http_cache.apply_cache_headers(response, etag, max_age=http_cache.KANJI_MAX_AGE)
+    return response
+
+@nihongo_bp.route('/kanji/api/batch', methods=['GET', 'POST'])
 @login_required
 def kanji_batch():
-    # Get payload containing list of kanji characters to look up
-    payload = request.get_json(silent=True) or {}
-    items = payload.get("kanji", [])
+    """Retrieves several kanji at once, fetching uncached ones from WaniKani.
+    Clients sending `Accept: application/x-ndjson` get one JSON line per kanji: cached kanji straight away,
+    fetched ones after them, then a final {"status": "done"} line listing the kanji that couldn't be found.
+    """
+    fields = _requested_kanji_fields() # Fields of each record to return, e.g. ?fields=level
+    stream = request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+    use_gzip = _accepts_gzip() and not stream # Compressing would hold lines back until the stream ends
+    if request.method == 'GET':
+        # GET /kanji/api/batch?kanji=一二三 can be revalidated by the browser (conditional GET)
+        items = list(request.args.get("kanji", "", type=str))
+    else:
+        # Get payload containing list of kanji characters to look up
+        payload = request.get_json(silent=True) or {}
+        items = payload.get("kanji", [])
 
     if not isinstance(items, list):
         # Abort if incorrect payload structure
         abort(400, description="Invalid payload.")
 
-    # Build a data map of kanji character to kanji data for each character in the list, fetching from WaniKani if not cached
-    data_map = {}
+    items = list(dict.fromkeys(item for item in items if isinstance(item, str))) # Unique, ignoring malformed entries
+    max_items = current_app.config.get('KANJI_BATCH_MAX', 100)
+    if len(items) > max_items:
+        # Oversized batches are refused rather than tying up a worker
+        abort(413, description=f"At most {max_items} kanji can be requested at once.")
+
+    if request.method == 'GET':
+        cached = _kanji_not_modified(items, fields, use_gzip, stream)
+        if cached: return cached
+
+    # Every locally cached kanji is read in one query, the rest are fetched from WaniKani
+    found = Kanji.get_cached(items)
+    missing = []
     for kanji_char in items:
+        if kanji_char in found:
+            continue
         try:
-            kanji = Kanji.get_kanji(kanji_char)
-        except Exception as e:
-            # Log any unexpected errors that occur during kanji lookup and skip the character, allowing the batch process to continue for other characters
+            missing.append(validate_kanji(kanji_char))
+        except ValueError as e:
+            # Log invalid characters and skip them, allowing the batch process to continue for other characters
             current_app.logger.error(f"Failed to fetch kanji data for {kanji_char}: {str(e)}")
-            continue
-        data_map[kanji_char] = kanji.data # Append kanji data to the data map
 
-    return jsonify({"status": "ready", "data": data_map}) # Return the batch kanji data as JSON
+    if stream:
+        response = Response(stream_with_context(_stream_kanji_batch(items, found, missing, fields)), mimetype=NDJSON_MIMETYPE)
+    else:
+        if missing: found.update(_fetch_missing_kanji(missing))
+        data_map = {kanji_char: kanji_projection.project(found[kanji_char], fields) for kanji_char in items if kanji_char in found} # Kanji character to kanji data
+        response = _kanji_json({"status": "ready", "data": data_map}, use_gzip) # Return the batch kanji data as JSON
+
+    response.vary.add('Accept') # JSON or NDJSON
+    if request.method == 'GET': _with_kanji_cache_headers(response, items, fields, use_gzip, stream) # No ETag while any kanji is uncached
+    return response
+
+def _fetch_missing_kanji(missing: list[str], on_fetched=None) -> dict[str, Kanji]:
+    """
+    Fetches uncached kanji together, in as few WaniKani requests as possible. Failures are logged and left out.
+    `on_fetched` is passed to `Kanji.fetch_many`, to get each page of kanji as it arrives.
+    """
+    fetched = {}
+    try:
+        fetched = Kanji.fetch_many(missing, on_fetched=on_fetched)
+    except KeyError:
+        current_app.logger.error("WaniKani API key not configured.")
+    except Exception as e:
+        # Log any unexpected errors and return whatever was already cached
+        current_app.logger.error(f"Failed to fetch kanji data for {''.join(missing)}: {str(e)}")
+    for kanji_char in missing:
+        if kanji_char not in fetched: current_app.logger.error(f"No kanji data found for {kanji_char}.")
+    return fetched
+
+def _stream_kanji_batch(items: list[str], found: dict[str, Kanji], missing: list[str], fields: tuple[str, ...] | None):
+    """ Yields NDJSON lines: every cached kanji in one chunk, then the fetched ones page by page, then a summary line. """
+    yield b"".join(_ndjson_line({"kanji": kanji_char, "data": kanji_projection.project(found[kanji_char], fields)}) for kanji_char in items if kanji_char in found)
+
+    fetched = {}
+    if missing:
+        # Fetch on a thread, so each page of kanji can be sent while the next one is requested
+        pages = queue.Queue()
+
+        @copy_current_request_context
+        def fetch():
+            try:
+                pages.put(_fetch_missing_kanji(missing, on_fetched=pages.put)) # Also has kanji fetched by other callers
+            finally:
+                pages.put(None)
+
+        threading.Thread(target=fetch, daemon=True).start()
+        while (page := pages.get()) is not None:
+            new = [kanji_char for kanji_char in missing if kanji_char in page and kanji_char not in fetched]
+            fetched.update(page)
+            if new: yield b"".join(_ndjson_line({"kanji": kanji_char, "data": kanji_projection.project(fetched[kanji_char], fields)}) for kanji_char in new)
+
+    yield _ndjson_line({"status": "done", "missing": [kanji_char for kanji_char in items if kanji_char not in found and kanji_char not in fetched]})
+
+def _ndjson_line(payload: dict) -> bytes:
+    return kanji_projection.encode(payload) + b"\n"
 
 @nihongo_bp.route('/particles/')
 @login_required
@@ -289,6 +494,15 @@ def particles_lookup(slug):
     if not slug or not VALID_SLUG.match(slug):
         abort(400, description="Invalid particle slug.")
 
+    # Particle payloads are built from the particle map and the note file
+    root = _particles_processor.data_root
+    map_digest = http_cache.file_digest(root / "map.json")
+    note_digest = http_cache.file_digest(root / "notes" / f"{slug}.md")
+    etag = http_cache.make_etag(http_cache.release_id(), map_digest, note_digest) if map_digest and note_digest else None
+    if etag:
+        cached = http_cache.not_modified(etag)
+        if cached: return cached
+
     try:
         # Attempt to load particle data using the processor, which will handle caching and fetching as needed
         payload = _particles_processor.load_particle(slug)
@@ -300,7 +514,9 @@ def particles_lookup(slug):
         current_app.logger.error(f"Failed to load particle note for {slug}: {str(e)}")
         abort(500, description="An error occurred while loading particle notes.")
 
-    return jsonify({"status": "ready", "data": payload})
+    response = jsonify({"status": "ready", "data": payload})
+    if etag: http_cache.apply_cache_headers(response, etag)
+    return response
 
 @nihongo_bp.route('/quiz', methods=['GET', 'POST'])
 @login_required
@@ -349,15 +565,12 @@ def quiz():
                     # Handle grammar quiz
                     selected_lessons = quiz_form.lessons.data # type: ignore
                     max_questions = quiz_form.max_questions.data # type: ignore
-                    quiz_data = quiz_utils.build_grammar_quiz(selected_lessons, max_questions)
+                    quiz_session = quiz_utils.sample_grammar_quiz(selected_lessons, max_questions)
+                    quiz_session["type"] = quiz_type.name
 
-                    quiz_data['user_id'] = current_user.id
-                    # Cache quiz by user's unique ID
-                    _quiz_cache[current_user.id] = {
-                        "type": quiz_type.name,
-                        "title": quiz_data.get('title', 'Quiz'),
-                        "data": quiz_data
-                    }
+                    # T-FE03 --> Server-side quiz session, stored by user's unique ID: {type, seed, lessons, questions}
+                    # Only question ids are stored, the questions are expanded from the shared quiz bank when the quiz is played.
+                    quiz_sessions.get_store().put(current_user.id, quiz_session)
 
                     # Go to quiz session page
                     return redirect(url_for('nihongo.quiz_session'))
@@ -383,15 +596,20 @@ def quiz():
 @nihongo_bp.route('/quiz/session', methods=['GET'])
 @login_required
 def quiz_session():
-    if current_user.id not in _quiz_cache:
+    quiz_session = quiz_sessions.get_store().get(current_user.id) # Retrieve compact quiz session
+    if quiz_session is None or quiz_session.get("type") != quiz_utils.NihongoQuizTypes.GRAMMAR.name:
         flash("No active quiz found. Please try again.", "warning")
         return redirect(url_for('nihongo.quiz')) # Redirect to quiz generation page if no active quiz is found
 
-    payload = _quiz_cache[current_user.id] # Retrieve quiz data
+    quiz_data = quiz_utils.expand_grammar_quiz(quiz_session) # Expand question ids into full questions
+    if not quiz_data["bank"]:
+        flash("The questions in this quiz are no longer available. Please generate a new quiz.", "warning")
+        return redirect(url_for('nihongo.quiz'))
+    quiz_data['user_id'] = current_user.id
 
     # Renders template for the quiz session, passing the quiz data and title to be used in the frontend quiz interface
     return render_template(
         'nihongo-quiz-session.html',
-        quiz_payload=payload['data'],
-        quiz_title=payload.get('title', 'Quiz')
+        quiz_payload=quiz_data,
+        quiz_title=quiz_data.get('title', 'Quiz')
     )
@@ -97,21 +97,34 @@ document.addEventListener("DOMContentLoaded", () => {
 	};
 
 	/**
-	 * Updates the information panel with data from the fetched kanji.
+	 * Converts raw WaniKani kanji data (from `api/<kanji>` or `api/batch`) into the details shown in the panel.
+	 * Entries of the prescribed kanji bundle (`api/prescribed`) are already in this format.
 	 */
-	const updatePanelFromData = (kanji, payload) => {
-		const data = payload?.data || {};
-		const type = payload?.type || null;
-		const meanings = Array.isArray(data?.meanings)
-			? data.meanings.map((m) => m.meaning).filter(Boolean) // Filter out any falsy values
-			: []; // Default to empty array if meanings is not an array
-		const primaryMeaning = Array.isArray(data?.meanings)
+	const detailsFromData = (data, type) => ({
+		primary: Array.isArray(data?.meanings)
 			? (data.meanings.find((m) => m.primary)?.meaning || "")
-			: ""; // Default to empty string if meanings is not an array
-		const onyomi = getReadingsByType(data, "onyomi");
-		const kunyomi = getReadingsByType(data, "kunyomi");
-		const nanori = getNanoriReadings(data);
-		const url = data?.document_url || "#"; // Fallback to "#" if URL is not provided
+			: "", // Default to empty string if meanings is not an array
+		meanings: Array.isArray(data?.meanings)
+			? data.meanings.map((m) => m.meaning).filter(Boolean) // Filter out any falsy values
+			: [], // Default to empty array if meanings is not an array
+		onyomi: getReadingsByType(data, "onyomi"),
+		kunyomi: getReadingsByType(data, "kunyomi"),
+		nanori: getNanoriReadings(data),
+		url: data?.document_url || "",
+		type: type || null
+	});
+
+	/**
+	 * Updates the information panel with the details of the fetched kanji.
+	 */
+	const updatePanelFromData = (kanji, details) => {
+		const type = details?.type || null;
+		const meanings = details?.meanings || [];
+		const primaryMeaning = details?.primary || "";
+		const onyomi = details?.onyomi || [];
+		const kunyomi = details?.kunyomi || [];
+		const nanori = details?.nanori || [];
+		const url = details?.url || "#"; // Fallback to "#" if URL is not provided
 
 		// Set info content
 		infoChar.textContent = kanji;
@@ -192,6 +205,8 @@ document.addEventListener("DOMContentLoaded", () => {
 	let prefetchTimer = null;
 	/** Flag for prefetch operation currently running. */
 	let isPrefetchActive = false;
+	/** Kanji whose details the panel is waiting for, if any. */
+	let pendingPanelKanji = null;
 
 	/** Set prefetch timer (if possible) */
 	const schedulePrefetch = () => {
@@ -216,22 +231,26 @@ document.addEventListener("DOMContentLoaded", () => {
 
 		try {
 			// Asynchronously get a response from nihongo/kanji/api/batch
-			const res = await fetch("api/batch", {
-				method: "POST",
-				headers: { "Content-Type": "application/json" },
-				body: JSON.stringify({ kanji: batch })
+			// GET (rather than POST) so the browser can cache and revalidate the response (ETag)
+			// Streamed as NDJSON: cached kanji arrive at once, ones fetched from WaniKani follow
+			const res = await fetch(`api/batch?kanji=${encodeURIComponent(batch.join(""))}`, {
+				headers: { Accept: "application/x-ndjson" }
 			});
 
 			if (!res.ok) throw new Error(`Failed batch fetch: ${res.status}`);
 
-			const payload = await res.json(); // Wait for response and set payload
-			const dataMap = payload?.data || {};
-			// Create an object for each tile.
-			Object.entries(dataMap).forEach(([kanji, data]) => {
-				const block = DOMToKanji.get(kanji);
+			// Create an object for each tile as its line arrives.
+			await readNdjson(res, (line) => {
+				if (!line?.kanji || !line.data) return; // Summary line
+				const block = DOMToKanji.get(line.kanji);
 				const type = block?.dataset.category || null;
-				kanjiCache.set(kanji, { data, type });
+				const details = detailsFromData(line.data, type);
+				kanjiCache.set(line.kanji, details);
 				if (block) block.dataset.loaded = "true"; // Set as loaded
+				if (line.kanji === pendingPanelKanji) { // Selected while loading: show it now
+					pendingPanelKanji = null;
+					updatePanelFromData(line.kanji, details);
+				}
 			});
 		} catch (error) {
 			console.error("Kanji prefetch failed:", error);
@@ -241,6 +260,34 @@ document.addEventListener("DOMContentLoaded", () => {
 		}
 	};
 
+	/**
+	 * Calls `onLine` with each JSON object of a newline-delimited JSON response, as soon as its line has arrived.
+	 */
+	const readNdjson = async (res, onLine) => {
+		const handle = (text) => {
+			if (text.trim()) onLine(JSON.parse(text));
+		};
+
+		if (!res.body?.getReader) {
+			// No streaming support, so wait for the whole response
+			(await res.text()).split("\n").forEach(handle);
+			return;
+		}
+
+		const reader = res.body.getReader();
+		const decoder = new TextDecoder();
+		let buffered = "";
+		while (true) {
+			const { done, value } = await reader.read();
+			if (done) break;
+			buffered += decoder.decode(value, { stream: true });
+			const lines = buffered.split("\n");
+			buffered = lines.pop(); // Keep the incomplete last line for the next chunk
+			lines.forEach(handle);
+		}
+		handle(buffered + decoder.decode());
+	};
+
 	/** Add kanji to queue for fetching. */
 	const queuePrefetch = (kanji) => {
 		if (!kanji || kanjiCache.has(kanji)) return;
@@ -264,22 +311,50 @@ document.addEventListener("DOMContentLoaded", () => {
 
 		const cached = kanjiCache.get(kanji);
 		if (cached) {
+			pendingPanelKanji = null;
 			updatePanelFromData(kanji, cached);
 			return;
 		}
 
 		setLoadingPanel(kanji); // Load kanji info
+		pendingPanelKanji = kanji; // A streamed batch may deliver it first
 		const result = await fetchKanjiData(kanji); // Wait for data fetch then continue
+		if (pendingPanelKanji !== kanji) return; // Already shown from a batch, or another kanji was selected
+		pendingPanelKanji = null;
 		if (result.status === "ready" && result.data) {
 			const type = tileElement?.dataset?.category || null;
-			kanjiCache.set(kanji, { data: result.data, type }); // Set cache on every run
+			const details = detailsFromData(result.data, type);
+			kanjiCache.set(kanji, details); // Set cache on every run
 			if (tileElement) tileElement.dataset.loaded = "true";
-			updatePanelFromData(kanji, { data: result.data, type });
+			updatePanelFromData(kanji, details);
 		}
 	});
 
+	/**
+	 * Loads the details of every prescribed kanji in one cacheable request.
+	 * Kanji missing from the bundle (not cached on the server yet) are left to the prefetch below.
+	 */
+	const loadPrescribedBundle = async () => {
+		try {
+			const res = await fetch("api/prescribed");
+			if (!res.ok) throw new Error(`Failed to fetch kanji bundle: ${res.status}`);
+
+			const payload = await res.json();
+			Object.entries(payload?.data || {}).forEach(([kanji, details]) => {
+				kanjiCache.set(kanji, details);
+				const block = DOMToKanji.get(kanji);
+				if (block) block.dataset.loaded = "true"; // Set as loaded
+			});
+		} catch (error) {
+			console.error("Kanji bundle failed, falling back to batch prefetch:", error);
+		}
+	};
+
 	// Prefetch nearby kanji only when they enter the viewport to reduce load.
-	if ("IntersectionObserver" in window) {
+	// Started after the bundle has loaded, so only kanji missing from it are requested.
+	const startPrefetchObserver = () => {
+		if (!("IntersectionObserver" in window)) return;
+
 		const prefetchObserver = new IntersectionObserver(
 			(entries, entryObserver) => {
 				entries.forEach((entry) => {
@@ -297,6 +372,10 @@ document.addEventListener("DOMContentLoaded", () => {
 			}
 		);
 
-		blocks.forEach((block) => prefetchObserver.observe(block)); // Add observer to all blocks
-	}
+		blocks.forEach((block) => {
+			if (!kanjiCache.has(block.dataset.kanji || "")) prefetchObserver.observe(block); // Add observer to blocks without details
+		});
+	};
+
+	loadPrescribedBundle().then(startPrefetchObserver);
 });
@@ -1,8 +1,10 @@
 import re
 from lingual.utils.languages import Languages
 from lingual.utils.lesson_processor import BaseLessonProcessor
+from lingual.utils.transform_engine import MarkupRule
 
 FURIGANA_RE = re.compile(r'([一-龯々]+)\[([^\]]+)\]') # Regex to match Kanji[kana] patterns for furigana transformation
+FURIGANA_REPL = r'<ruby>\1<rt>\2</rt></ruby>' # Ruby markup template for FURIGANA_RE matches
 
 class NihongoLessonProcessor(BaseLessonProcessor):
     """
@@ -23,7 +25,8 @@ class NihongoLessonProcessor(BaseLessonProcessor):
             data_root = DIR
         ) # Initialise superclass with Japanese language and grammar data directory
 
-        self.add_transform(self.transform_furigana)
+        # Registered as a MarkupRule so furigana is skipped for strings without a "[", like the base markup
+        self.add_transform(MarkupRule(FURIGANA_RE, FURIGANA_REPL, triggers=("[",), name="furigana"))
 
     # Transformers
     def transform_furigana(self, text: str) -> str:
@@ -31,7 +34,7 @@ class NihongoLessonProcessor(BaseLessonProcessor):
 
         Example: `漢字[かんじ]` → `<ruby>漢字<rt>かんじ</rt></ruby>`
         """
-        return FURIGANA_RE.sub(r'<ruby>\1<rt>\2</rt></ruby>', text)
+        return FURIGANA_RE.sub(FURIGANA_REPL, text)
     
 _PROCESSOR: NihongoLessonProcessor | None = None # Singleton instance of the lesson processor, initially None
 
@@ -0,0 +1,65 @@
+"""
+Precomputed details of every prescribed kanji, served to the kanji reference page in one request.
+
+The bundle only holds what the info panel shows (meanings, readings, type and WaniKani link), encoded once
+as compact JSON and gzip. It is rebuilt only when the cached data of a prescribed kanji changes.
+"""
+
+import gzip
+import json
+import threading
+from typing import NamedTuple
+from lingual.utils import http_cache
+from .kanji_processor import Kanji
+
+BUNDLE_FORMAT = 1 # Bump when the entry layout changes, so browsers don't keep old bundles
+
+class EncodedBundle(NamedTuple):
+    etag: str       # Strong ETag of the JSON body (the gzip body uses etag + ".gz")
+    body: bytes     # Compact UTF-8 JSON
+    gzipped: bytes  # body, gzip-compressed
+    count: int      # Number of kanji in the bundle
+
+_bundle: EncodedBundle | None = None
+_lock = threading.Lock()
+
+def kanji_details(kanji: Kanji, kanji_type: str) -> dict:
+    """ Returns the fields of a kanji shown on the reference page. """
+    return {
+        "primary": kanji.primary_meaning,
+        "meanings": [meaning["meaning"] for meaning in kanji.meanings if meaning.get("meaning")],
+        "onyomi": [reading["reading"] for reading in kanji.on_readings],
+        "kunyomi": [reading["reading"] for reading in kanji.kun_readings],
+        "nanori": [reading["reading"] for reading in kanji.nanori_readings],
+        "url": kanji.url,
+        "type": kanji_type,
+    }
+
+def prescribed_version() -> str:
+    """ Changes whenever the prescribed list or the cached data of a prescribed kanji changes. Cheap: only record hashes are read. """
+    prescribed = Kanji.get_prescribed_kanji()
+    digests = Kanji.cache_digests([kanji for kanji, _ in prescribed])
+    return http_cache.make_etag(*(f"{kanji}:{kanji_type.name}:{digests.get(kanji)}" for kanji, kanji_type in prescribed))
+
+def get_prescribed_bundle() -> EncodedBundle:
+    """
+    Returns the encoded bundle of every locally cached prescribed kanji (uncached ones are left out,
+    the page fetches them individually). Cheap when nothing changed: only the record hashes are compared.
+    """
+    global _bundle
+    prescribed = Kanji.get_prescribed_kanji()
+    etag = http_cache.make_etag(BUNDLE_FORMAT, http_cache.release_id(), prescribed_version()) # New code may render entries differently
+
+    bundle = _bundle
+    if bundle is not None and bundle.etag == etag:
+        return bundle
+
+    with _lock:
+        if _bundle is not None and _bundle.etag == etag:
+            return _bundle # Built by another thread meanwhile
+
+        records = Kanji.get_cached([kanji for kanji, _ in prescribed])
+        entries = {kanji: kanji_details(records[kanji], kanji_type.name) for kanji, kanji_type in prescribed if kanji in records}
+        body = json.dumps({"status": "ready", "data": entries}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        _bundle = EncodedBundle(etag, body, gzip.compress(body, compresslevel=9, mtime=0), len(entries))
+        return _bundle
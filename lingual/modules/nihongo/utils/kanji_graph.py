@@ -0,0 +1,160 @@
+"""
+Related-kanji index over the cached WaniKani subjects.
+
+Every cached record lists the subjects it is linked to: its radicals (`component_subject_ids`), the vocabulary
+using it (`amalgamation_subject_ids`) and kanji that look like it (`visually_similar_subject_ids`). The graph keeps
+these as compressed sparse rows: per relation, one flat array of subject IDs with per-kanji offsets (forward edges),
+and one flat array of kanji with per-subject offsets (reverse edges). It is built once from the kanji store, so a
+neighbourhood query walks a few array slices, one step per edge, with no JSON parsed at request time.
+
+Two kanji are related when they share a radical, appear in the same vocabulary, or WaniKani lists them as visually similar.
+"""
+
+import threading
+import time
+from array import array
+from typing import Iterable
+
+# Relations read from each record, by the name used in responses
+RELATIONS = {
+    "components": "component_subject_ids",
+    "vocabulary": "amalgamation_subject_ids",
+    "visually_similar": "visually_similar_subject_ids",
+}
+
+class _Edges:
+    """ Forward and reverse edges of one relation, as flat arrays. """
+
+    __slots__ = ("offsets", "targets", "rows", "reverse_offsets", "reverse_nodes")
+
+    def __init__(self, adjacency: list[list[int]]):
+        # Forward: kanji node -> subject IDs, in targets[offsets[node]:offsets[node + 1]]
+        self.offsets = array("l", [0])
+        self.targets = array("l")
+        for subject_ids in adjacency:
+            self.targets.extend(subject_ids)
+            self.offsets.append(len(self.targets))
+
+        # Reverse: subject ID -> kanji nodes linking to it, in reverse_nodes[reverse_offsets[row]:reverse_offsets[row + 1]]
+        linked: dict[int, list[int]] = {}
+        for node, subject_ids in enumerate(adjacency):
+            for subject_id in subject_ids:
+                linked.setdefault(subject_id, []).append(node)
+        self.rows = {subject_id: row for row, subject_id in enumerate(linked)}
+        self.reverse_offsets = array("l", [0])
+        self.reverse_nodes = array("l")
+        for nodes in linked.values():
+            self.reverse_nodes.extend(nodes)
+            self.reverse_offsets.append(len(self.reverse_nodes))
+
+    def forward(self, node: int) -> array:
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def reverse(self, subject_id: int) -> array:
+        row = self.rows.get(subject_id)
+        if row is None:
+            return array("l")
+        return self.reverse_nodes[self.reverse_offsets[row]:self.reverse_offsets[row + 1]]
+
+class KanjiGraph:
+    """
+    Adjacency index of cached kanji.
+
+    :param records: Kanji to (WaniKani data, subject ID or None), e.g. from `KanjiStore.all_records`.
+    :param version: Version of the store this was built from, used to detect when to rebuild.
+    """
+
+    def __init__(self, records: dict[str, tuple[dict, int | None]], version: str = ""):
+        self.version = version
+        self.characters: list[str] = sorted(records)
+        self._nodes = {kanji: node for node, kanji in enumerate(self.characters)}
+        self._subject_ids = array("l", (records[kanji][1] or 0 for kanji in self.characters)) # 0 if unknown
+        self._by_subject = {subject_id: node for node, subject_id in enumerate(self._subject_ids) if subject_id}
+        self._edges = {
+            name: _Edges([_subject_id_list(records[kanji][0].get(field)) for kanji in self.characters])
+            for name, field in RELATIONS.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.characters)
+
+    def __contains__(self, kanji: str) -> bool:
+        return kanji in self._nodes
+
+    def subject_ids(self, kanji: str, relation: str) -> list[int]:
+        """ Returns the subject IDs a kanji links to through a relation (see RELATIONS). """
+        node = self._nodes.get(kanji)
+        return [] if node is None else self._edges[relation].forward(node).tolist()
+
+    def linking(self, subject_id: int, relation: str) -> list[str]:
+        """ Returns the cached kanji linking to a subject through a relation, e.g. every kanji using a radical. """
+        return [self.characters[node] for node in self._edges[relation].reverse(subject_id)]
+
+    def shared(self, kanji: str, relation: str) -> dict[str, int]:
+        """ Returns the other kanji sharing subjects with a kanji through a relation, with the number they share. """
+        node = self._nodes.get(kanji)
+        if node is None:
+            return {}
+        edges = self._edges[relation]
+        counts: dict[int, int] = {}
+        for subject_id in edges.forward(node):
+            for other in edges.reverse(subject_id):
+                if other != node:
+                    counts[other] = counts.get(other, 0) + 1
+        return {self.characters[other]: count for other, count in counts.items()}
+
+    def visually_similar(self, kanji: str) -> list[str]:
+        """ Returns the cached kanji WaniKani lists as looking like this one, in either direction. """
+        node = self._nodes.get(kanji)
+        if node is None:
+            return []
+        edges = self._edges["visually_similar"]
+        similar = [self._by_subject[subject_id] for subject_id in edges.forward(node) if subject_id in self._by_subject]
+        if self._subject_ids[node]:
+            similar.extend(edges.reverse(self._subject_ids[node])) # Kanji listing this one
+        return [self.characters[other] for other in dict.fromkeys(similar) if other != node]
+
+    def related(self, kanji: str, limit: int = 10) -> dict[str, list[str]]:
+        """ Returns the related kanji of a kanji, most shared first, up to `limit` per relation. """
+        return {
+            "visually_similar": self.visually_similar(kanji)[:limit],
+            "shared_components": _ranked(self.shared(kanji, "components"), limit),
+            "shared_vocabulary": _ranked(self.shared(kanji, "vocabulary"), limit),
+        }
+
+def _subject_id_list(value: Iterable | None) -> list[int]:
+    """ Keeps the integer IDs of a record field, ignoring missing or malformed values. """
+    return [subject_id for subject_id in value or [] if isinstance(subject_id, int)]
+
+def _ranked(counts: dict[str, int], limit: int) -> list[str]:
+    return [kanji for kanji, _ in sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]]
+
+_graph: KanjiGraph | None = None
+_checked = 0.0 # time.monotonic() when the graph was last checked against the store
+_lock = threading.Lock()
+
+def get_graph() -> KanjiGraph:
+    """
+    Returns the graph of the cached kanji (or of the offline snapshot), rebuilt when a record is added to or rewritten in the store.
+    The store is checked at most every INDEX_CHECK_SECONDS, so most lookups don't query it.
+    """
+    global _graph, _checked
+    from .kanji_processor import INDEX_CHECK_SECONDS, get_snapshot, get_store
+
+    snapshot = get_snapshot() # Offline mode reads the snapshot, never the store
+    graph = _graph
+    if snapshot is not None:
+        version = f"snapshot:{snapshot.version}"
+    elif graph is not None and not graph.version.startswith("snapshot:") and time.monotonic() - _checked < INDEX_CHECK_SECONDS:
+        return graph
+    else:
+        version = get_store().version()
+        _checked = time.monotonic()
+    if graph is not None and graph.version == version:
+        return graph
+
+    with _lock:
+        if _graph is None or _graph.version != version:
+            source = snapshot if snapshot is not None else get_store()
+            _graph = KanjiGraph(source.all_records(), version=version)
+        return _graph
@@ -1,9 +1,21 @@
 import os
 import json
-import requests
+import logging
+import threading
+import time
 import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from enum import Enum
+from typing import Callable
+from lingual.utils.render_cache import RenderCache
+from lingual.utils.single_flight import SingleFlight
+from lingual.utils.token_bucket import TokenBucket
+from .kanji_store import KanjiStore, encode_record
+from .wanikani_client import WaniKaniClient, WaniKaniError
+
+# Background refreshes run outside the app context. A child of the app's logger, so records reach its handlers.
+logger = logging.getLogger(__name__)
 
 # Environment variable for WaniKani API Key
 # TODO: Allow users to input their own API key in the future
@@ -14,15 +26,63 @@ WANIKANI_API_KEY = os.getenv("WANIKANI_API_KEY", None)
 # Checker for API key validity.
 CHECK_KEY = lambda: (_ for _ in ()).throw(KeyError("WANIKANI_API_KEY environment variable not set.")) if WANIKANI_API_KEY is None else None
 
-# Base URL for the WaniKani Kanji API
-API_URL = "https://api.wanikani.com/v2/subjects"
+# Base URL for the WaniKani Kanji API (can be pointed at a mirror or a local stub server)
+API_URL = os.getenv("WANIKANI_API_URL", "https://api.wanikani.com/v2/subjects")
+FETCH_BATCH_SIZE = 100 # Kanji requested per API call when fetching several at once (keeps the URL short)
+POOL_SIZE = int(os.getenv("WANIKANI_POOL_SIZE", "10")) # Open WaniKani connections per process, set to the worker's thread count
+DEADLINE_SECONDS = float(os.getenv("WANIKANI_DEADLINE_SECONDS", "10")) # Total time a lookup may spend on WaniKani, retries included
+LEASE_SECONDS = DEADLINE_SECONDS + 5 # How long other workers wait for a worker fetching a kanji before taking over
+MAX_CONCURRENT = int(os.getenv("WANIKANI_MAX_CONCURRENT", str(POOL_SIZE))) # WaniKani calls in progress per process, further calls wait for a slot
+NOT_FOUND_SECONDS = float(os.getenv("KANJI_NOT_FOUND_TTL", "86400")) # How long a character WaniKani doesn't know is not asked for again
+REFRESH_AFTER_SECONDS = float(os.getenv("KANJI_REFRESH_AFTER", str(30 * 86400))) # Age after which a cached record is refreshed in the background
+INDEX_CHECK_SECONDS = float(os.getenv("KANJI_INDEX_CHECK_SECONDS", "5")) # How often the search index and kanji graph check for changed records
 
 # Data directory where kanji information is stored locally
 DATA_DIRECTORY = Path(__file__).parent.parent / "data" / "kanji"
 DATA_DIRECTORY.mkdir(parents=True, exist_ok=True)
 
+# SQLite store holding every cached kanji record (see kanji_store), seeded from the JSON files in DATA_DIRECTORY
+DATABASE_PATH = Path(os.getenv("KANJI_DB_PATH", DATA_DIRECTORY.parent / "kanji.db"))
+
+# Parsed Kanji objects kept in memory, least recently used are dropped first.
+# Entries are replaced when a record is refreshed (see `Kanji.refresh`), so they are never revalidated against the store.
+CACHE_SIZE = int(os.getenv("KANJI_CACHE_SIZE", "1024"))
+_records = RenderCache(maxsize=CACHE_SIZE, policy="lru")
+
 PRESCRIBED_KANJI = []  # List of kanji characters that are prescribed in the HSC syllabus
 
+_store: KanjiStore | None = None
+_client: WaniKaniClient | None = None
+_in_flight = SingleFlight() # Kanji being fetched by a thread in this process
+_refresher: ThreadPoolExecutor | None = None # Refreshes stale records in the background, one batch at a time
+_refreshing: set[str] = set() # Kanji queued for or being refreshed by this process
+_refresh_lock = threading.Lock()
+_snapshot = None # KanjiSnapshot served in offline mode (see kanji_snapshot), None when kanji come from the store and WaniKani
+
+def get_store() -> KanjiStore:
+    """ Returns the shared kanji store, opening it on first use. """
+    global _store
+    if _store is None:
+        _store = KanjiStore(DATABASE_PATH, seed_directory=DATA_DIRECTORY)
+    return _store
+
+def use_snapshot(snapshot) -> None:
+    """ Serves kanji only from the given snapshot (see kanji_snapshot), never calling WaniKani. None goes back online. """
+    global _snapshot
+    _snapshot = snapshot
+    _records.clear()
+
+def get_snapshot():
+    """ Returns the snapshot served in offline mode, or None when online. """
+    return _snapshot
+
+def get_client() -> WaniKaniClient:
+    """ Returns the shared WaniKani client, creating it on first use. """
+    global _client
+    if _client is None:
+        _client = WaniKaniClient(WANIKANI_API_KEY, pool_size=POOL_SIZE, deadline=DEADLINE_SECONDS, max_concurrent=MAX_CONCURRENT)
+    return _client
+
 def validate_kanji(kanji: str) -> str:
     """
     Ensures the input is exactly one character and safe for use in URLs and filesystem paths.
@@ -60,29 +120,51 @@ class ReadingType(Enum):
     NANORI = 'nanori' # Uncommon
 
 class Kanji:
-    """Represents a Kanji character with associated information fetched from the WaniKani API."""
+    """
+    Represents a Kanji character with associated information fetched from the WaniKani API.
+
+    Kanji objects are immutable and shared between requests (see `get_kanji`), so readings are split
+    by type and the primary meaning is found once, when the object is created. The raw WaniKani data
+    is kept in `data` for the JSON API and must not be modified.
+    """
+
+    __slots__ = ("kanji_char", "data", "digest", "updated", "meanings", "readings", "primary_meaning", "_readings_by_type")
 
-    def __init__(self, kanji_char: str, data: dict):
+    def __init__(self, kanji_char: str, data: dict, digest: str | None = None, updated: float | None = None):
         """
-        Initializes the Kanji object either with the provided data or by fetching it from the API
-        
+        Initializes the Kanji object with the provided data.
+
         Do not call this constructor directly if you want to get the kanji object with data.
-        This constructor will always attempt to fetch data from the API if no data is provided,
-        which can lead to unnecessary API calls and potential rate limiting.
         Instead, use the static method `get_kanji` which will handle data fetching and caching.
         """
-        self.kanji_char: str = kanji_char
-        self.data: dict = data
+        readings = data.get("readings", [])
+        by_type: dict[str, list] = {reading_type.value: [] for reading_type in ReadingType}
+        for reading in readings:
+            by_type.setdefault(reading["type"], []).append(reading)
 
-    @property
-    def meanings(self) -> list:
-        """Returns a list of meanings for the kanji."""
-        return self.data.get("meanings", [])
+        primary_meaning = "" # Empty string if no primary meaning is found
+        for meaning in data.get("meanings", []):
+            if meaning.get("primary"):
+                primary_meaning = meaning.get("meaning", "")
+                break
+
+        set_slot = object.__setattr__ # Bypass the immutability guard below
+        set_slot(self, "kanji_char", kanji_char)
+        set_slot(self, "data", data)
+        set_slot(self, "digest", digest) # Content hash of data (see kanji_store), used for ETags
+        set_slot(self, "updated", updated) # When the record was stored (epoch seconds), None if unknown
+        set_slot(self, "meanings", data.get("meanings", []))
+        set_slot(self, "readings", readings)
+        set_slot(self, "primary_meaning", primary_meaning)
+        set_slot(self, "_readings_by_type", by_type)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Kanji objects are immutable.")
 
     @property
-    def readings(self) -> list:
-        """Returns a list of readings for the kanji."""
-        return self.data.get("readings", [])
+    def is_stale(self) -> bool:
+        """ Whether the cached record is old enough to be refreshed from WaniKani. It is still served meanwhile. """
+        return self.updated is not None and time.time() - self.updated > REFRESH_AFTER_SECONDS
 
     @property
     def stroke_count(self) -> int:
@@ -90,23 +172,23 @@ class Kanji:
         return self.data.get("stroke_count", 0)
 
     def _get_readings_by_type(self, reading_type: str) -> list:
-        """Filters readings based on the specified type (e.g., 'kun', 'on', 'nanori')."""
-        return [reading for reading in self.readings if reading["type"] == reading_type]
+        """Returns the readings of the specified type (e.g., 'kunyomi', 'onyomi', 'nanori')."""
+        return self._readings_by_type.get(reading_type, [])
 
     @property
     def kun_readings(self) -> list:
         """Returns the 'kun' readings of the kanji."""
-        return self._get_readings_by_type(ReadingType.KUN.value)
+        return self._readings_by_type[ReadingType.KUN.value]
 
     @property
     def on_readings(self) -> list:
         """ Returns the 'on' readings of the kanji. """
-        return self._get_readings_by_type(ReadingType.ON.value)
+        return self._readings_by_type[ReadingType.ON.value]
 
     @property
     def nanori_readings(self) -> list:
         """ Returns the 'nanori' readings of the kanji. """
-        return self._get_readings_by_type(ReadingType.NANORI.value)
+        return self._readings_by_type[ReadingType.NANORI.value]
 
     @property
     def type(self) -> KanjiType:
@@ -121,10 +203,7 @@ class Kanji:
 
     def get_primary_meaning(self) -> str:
         """ Retrieves the primary meaning of the kanji. """
-        for meaning in self.meanings:
-            if meaning.get("primary"):
-                return meaning.get("meaning", "")
-        return "" # Return an empty string if no primary meaning is found
+        return self.primary_meaning
 
     @staticmethod
     def _fetch_kanji_data(kanji: str) -> dict:
@@ -132,63 +211,269 @@ class Kanji:
         Fetches kanji data from the WaniKani API and stores it locally.
         """
 
+        kanji = validate_kanji(kanji)
+        kanji_data = Kanji._fetch_many_kanji_data([kanji]).get(kanji)
+
+        if kanji_data is None:
+            raise Exception(f"No data found for kanji '{kanji}'.")
+
+        return kanji_data # Return the fetched data for use in constructing the Kanji object
+
+    @staticmethod
+    def _fetch_many_kanji_data(kanji_chars: list[str], limiter: TokenBucket | None = None, api_url: str | None = None,
+                               deadline: float | None = None, on_page: Callable[[dict[str, dict]], None] | None = None) -> dict[str, dict]:
+        """
+        Fetches data for several kanji from the WaniKani API in as few requests as possible
+        (FETCH_BATCH_SIZE slugs per request, following pagination), and stores it locally in one transaction.
+        Kanji WaniKani doesn't know are left out of the result.
+
+        :param limiter: Optional rate limiter, a token is taken before every request.
+        :param api_url: Subjects endpoint to use instead of API_URL.
+        :param deadline: Seconds each request may take, retries included. Defaults to DEADLINE_SECONDS.
+        :param on_page: Called with the kanji found in each page of results, as soon as it arrives.
+        """
+
         CHECK_KEY() # Ensure API key is set
 
-        kanji = validate_kanji(kanji)
+        kanji_chars = list(dict.fromkeys(validate_kanji(kanji) for kanji in kanji_chars)) # Unique, validated
+        fetched: dict[str, dict] = {}
+        subject_ids: dict[str, int] = {} # Kept in the store for the kanji graph (see kanji_graph)
 
-        response = requests.get(
-            API_URL,
-            headers={"Authorization": f"Bearer {WANIKANI_API_KEY}"},
-            params={"types": "kanji", "slugs": kanji},  # safer than URL formatting
-            timeout=10
-        )
+        for start in range(0, len(kanji_chars), FETCH_BATCH_SIZE):
+            chunk = kanji_chars[start:start + FETCH_BATCH_SIZE]
+            url: str | None = api_url or API_URL
+            params: dict | None = {"types": "kanji", "slugs": ",".join(chunk)} # safer than URL formatting
 
-        if not response.ok:
-            raise Exception(f"Kanji request failed ({response.status_code}) for '{kanji}'.")
+            while url:
+                # Pooled connection, transient failures are retried (raises WaniKaniError otherwise)
+                data = get_client().get(url, params=params, deadline=deadline, limiter=limiter)
 
-        data = response.json()
+                # Extract the actual kanji data dictionary from each subject object
+                page: dict[str, dict] = {}
+                for subject in data.get("data", []):
+                    kanji_data = subject.get("data", {})
+                    kanji = kanji_data.get("slug") or kanji_data.get("characters")
+                    if kanji in chunk:
+                        page[kanji] = kanji_data
+                        if isinstance(subject.get("id"), int): subject_ids[kanji] = subject["id"]
+                fetched.update(page)
+                if page and on_page is not None: on_page(page)
 
-        if "data" not in data or not data["data"]:
-            raise Exception(f"No data found for kanji '{kanji}'.")
+                url = (data.get("pages") or {}).get("next_url") # Full URL of the next page, None on the last page
+                params = None # next_url already carries the filters
 
-        # Extract the first subject object
-        subject = data["data"][0]
+        if fetched:
+            get_store().put_many(fetched, subject_ids) # Atomic upsert, safe with several workers fetching at once
 
-        # Extract the actual kanji data dictionary
-        kanji_data = subject["data"]
+        not_found = [kanji for kanji in kanji_chars if kanji not in fetched]
+        if not_found:
+            get_store().mark_not_found(not_found, NOT_FOUND_SECONDS) # Don't ask WaniKani again for a while
 
-        file_path = DATA_DIRECTORY / f"{kanji}.json"
-        with open(file_path, "w", encoding="utf-8") as file:
-            json.dump(kanji_data, file, ensure_ascii=False, indent=4)
+        return fetched
 
-        return kanji_data # Return the fetched data for use in constructing the Kanji object
+    @staticmethod
+    def fetch_many(kanji_chars: list[str], on_fetched: Callable[[dict[str, "Kanji"]], None] | None = None) -> dict[str, "Kanji"]:
+        """
+        Fetches several kanji from the WaniKani API (see `_fetch_many_kanji_data`) and returns them as Kanji objects.
+        Kanji WaniKani doesn't know are left out. `on_fetched` is called with each page of kanji this thread fetches,
+        as it arrives, e.g. to stream them. Kanji fetched by other callers are only in the result.
+
+        Only one fetch per kanji is in flight at a time: callers in this process wait for the thread already
+        fetching it, and other workers wait for the worker holding its lease in the kanji store.
+        Characters WaniKani recently didn't know are left out without asking it again.
+        """
+        kanji_chars = [validate_kanji(kanji) for kanji in kanji_chars]
+        if _snapshot is not None:
+            return {kanji: _snapshot.kanji[kanji] for kanji in kanji_chars if kanji in _snapshot.kanji} # Offline, nothing to fetch
+        not_found = get_store().not_found(kanji_chars)
+        kanji_chars = [kanji for kanji in kanji_chars if kanji not in not_found]
+        if not kanji_chars:
+            return {}
+        results = _in_flight.do_many(kanji_chars, lambda owned: Kanji._fetch_leased(owned, on_fetched), timeout=2 * LEASE_SECONDS) # Owner may itself wait on another worker
+        return {kanji: record for kanji, record in results.items() if record is not None}
+
+    @staticmethod
+    def _fetch_leased(kanji_chars: list[str], on_fetched: Callable[[dict[str, "Kanji"]], None] | None = None) -> dict[str, "Kanji"]:
+        """ Fetches the kanji this worker can lease, and waits for other workers to store the rest. """
+        store = get_store()
+        owner = f"{os.getpid()}:{threading.get_ident()}"
+        leased = store.acquire_leases(kanji_chars, owner, LEASE_SECONDS)
+
+        def fetched_page(page: dict[str, dict]) -> None:
+            now = time.time()
+            on_fetched({kanji: Kanji(kanji, data, encode_record(data)[1], now) for kanji, data in page.items()}) # type: ignore -> Only passed when set
+
+        try:
+            entries = store.records(kanji_chars) # Another worker may have stored some just before the leases were taken
+            fetch = [kanji for kanji in leased if kanji not in entries]
+            if fetch:
+                pages = Kanji._fetch_many_kanji_data(fetch, on_page=fetched_page if on_fetched is not None else None)
+                for kanji, data in pages.items():
+                    entries[kanji] = (data, encode_record(data)[1], time.time())
+        finally:
+            store.release_leases(leased, owner)
+
+        # Wait for kanji leased by other workers, until they are stored or their leases are released or expire
+        others = [kanji for kanji in kanji_chars if kanji not in entries and kanji not in leased]
+        delay = 0.05
+        while others and store.leased(others):
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+            entries.update(store.records(others))
+            others = [kanji for kanji in others if kanji not in entries]
+        entries.update(store.records(others))
+
+        found = {}
+        for kanji, entry in entries.items():
+            record = found[kanji] = Kanji(kanji, *entry)
+            _records.put(kanji, None, record)
+        return found
 
     @staticmethod
     def get_kanji(kanji: str) -> "Kanji":
         """
         Retrieves a Kanji object, fetching data if not cached.
+        The object is shared with other callers, so it must not be modified.
         """
 
         kanji = validate_kanji(kanji) # Set kanji to validated character
-        file_path = DATA_DIRECTORY / f"{kanji}.json"
-
-        # Check if the kanji data is already cached locally.
-        if Kanji.is_cache_available(kanji):
-            # If cached, load the data from the local JSON file.
-            with open(file_path, "r", encoding="utf-8") as file:
-                data = json.load(file)
-        else:
+
+        if _snapshot is not None:
+            # Offline: only the snapshot is consulted
+            record = _snapshot.kanji.get(kanji)
+            if record is None:
+                raise Exception(f"No data found for kanji '{kanji}' in the offline snapshot.")
+            return record
+
+        record = _records.get(kanji, None) # Parsed object from memory
+        if record is not None:
+            if record.is_stale: Kanji.refresh_later([kanji]) # Served as is, refreshed in the background
+            return record
+
+        # Check if the kanji data is already cached locally (one query, no file I/O).
+        entry = get_store().records([kanji]).get(kanji)
+        if entry is None:
             # If not cached, fetch the data from the WaniKani API and save it locally.
-            data = Kanji._fetch_kanji_data(kanji)
+            # Concurrent lookups of the same kanji share one fetch (see `fetch_many`).
+            record = Kanji.fetch_many([kanji]).get(kanji)
+            if record is None:
+                raise Exception(f"No data found for kanji '{kanji}'.")
+            return record
 
-        return Kanji(kanji, data)
+        record = Kanji(kanji, *entry)
+        _records.put(kanji, None, record)
+        if record.is_stale: Kanji.refresh_later([kanji])
+        return record
+
+    @staticmethod
+    def get_cached(kanji_chars: list[str]) -> dict[str, "Kanji"]:
+        """
+        Returns Kanji objects for every locally cached kanji in the list. Kanji not yet in memory are read in a single query.
+        Invalid and uncached characters are left out, so callers can fetch or skip them.
+        """
+        if _snapshot is not None:
+            return {kanji: _snapshot.kanji[kanji] for kanji in kanji_chars if kanji in _snapshot.kanji}
+
+        found: dict[str, Kanji] = {}
+        missing = []
+        for kanji in kanji_chars:
+            try:
+                kanji = validate_kanji(kanji)
+            except ValueError:
+                continue
+            record = _records.get(kanji, None)
+            if record is not None:
+                found[kanji] = record
+            else:
+                missing.append(kanji)
+
+        if missing:
+            for kanji, entry in get_store().records(missing).items():
+                record = found[kanji] = Kanji(kanji, *entry)
+                _records.put(kanji, None, record)
+
+        stale = [kanji for kanji, record in found.items() if record.is_stale]
+        if stale: Kanji.refresh_later(stale) # Served as is, refreshed in the background
+        return found
+
+    @staticmethod
+    def refresh_later(kanji_chars: list[str]) -> None:
+        """
+        Queues stale kanji to be fetched again from WaniKani on a background thread, so requests keep getting
+        the cached records meanwhile. Does nothing without an API key, or for kanji already queued in this process.
+        """
+        global _refresher
+        if WANIKANI_API_KEY is None or _snapshot is not None:
+            return
+        with _refresh_lock:
+            queued = [kanji for kanji in kanji_chars if kanji not in _refreshing]
+            if not queued:
+                return
+            _refreshing.update(queued)
+            if _refresher is None:
+                _refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kanji-refresh")
+        _refresher.submit(Kanji.refresh, queued)
+
+    @staticmethod
+    def refresh(kanji_chars: list[str]) -> dict[str, "Kanji"]:
+        """
+        Fetches stale kanji again from WaniKani and replaces their cached records. Kanji another worker is refreshing,
+        or has refreshed meanwhile, are only reloaded from the store. WaniKani failures leave the cached records in place,
+        other errors are logged.
+        Returns the kanji that were fetched.
+        """
+        store = get_store()
+        owner = f"{os.getpid()}:{threading.get_ident()}"
+        refreshed: dict[str, Kanji] = {}
+        try:
+            leased = store.acquire_leases(kanji_chars, owner, LEASE_SECONDS)
+            try:
+                entries = store.records(kanji_chars)
+                gone = store.not_found(leased) # WaniKani recently had nothing newer, keep the cached records for now
+                stale = [kanji for kanji in leased if kanji in entries and kanji not in gone and time.time() - entries[kanji][2] > REFRESH_AFTER_SECONDS]
+                for kanji, entry in entries.items():
+                    if kanji not in stale: _records.put(kanji, None, Kanji(kanji, *entry)) # Already refreshed by another worker
+                if stale:
+                    now = time.time()
+                    for kanji, data in Kanji._fetch_many_kanji_data(stale).items():
+                        record = refreshed[kanji] = Kanji(kanji, data, encode_record(data)[1], now)
+                        _records.put(kanji, None, record)
+            finally:
+                store.release_leases(leased, owner)
+        except WaniKaniError:
+            pass # WaniKani is down or refused, keep serving the stale records and the next lookup queues them again
+        except Exception:
+            logger.exception(f"Failed to refresh kanji {''.join(kanji_chars)}.") # A bug or a store error, not an outage
+        finally:
+            with _refresh_lock:
+                _refreshing.difference_update(kanji_chars)
+        return refreshed
+
+    @staticmethod
+    def cache_digests(kanji_chars: list[str]) -> dict[str, str]:
+        """ Returns the content hash of the cached data of each locally cached kanji in the list, e.g. for ETags. """
+        if _snapshot is not None:
+            return {kanji: _snapshot.kanji[kanji].digest for kanji in kanji_chars if kanji in _snapshot.kanji}
+
+        digests = {}
+        missing = []
+        for kanji in kanji_chars:
+            record = _records.get(kanji, None)
+            if record is not None and record.digest is not None:
+                digests[kanji] = record.digest
+            else:
+                missing.append(kanji)
+        if missing:
+            digests.update(get_store().digests(missing))
+        return digests
 
     @staticmethod
     def is_cache_available(kanji: str) -> bool:
         """ Checks if data for the specified kanji is already available locally. """
         kanji = validate_kanji(kanji) # Set kanji to validated character
-        file_path = DATA_DIRECTORY / f"{kanji}.json" # Construct the expected file path for the kanji data
-        return file_path.exists() # Return True if the file exists (cache is available), otherwise False
+        if _snapshot is not None:
+            return kanji in _snapshot
+        return kanji in get_store() # Return True if the kanji is in the store (cache is available), otherwise False
 
     @staticmethod
     def get_prescribed_kanji() -> list[tuple[str, KanjiType]]:
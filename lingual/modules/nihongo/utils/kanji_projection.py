@@ -0,0 +1,74 @@
+"""
+Projected kanji records for the JSON API.
+
+The stored WaniKani subject holds mnemonics, hints, related subject IDs and other fields the kanji page
+never shows. Responses only carry DEFAULT_FIELDS, with meanings and readings trimmed to the keys the page
+reads, in the same shape as the WaniKani data so clients can use either. Callers can ask for more fields with
+`?fields=level,meaning_mnemonic`, or for the whole record with `?fields=all`.
+
+Projections are kept in memory per record (validated by its content hash), so they are built once.
+Their ETags include `payload_version`, so a change to the projection or a different field set never reuses a cached response.
+"""
+
+import json
+import re
+from lingual.utils.render_cache import RenderCache
+from .kanji_processor import CACHE_SIZE, Kanji
+
+# Fields every response carries: what the kanji page shows
+DEFAULT_FIELDS = ("characters", "meanings", "readings", "document_url")
+ALL_FIELDS = "all" # `?fields=all` returns the whole record
+
+# Keys kept in each meaning and reading of a projected record
+MEANING_KEYS = ("meaning", "primary")
+READING_KEYS = ("reading", "type", "primary")
+
+PAYLOAD_FORMAT = 1 # Bump when the projection (keys kept, shape or encoding) changes
+
+MAX_FIELDS = 32 # Cap on the number of extra fields a caller may ask for
+FIELD_NAME = re.compile(r'^[a-z_]{1,40}$')
+
+_projected = RenderCache(maxsize=CACHE_SIZE, policy="lru") # (kanji, fields) -> projected record, stamped with the record's digest
+
+def parse_fields(value: str | None) -> tuple[str, ...] | None:
+    """
+    Parses a `fields` query parameter into the sorted fields to return, or None for the whole record.
+
+    :raises ValueError: If a field name is malformed or too many are given.
+    """
+    names = [name.strip() for name in (value or "").split(",") if name.strip()]
+    if ALL_FIELDS in names:
+        return None
+    if len(names) > MAX_FIELDS:
+        raise ValueError(f"At most {MAX_FIELDS} fields may be requested.")
+    for name in names:
+        if not FIELD_NAME.match(name):
+            raise ValueError(f"Invalid field name '{name}'.")
+    return tuple(sorted(set(DEFAULT_FIELDS).union(names)))
+
+def payload_version(fields: tuple[str, ...] | None) -> str:
+    """ Identifies the payload built for the given fields (see `parse_fields`), for ETags. """
+    return f"{PAYLOAD_FORMAT}:{ALL_FIELDS if fields is None else ','.join(fields)}"
+
+def project(kanji: Kanji, fields: tuple[str, ...] | None = DEFAULT_FIELDS) -> dict:
+    """ Returns the given fields of a kanji record (see `parse_fields`). Fields the record doesn't have are left out. """
+    if fields is None:
+        return kanji.data
+    return _projected.get_or_render((kanji.kanji_char, fields), kanji.digest, lambda: _build(kanji.data, fields))
+
+def _build(data: dict, fields: tuple[str, ...]) -> dict:
+    projected = {}
+    for field in fields:
+        if field not in data:
+            continue
+        value = data[field]
+        if field == "meanings":
+            value = [{key: meaning[key] for key in MEANING_KEYS if key in meaning} for meaning in value]
+        elif field == "readings":
+            value = [{key: reading[key] for key in READING_KEYS if key in reading} for reading in value]
+        projected[field] = value
+    return projected
+
+def encode(payload: dict) -> bytes:
+    """ Encodes a JSON response body compactly: no whitespace, and kana and kanji as UTF-8 rather than \\u escapes. """
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
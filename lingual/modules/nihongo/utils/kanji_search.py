@@ -0,0 +1,190 @@
+"""
+Search over the prescribed kanji by English meaning, kana reading or romaji.
+
+Built once from the cached WaniKani records into sorted key arrays, so a lookup is a binary search for the
+query prefix plus a scan of the matching keys, with no JSON scanned at request time. Keys are:
+
+- meanings: whole meanings and their single words ("one", "big", "bird"), from `meanings` and
+  whitelisted `auxiliary_meanings`,
+- readings: on'yomi, kun'yomi and nanori in hiragana (katakana queries are folded to hiragana),
+- romaji: the same readings in Hepburn romaji ("ichi", "hito").
+
+Results are ranked by what matched: exact over prefix, primary meanings and readings over the rest.
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from typing import Any, Iterable
+
+# Score of a match, by field. Prefix matches score half, less the number of untyped characters.
+FIELD_WEIGHTS = {
+    "primary_meaning": 10.0,
+    "meaning": 6.0,
+    "primary_reading": 6.0,
+    "reading": 4.0,
+    "meaning_word": 3.0,
+    "auxiliary_meaning": 2.0,
+}
+
+MAX_PREFIX_KEYS = 256 # Cap on the number of keys a prefix query may scan
+
+KANA_RE = re.compile(r'[぀-ヿ]')
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+# Hepburn romaji of hiragana. Digraphs (きゃ) are listed so they are matched before single characters.
+ROMAJI = {
+    **dict(zip("あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん",
+               "a i u e o ka ki ku ke ko sa shi su se so ta chi tsu te to na ni nu ne no ha hi fu he ho "
+               "ma mi mu me mo ya yu yo ra ri ru re ro wa o n".split())),
+    **dict(zip("がぎぐげござじずぜぞだぢづでどばびぶべぼぱぴぷぺぽゐゑぁぃぅぇぉゃゅょゎ",
+               "ga gi gu ge go za ji zu ze zo da ji zu de do ba bi bu be bo pa pi pu pe po "
+               "i e a i u e o ya yu yo wa".split())),
+    **{kana + small: romaji for kana, row in {
+        "き": "ky", "ぎ": "gy", "に": "ny", "ひ": "hy", "び": "by", "ぴ": "py", "み": "my", "り": "ry",
+        "し": "sh", "じ": "j", "ち": "ch",
+    }.items() for small, romaji in (("ゃ", row + "a"), ("ゅ", row + "u"), ("ょ", row + "o"))},
+}
+
+def to_hiragana(text: str) -> str:
+    """ Folds katakana to hiragana. """
+    return "".join(chr(ord(char) - 0x60) if "ァ" <= char <= "ヶ" else char for char in text)
+
+def kana_to_romaji(kana: str) -> str:
+    """ Converts hiragana (or katakana) to Hepburn romaji. Characters without a romanisation are dropped. """
+    kana = to_hiragana(kana)
+    romaji: list[str] = []
+    double = False # Small っ doubles the next consonant
+    position = 0
+    while position < len(kana):
+        char = kana[position]
+        pair = kana[position:position + 2]
+        if len(pair) == 2 and pair in ROMAJI:
+            syllable = ROMAJI[pair] # Digraph, e.g. きゃ
+            position += 2
+        else:
+            syllable = ROMAJI.get(char)
+            position += 1
+
+        if char == "っ":
+            double = True
+            continue
+        if char == "ー" and romaji:
+            romaji.append(romaji[-1][-1]) # Long vowel mark repeats the vowel
+            continue
+        if syllable is None:
+            continue
+        if double:
+            syllable = ("t" if syllable.startswith("ch") else syllable[0]) + syllable
+            double = False
+        romaji.append(syllable)
+    return "".join(romaji)
+
+def normalise(text: str) -> str:
+    """ Folds full-width letters, case and katakana, and drops reading punctuation (e.g. the "." in おお.きい). """
+    text = unicodedata.normalize("NFKC", text).strip().lower()
+    return to_hiragana(text).replace(".", "").replace("-", "").replace("^", "")
+
+class KanjiSearch:
+    """
+    Sorted-array index over kanji meanings and readings.
+
+    :param entries: Bundle entries (see `kanji_bundle.kanji_details`) keyed by kanji, plus the raw records for auxiliary meanings.
+    :param version: Version of the data this was built from, used to detect when to rebuild.
+    """
+
+    def __init__(self, entries: Iterable[tuple[str, dict, dict]], version: str = ""):
+        self.version = version
+        self._details: dict[str, dict] = {} # Kanji -> result payload
+        postings: dict[str, dict[str, float]] = {} # Key -> kanji -> best field weight
+
+        def add(key: str, kanji: str, field: str) -> None:
+            key = normalise(key)
+            if not key:
+                return
+            weight = FIELD_WEIGHTS[field]
+            matches = postings.setdefault(key, {})
+            if weight > matches.get(kanji, 0.0):
+                matches[kanji] = weight
+
+        for kanji, details, data in entries:
+            self._details[kanji] = {"kanji": kanji, "primary": details["primary"], "type": details["type"]}
+
+            for meaning in data.get("meanings", []):
+                text = meaning.get("meaning", "")
+                add(text, kanji, "primary_meaning" if meaning.get("primary") else "meaning")
+                for word in WORD_RE.findall(normalise(text)):
+                    add(word, kanji, "meaning_word")
+            for meaning in data.get("auxiliary_meanings", []):
+                if meaning.get("type") != "blacklist": # Blacklisted meanings are known wrong answers
+                    add(meaning.get("meaning", ""), kanji, "auxiliary_meaning")
+
+            for reading in data.get("readings", []):
+                field = "primary_reading" if reading.get("primary") else "reading"
+                text = reading.get("reading", "")
+                add(text, kanji, field)
+                add(kana_to_romaji(normalise(text)), kanji, field)
+
+        self._keys: list[str] = sorted(postings)
+        self._postings: list[dict[str, float]] = [postings[key] for key in self._keys]
+
+    def search(self, query: str, limit: int = 20) -> list[dict[str, Any]]:
+        """ Returns the kanji whose meanings or readings start with the query, best match first. """
+        query = normalise(query)
+        if not query:
+            return []
+        if not KANA_RE.search(query) and not WORD_RE.search(query):
+            # A kanji itself, e.g. pasted in: return it if indexed
+            return [{**self._details[query], "score": 100.0}] if query in self._details else []
+
+        scores: dict[str, float] = {}
+        start = bisect_left(self._keys, query)
+        for position in range(start, min(start + MAX_PREFIX_KEYS, len(self._keys))):
+            key = self._keys[position]
+            if not key.startswith(query):
+                break
+            exact = len(key) == len(query)
+            for kanji, weight in self._postings[position].items():
+                score = weight if exact else weight / 2 - (len(key) - len(query)) * 0.01 # Closer prefixes rank higher
+                if score > scores.get(kanji, 0.0):
+                    scores[kanji] = score
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [{**self._details[kanji], "score": round(score, 4)} for kanji, score in ranked[:limit]]
+
+    def __len__(self) -> int:
+        return len(self._details)
+
+_search: KanjiSearch | None = None
+_checked = 0.0 # time.monotonic() when the index was last checked against the cached data
+_lock = threading.Lock()
+
+def get_search() -> KanjiSearch:
+    """
+    Returns the search index of the prescribed kanji, rebuilt when their cached data changes.
+    The data is checked at most every INDEX_CHECK_SECONDS, so most searches don't hash the prescribed list.
+    """
+    global _search, _checked
+    from .kanji_bundle import kanji_details, prescribed_version
+    from .kanji_processor import INDEX_CHECK_SECONDS, Kanji
+
+    search = _search
+    if search is not None and time.monotonic() - _checked < INDEX_CHECK_SECONDS:
+        return search
+
+    version = prescribed_version()
+    _checked = time.monotonic()
+    if search is not None and search.version == version:
+        return search
+
+    with _lock:
+        if _search is None or _search.version != version:
+            prescribed = Kanji.get_prescribed_kanji()
+            records = Kanji.get_cached([kanji for kanji, _ in prescribed])
+            _search = KanjiSearch(
+                ((kanji, kanji_details(records[kanji], kanji_type.name), records[kanji].data) for kanji, kanji_type in prescribed if kanji in records),
+                version=version
+            )
+        return _search
@@ -0,0 +1,113 @@
+"""
+Versioned snapshot of the kanji data, for running without WaniKani.
+
+`flask kanji export` writes every record of the kanji store (with its content hash and subject ID) into one
+JSON file, and `flask kanji import` loads such a file into a store. With `KANJI_OFFLINE` set, the app serves
+kanji only from the snapshot at `KANJI_SNAPSHOT_PATH`: it is read once at startup into an in-memory index, and
+WaniKani is never called. The snapshot's version is a hash of its records, so identical data always gives
+the same version (and the same results, e.g. for benchmarks).
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from .kanji_store import KanjiStore, encode_record
+
+SNAPSHOT_FORMAT = 1 # Bump when the snapshot layout changes, older snapshots are then rejected
+
+class KanjiSnapshot:
+    """
+    Read-only, in-memory kanji records loaded from a snapshot file.
+
+    :param records: Kanji to snapshot entry ({"data", "digest", "subject_id"}).
+    :param version: Version of the snapshot.
+    """
+
+    def __init__(self, records: dict[str, dict], version: str):
+        from .kanji_processor import Kanji
+        self.version = version
+        self.kanji = {character: Kanji(character, entry["data"], entry["digest"]) for character, entry in records.items()}
+        self.subject_ids = {character: entry.get("subject_id") for character, entry in records.items()}
+
+    def __len__(self) -> int:
+        return len(self.kanji)
+
+    def __contains__(self, character: str) -> bool:
+        return character in self.kanji
+
+    def all_records(self) -> dict[str, tuple[dict, int | None]]:
+        """ Same shape as `KanjiStore.all_records`, for building the kanji graph. """
+        return {character: (kanji.data, self.subject_ids.get(character)) for character, kanji in self.kanji.items()}
+
+def snapshot_version(records: dict[str, dict]) -> str:
+    """ Hash of the records' content hashes, identical for identical data. """
+    return hashlib.sha256(json.dumps(sorted((character, entry["digest"]) for character, entry in records.items())).encode("utf-8")).hexdigest()[:16]
+
+def read_snapshot(path: Path | str) -> dict | None:
+    """ Reads a snapshot file. Returns None if it doesn't exist or was written with another format. """
+    path = Path(path)
+    if not path.exists():
+        return None
+
+    with path.open("r", encoding="utf-8") as file:
+        snapshot = json.load(file)
+
+    if snapshot.get("format") != SNAPSHOT_FORMAT:
+        return None
+    return snapshot
+
+def export_snapshot(store: KanjiStore, path: Path | str) -> dict:
+    """ Writes every record of the store to a snapshot file, atomically. Returns the snapshot written. """
+    records = {}
+    for character, (data, subject_id) in store.all_records().items():
+        records[character] = {"data": data, "digest": encode_record(data)[1], "subject_id": subject_id}
+
+    snapshot = {"format": SNAPSHOT_FORMAT, "version": snapshot_version(records), "kanji": records}
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f"{path.name}.tmp")
+    with temp_path.open("w", encoding="utf-8") as file:
+        json.dump(snapshot, file, ensure_ascii=False, sort_keys=True, separators=(",", ":")) # Deterministic, same data gives the same file
+    os.replace(temp_path, path)
+    return snapshot
+
+def import_snapshot(store: KanjiStore, snapshot: dict) -> int:
+    """ Writes the records of a snapshot into the store, replacing records that differ. Returns the number written. """
+    records = snapshot["kanji"]
+    current = store.digests(records)
+    changed = {character: entry for character, entry in records.items() if current.get(character) != entry["digest"]}
+    if changed:
+        store.put_many(
+            {character: entry["data"] for character, entry in changed.items()},
+            {character: entry["subject_id"] for character, entry in changed.items() if entry.get("subject_id")}
+        )
+    return len(changed)
+
+def read_verified_snapshot(path: Path | str) -> dict:
+    """
+    Reads a snapshot file, checking every record against its content hash.
+
+    :raises ValueError: If the file is missing, has another format or a record was modified.
+    """
+    snapshot = read_snapshot(path)
+    if snapshot is None:
+        raise ValueError(f"No kanji snapshot (format {SNAPSHOT_FORMAT}) at '{path}'. Create one with `flask kanji export`.")
+    for character, entry in snapshot["kanji"].items():
+        if encode_record(entry["data"])[1] != entry["digest"]:
+            raise ValueError(f"Kanji snapshot record '{character}' doesn't match its hash.")
+    return snapshot
+
+def load_snapshot(path: Path | str) -> KanjiSnapshot:
+    """ Loads a snapshot file into memory (see `read_verified_snapshot`). """
+    snapshot = read_verified_snapshot(path)
+    return KanjiSnapshot(snapshot["kanji"], snapshot["version"])
+
+def init_app(app):
+    # Serve kanji only from the snapshot when offline mode is configured
+    from . import kanji_processor
+    if not app.config.get("KANJI_OFFLINE"):
+        return
+    snapshot = load_snapshot(app.config["KANJI_SNAPSHOT_PATH"]) # Fail at startup rather than on the first lookup
+    kanji_processor.use_snapshot(snapshot)
+    app.logger.info(f"Kanji offline mode: serving {len(snapshot)} kanji from snapshot {snapshot.version}.")
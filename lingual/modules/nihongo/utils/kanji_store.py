@@ -0,0 +1,255 @@
+"""
+Single SQLite store for cached WaniKani kanji subjects.
+
+Replaces one pretty-printed JSON file per character: a lookup is one indexed query instead of a stat, an open
+and a JSON parse, and a batch of kanji is read with a single query. Writes are atomic upserts, so several
+workers can cache kanji at the same time without losing each other's rows.
+
+The per-character files shipped in data/kanji are imported on first use (see `KanjiStore.migrate`),
+so a fresh checkout starts with every prescribed kanji cached.
+
+Leases (`acquire_leases`) let one worker fetch a kanji from WaniKani while others wait for its row.
+Characters WaniKani doesn't know are remembered for a while (`mark_not_found`), so they aren't looked up on every request.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+
+SQLITE_MAX_VARIABLES = 500 # Characters per IN (...) query, below SQLite's bound parameter limit
+
+def encode_record(data: dict) -> tuple[str, str]:
+    """ Returns the compact JSON text of a kanji record and its content hash. """
+    text = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return text, hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+class KanjiStore:
+    """
+    Kanji records keyed by character, in a SQLite file.
+
+    :param path: SQLite database file. Created if it doesn't exist.
+    :param seed_directory: Directory of per-character JSON files to import on first use, or None.
+    """
+
+    def __init__(self, path: Path | str, seed_directory: Path | str | None = None):
+        self.path = Path(path)
+        self.seed_directory = Path(seed_directory) if seed_directory else None
+        self._local = threading.local()
+        self._seeded = False
+        self._seed_lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS kanji ("
+                "character TEXT PRIMARY KEY, "
+                "data TEXT NOT NULL, "   # Compact JSON of the WaniKani subject data
+                "digest TEXT NOT NULL, " # Content hash of data, for ETags
+                "updated REAL NOT NULL, " # When the record was last written (epoch seconds)
+                "subject_id INTEGER)"    # WaniKani subject ID, NULL for records imported from files without one
+            )
+            if "subject_id" not in {row[1] for row in connection.execute("PRAGMA table_info(kanji)")}:
+                connection.execute("ALTER TABLE kanji ADD COLUMN subject_id INTEGER") # Stores created before subject IDs were kept
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS kanji_leases (" # Kanji being fetched from WaniKani right now, by any worker
+                "character TEXT PRIMARY KEY, "
+                "owner TEXT NOT NULL, "   # Process and thread holding the lease
+                "expires REAL NOT NULL)"  # Epoch seconds, after which the lease may be taken over
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS kanji_not_found (" # Characters WaniKani had no subject for
+                "character TEXT PRIMARY KEY, "
+                "expires REAL NOT NULL)" # Epoch seconds, after which WaniKani may be asked again
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """ Returns this thread's connection, opening it on first use (or after a fork). """
+        connection = getattr(self._local, "connection", None)
+        if connection is None or getattr(self._local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None) # Autocommit, transactions are explicit
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _db(self) -> sqlite3.Connection:
+        """ Returns this thread's connection, importing the seed files first if that hasn't happened yet in this process. """
+        if not self._seeded and self.seed_directory is not None:
+            with self._seed_lock:
+                if not self._seeded:
+                    self.migrate(self.seed_directory)
+                    self._seeded = True
+        return self._connect()
+
+    def get(self, character: str) -> dict | None:
+        """ Returns the cached record of a kanji, or None if it isn't cached. """
+        row = self._db().execute("SELECT data FROM kanji WHERE character = ?", (character,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, characters: Iterable[str]) -> dict[str, dict]:
+        """ Returns the cached records of the given kanji, in one query per 500 characters. Uncached kanji are left out. """
+        return {character: json.loads(data) for character, data in self._select("character, data", characters)}
+
+    def records(self, characters: Iterable[str]) -> dict[str, tuple[dict, str, float]]:
+        """ Like `get_many`, but returns each record with its content hash and when it was written (epoch seconds). """
+        return {
+            character: (json.loads(data), digest, updated)
+            for character, data, digest, updated in self._select("character, data, digest, updated", characters)
+        }
+
+    def digests(self, characters: Iterable[str]) -> dict[str, str]:
+        """ Returns the content hashes of the cached records of the given kanji. Uncached kanji are left out. """
+        return dict(self._select("character, digest", characters))
+
+    def _select(self, columns: str, characters: Iterable[str], table: str = "kanji") -> list[tuple]:
+        characters = list(dict.fromkeys(characters))
+        connection = self._db()
+        rows = []
+        for start in range(0, len(characters), SQLITE_MAX_VARIABLES):
+            chunk = characters[start:start + SQLITE_MAX_VARIABLES]
+            rows.extend(connection.execute(
+                f"SELECT {columns} FROM {table} WHERE character IN ({', '.join('?' * len(chunk))})",
+                chunk
+            ))
+        return rows
+
+    def __contains__(self, character: str) -> bool:
+        return self._db().execute("SELECT 1 FROM kanji WHERE character = ?", (character,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._db().execute("SELECT COUNT(*) FROM kanji").fetchone()[0]
+
+    def characters(self) -> list[str]:
+        """ Returns every cached kanji. """
+        return [row[0] for row in self._db().execute("SELECT character FROM kanji ORDER BY character")]
+
+    def all_records(self) -> dict[str, tuple[dict, int | None]]:
+        """ Returns every cached record with its WaniKani subject ID (None if unknown), in one query. """
+        rows = self._db().execute("SELECT character, data, subject_id FROM kanji ORDER BY character")
+        return {character: (json.loads(data), subject_id) for character, data, subject_id in rows}
+
+    def subject_ids(self, characters: Iterable[str]) -> dict[str, int]:
+        """ Returns the WaniKani subject IDs of the given cached kanji. Kanji without a known ID are left out. """
+        return {character: subject_id for character, subject_id in self._select("character, subject_id", characters) if subject_id is not None}
+
+    def version(self) -> str:
+        """ Changes whenever a record is added or rewritten. Cheap: one aggregate query. """
+        count, updated = self._db().execute("SELECT COUNT(*), MAX(updated) FROM kanji").fetchone()
+        return f"{count}:{updated}"
+
+    def put(self, character: str, data: dict) -> str:
+        """ Inserts or replaces the record of a kanji. Returns its content hash. """
+        return self.put_many({character: data})[character]
+
+    def put_many(self, records: dict[str, dict], subject_ids: dict[str, int] | None = None) -> dict[str, str]:
+        """
+        Inserts or replaces several records in one transaction. Returns their content hashes.
+
+        :param subject_ids: WaniKani subject IDs of the records, if known. A known ID is kept when a record is replaced without one.
+        """
+        now = time.time()
+        subject_ids = subject_ids or {}
+        rows = [(character, *encode_record(data), now, subject_ids.get(character)) for character, data in records.items()]
+        connection = self._db()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                "INSERT INTO kanji (character, data, digest, updated, subject_id) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (character) DO UPDATE SET data = excluded.data, digest = excluded.digest, updated = excluded.updated, "
+                "subject_id = COALESCE(excluded.subject_id, kanji.subject_id)",
+                rows
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return {row[0]: row[2] for row in rows}
+
+    def acquire_leases(self, characters: Iterable[str], owner: str, ttl: float) -> list[str]:
+        """
+        Claims the right to fetch the given kanji, so other workers wait for this one instead of fetching them too.
+        Leases held by others are skipped unless expired. Returns the kanji leased to `owner`.
+        """
+        now = time.time()
+        characters = list(dict.fromkeys(characters))
+        connection = self._db()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                "INSERT INTO kanji_leases (character, owner, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT (character) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+                "WHERE kanji_leases.expires <= ?", # Take over expired leases only
+                [(character, owner, now + ttl, now) for character in characters]
+            )
+            leased = {row[0] for row in connection.execute("SELECT character FROM kanji_leases WHERE owner = ?", (owner,))}
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return [character for character in characters if character in leased]
+
+    def release_leases(self, characters: Iterable[str], owner: str) -> None:
+        """ Releases leases held by `owner`. """
+        self._db().executemany(
+            "DELETE FROM kanji_leases WHERE character = ? AND owner = ?",
+            [(character, owner) for character in characters]
+        )
+
+    def leased(self, characters: Iterable[str]) -> set[str]:
+        """ Returns the kanji with an unexpired lease, i.e. being fetched by some worker. """
+        now = time.time()
+        return {row[0] for row in self._select("character, expires", characters, table="kanji_leases") if row[1] > now}
+
+    def mark_not_found(self, characters: Iterable[str], ttl: float) -> None:
+        """ Remembers for `ttl` seconds that WaniKani has no subject for the given characters. """
+        expires = time.time() + ttl
+        self._db().executemany(
+            "INSERT INTO kanji_not_found (character, expires) VALUES (?, ?) "
+            "ON CONFLICT (character) DO UPDATE SET expires = excluded.expires",
+            [(character, expires) for character in characters]
+        )
+
+    def not_found(self, characters: Iterable[str]) -> set[str]:
+        """ Returns the characters WaniKani recently had no subject for (see `mark_not_found`). """
+        now = time.time()
+        return {row[0] for row in self._select("character, expires", characters, table="kanji_not_found") if row[1] > now}
+
+    def migrate(self, directory: Path | str) -> int:
+        """
+        Imports per-character JSON files (e.g. data/kanji/一.json) that aren't in the store yet.
+        A file holds either the record or the whole WaniKani subject ({"id", "object", "data"}), whose ID is then kept.
+        Records already in the store are kept. Returns the number of kanji imported.
+        """
+        files = {path.stem: path for path in Path(directory).glob("*.json") if len(path.stem) == 1} # Skips prescribed_kanji.json
+        connection = self._connect()
+        cached = {row[0] for row in connection.execute("SELECT character FROM kanji")}
+        missing = [character for character in files if character not in cached]
+        if not missing:
+            return 0
+
+        now = time.time()
+        rows = []
+        for character in missing:
+            with files[character].open("r", encoding="utf-8") as file:
+                record = json.load(file)
+            subject_id = None
+            if "object" in record and isinstance(record.get("data"), dict): # Whole subject, as returned by the API
+                subject_id = record.get("id") if isinstance(record.get("id"), int) else None
+                record = record["data"]
+            rows.append((character, *encode_record(record), now, subject_id))
+
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Another worker may have imported or fetched some of these meanwhile, keep its rows
+            imported = connection.executemany("INSERT OR IGNORE INTO kanji (character, data, digest, updated, subject_id) VALUES (?, ?, ?, ?, ?)", rows).rowcount
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return imported
@@ -4,8 +4,8 @@ from pathlib import Path
 from typing import Any
 
 import bleach
-import markdown
 
+from lingual.utils.markdown_pool import render_markdown
 from lingual.utils.tiles_utils import TileSection
 
 SIMPLE_MD_EXTENSIONS = [ # Basic markdown extensions for simple formatting in particle notes
@@ -106,7 +106,7 @@ class ParticleTilesProcessor:
     def _render_markdown(self, content: str) -> str:
         """ Basic markdown rendering with bleach sanitisation to ensure safe HTML output for particle notes. """
         # TODO: Use lesson processor transformers for consistency and greater rendering capabilities (e.g. furigana support)
-        html = markdown.markdown(content, extensions=SIMPLE_MD_EXTENSIONS, output_format="html")
+        html = render_markdown(content, extensions=SIMPLE_MD_EXTENSIONS, output_format="html") # Pooled converter, shared with the lesson processors
         return bleach.clean(
             html,
             tags=SAFE_TAGS,
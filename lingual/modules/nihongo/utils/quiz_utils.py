@@ -1,23 +1,14 @@
-import json
 import random
-from pathlib import Path
 from flask import url_for
 from lingual.modules.nihongo.forms import GrammarQuizConfigForm, KanjiQuizConfigForm
 from lingual.utils import quiz_manager
 from .grammar_lesson_processor import get_processor
 
 def load_quiz_data(lesson_slug: str) -> dict | None:
-    base_dir = Path(get_processor().data_root) / "quizzes"
-    path = base_dir / f"{lesson_slug}.json"
-
-    if not path.exists():
-        # If the quiz data file doesn't exist for the given lesson slug, return None to indicate no quiz data is available
-        return None
-
-    with path.open("r", encoding="utf-8") as f: # Open the quiz data file for the specified lesson slug
-        data = json.load(f) # Load the quiz data from the JSON file into a Python dictionary
-
-    return get_processor().transform_data(data) # Apply any necessary transformations to the quiz data using the lesson processor's transformers (e.g. furigana transformation)
+    # Returns the transformed quiz data (e.g. furigana) for the lesson slug, or None if no quiz data is available.
+    # Served from the processor's quiz bank cache (or the pre-built lesson bundle), shared with the quiz API endpoint.
+    # The returned data is shared between requests, so copy anything that is modified.
+    return get_processor().load_quiz_data(lesson_slug)
 
 def get_grammar_lesson_choices() -> list[tuple[str, str]]:
     """
@@ -35,28 +26,48 @@ def get_selected_grammar_lessons() -> list[str]:
     selected = [value for value, _ in choices] # Extract just the values (slugs) of the lessons
     return selected
 
-def build_grammar_quiz(lesson_slugs: list[str], max_questions: int) -> dict:
-    questions: list[dict] = []
-
-    for lesson_slug in lesson_slugs:
-        data = load_quiz_data(lesson_slug)
-        if not data:
-            continue
+def sample_grammar_quiz(lesson_slugs: list[str], max_questions: int, seed: int | None = None) -> dict:
+    """
+        Picks up to max_questions questions, spread evenly across the selected lessons, and returns a compact quiz session.
+        The session only holds the ordered question ids (see expand_grammar_quiz), so editing a quiz bank mid-quiz
+        never reshuffles it. Pass its seed back in to pick the same questions again.
+    """
+    if seed is None:
+        seed = random.getrandbits(32) # Random quiz, but recorded so it can be reproduced
+
+    refs = get_processor().questions.sample(lesson_slugs, max_questions, seed=seed)
+    return {
+        "seed": seed,
+        "lessons": list(dict.fromkeys(ref.lesson for ref in refs)), # Lessons the questions come from, to index them when expanding
+        "questions": [ref.id for ref in refs] # Ordered stable question ids
+    }
 
-        for group_id, group in data.items():
-            bank = group.get("bank", [])
-            for question in bank:
-                question_copy = dict(question) # Make a copy of the question dictionary to avoid mutating the original data
-                question_copy["source_lesson"] = lesson_slug
-                question_copy["source_group"] = group_id
-                questions.append(question_copy)
+def expand_grammar_quiz(quiz_session: dict) -> dict:
+    """
+        Expands a compact quiz session into the quiz data used by the quiz frontend, with a title and a bank of questions.
+        Questions removed or edited since the quiz was generated are left out, the others keep their order.
+    """
+    index = get_processor().questions
+    for lesson_slug in quiz_session.get("lessons", []):
+        index.questions(lesson_slug) # Ensure the lesson is indexed (another worker may have generated the quiz)
 
-    random.shuffle(questions) # Shuffle the questions to ensure a random order each time the quiz is generated
-    questions = questions[:max_questions] # Limit the number of questions to the specified maximum
+    questions: list[dict] = []
+    for question_id in quiz_session.get("questions", []):
+        ref = index.get(question_id)
+        question = index.resolve(ref) if ref is not None else None
+        if question is None:
+            continue # No longer in the quiz bank
+
+        question_copy = dict(question) # Make a copy of the question dictionary to avoid mutating the shared bank
+        question_copy["id"] = ref.id # type: ignore -> ref is set if question is
+        question_copy["source_lesson"] = ref.lesson # type: ignore
+        question_copy["source_group"] = ref.group # type: ignore
+        questions.append(question_copy)
 
     return { # Return the quiz data in the expected format for the quiz manager, with a title and a bank of questions
         "title": "Grammar Quiz",
-        "bank": questions
+        "bank": questions,
+        "seed": quiz_session.get("seed")
     }
 
 class NihongoQuizTypes(quiz_manager.TypeEnum):
@@ -0,0 +1,193 @@
+"""
+HTTP client for the WaniKani API.
+
+One pooled `requests.Session` is shared by every caller, so lookups after the first reuse an open
+TCP/TLS connection instead of paying for a new handshake. Transient failures (connection errors,
+429 and 5xx responses) are retried with exponential backoff, honouring `Retry-After`, until the
+call's deadline runs out. Latency and error counters are available from `stats()`.
+
+While WaniKani keeps failing, a circuit breaker rejects calls straight away instead of letting each one
+wait out its deadline. At most `max_concurrent` calls run at once: further calls wait for one to finish, within their deadline.
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any
+import requests
+from requests.adapters import HTTPAdapter
+from lingual.utils.circuit_breaker import OPEN, CircuitBreaker
+from lingual.utils.lesson_profiler import Histogram
+from lingual.utils.token_bucket import TokenBucket
+
+RETRY_STATUSES = {429, 500, 502, 503, 504} # Worth retrying: rate limited or upstream trouble
+API_REVISION = "20170710" # WaniKani API revision the app is written against
+
+class WaniKaniError(Exception):
+    """ Raised when a WaniKani request fails, after any retries. `status` is the last HTTP status, None if no response. """
+
+    def __init__(self, message: str, status: int | None = None):
+        super().__init__(message)
+        self.status = status
+
+class WaniKaniUnavailable(WaniKaniError):
+    """ Raised without calling WaniKani, while its circuit is open or when no call slot frees up within the deadline. """
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after # Seconds after which calls may be attempted again
+
+def retry_after_seconds(value: str | None) -> float | None:
+    """ Parses a Retry-After header (seconds or an HTTP date) into seconds from now. """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class WaniKaniClient:
+    """
+    Shared, retrying WaniKani client.
+
+    :param api_key: WaniKani API token.
+    :param pool_size: Connections kept open, should match the number of threads that may call at once.
+    :param deadline: Default seconds a call may take in total, retries and waits included.
+    :param connect_timeout: Upper bound for establishing a connection, within the deadline.
+    :param max_retries: Retries after the first attempt.
+    :param backoff: Base delay in seconds, doubled after every retry (with jitter) up to `max_backoff`.
+    :param max_concurrent: Calls allowed in progress at once, further calls wait for a slot. Defaults to `pool_size`.
+    :param breaker: Circuit breaker tracking WaniKani's health. Defaults to opening after 5 failed calls, for 30 seconds.
+    """
+
+    def __init__(self, api_key: str | None, pool_size: int = 10, deadline: float = 10.0, connect_timeout: float = 3.05,
+                 max_retries: int = 3, backoff: float = 0.5, max_backoff: float = 8.0, max_concurrent: int | None = None,
+                 breaker: CircuitBreaker | None = None):
+        self.deadline = deadline
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrent or pool_size)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size) # One host, pool_size connections to it
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Wanikani-Revision"] = API_REVISION
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+        # Counters
+        self._lock = threading.Lock()
+        self.latency = Histogram() # Per attempt
+        self.requests = 0 # Attempts, including retries
+        self.retries = 0
+        self.errors = 0 # Calls that failed after all retries
+        self.rejected = 0 # Calls refused because no slot freed up within their deadline
+        self.statuses: dict[int, int] = {}
+
+    def get(self, url: str, params: dict | None = None, deadline: float | None = None, limiter: TokenBucket | None = None) -> Any:
+        """
+        Sends a GET request and returns the decoded JSON body.
+
+        :param deadline: Seconds the whole call may take, instead of the client's default.
+        :param limiter: Optional rate limiter, a token is taken before every attempt.
+        :raises WaniKaniUnavailable: Without calling WaniKani, if its circuit is open or `max_concurrent` calls stay in progress past the deadline.
+        :raises WaniKaniError: On a non-retryable error response, or when retries or the deadline run out.
+        """
+        expires = time.monotonic() + (deadline if deadline is not None else self.deadline)
+        if self.breaker.state == OPEN:
+            raise WaniKaniUnavailable("WaniKani is unavailable, try again later.", retry_after=self.breaker.retry_after()) # Don't queue for a slot
+
+        if not self._slots.acquire(timeout=max(0.0, expires - time.monotonic())): # Wait for a call in progress to finish
+            with self._lock: self.rejected += 1
+            raise WaniKaniUnavailable("Too many WaniKani requests in progress.", retry_after=1.0)
+        try:
+            if not self.breaker.allow():
+                raise WaniKaniUnavailable("WaniKani is unavailable, try again later.", retry_after=self.breaker.retry_after())
+            try:
+                result = self._get(url, params, expires, limiter)
+            except WaniKaniError as e:
+                if e.status is None or e.status in RETRY_STATUSES:
+                    self.breaker.record_failure() # Unreachable, timed out or overloaded
+                else:
+                    self.breaker.record_success() # WaniKani answered, the request itself was refused
+                raise
+            except Exception:
+                self.breaker.record_failure() # E.g. an invalid response body
+                raise
+            self.breaker.record_success()
+            return result
+        finally:
+            self._slots.release()
+
+    def _get(self, url: str, params: dict | None, expires: float, limiter: TokenBucket | None) -> Any:
+        """ Sends the request, retrying transient failures until `expires` (time.monotonic()), see `get`. """
+        attempt = 0
+
+        while True:
+            remaining = expires - time.monotonic()
+            if remaining > 0 and limiter is not None:
+                # Don't wait for a token past the deadline
+                remaining = expires - time.monotonic() if limiter.acquire(timeout=remaining) is not None else 0
+            if remaining <= 0:
+                self._count_error()
+                raise WaniKaniError(f"WaniKani request to {url} exceeded its deadline.")
+
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=(min(self.connect_timeout, remaining), remaining))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(time.perf_counter() - start, None)
+                failure, status, wait = f"WaniKani request failed: {e}", None, None
+            else:
+                self._record(time.perf_counter() - start, response.status_code)
+                if response.ok:
+                    return response.json()
+                failure, status = f"WaniKani request failed ({response.status_code}).", response.status_code
+                if status not in RETRY_STATUSES:
+                    self._count_error()
+                    raise WaniKaniError(failure, status)
+                wait = retry_after_seconds(response.headers.get("Retry-After"))
+
+            # Retry after the server's requested wait, or exponential backoff with jitter
+            if wait is None:
+                wait = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+            if attempt >= self.max_retries or time.monotonic() + wait >= expires:
+                self._count_error()
+                raise WaniKaniError(failure, status)
+
+            attempt += 1
+            with self._lock: self.retries += 1
+            time.sleep(wait)
+
+    def _record(self, seconds: float, status: int | None) -> None:
+        with self._lock:
+            self.requests += 1
+            self.latency.add(seconds)
+            if status is not None:
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def _count_error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def stats(self) -> dict[str, Any]:
+        """ Returns the client counters, e.g. for logging or a debug page. """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "errors": self.errors,
+                "rejected": self.rejected,
+                "breaker": {"state": self.breaker.state, "trips": self.breaker.trips, "rejected": self.breaker.rejected},
+                "statuses": dict(self.statuses),
+                "latency": self.latency.to_dict(),
+            }
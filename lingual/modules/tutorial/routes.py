@@ -4,6 +4,7 @@ from flask import Blueprint, abort, current_app, flash, jsonify, redirect, rende
 from flask_login import current_user
 from lingual.modules.tutorial.utils import quiz_utils
 from lingual.modules.tutorial.utils.lessons_processor import get_processor
+from lingual.utils import http_cache
 from lingual.utils.languages import Languages
 
 # Blueprint for the Tutorial module, which provides routes for tutorial lessons and quizzes.
@@ -156,6 +157,13 @@ def lessons(slug=None):
     return render_template('tutorial-lesson-directory.html', lessons=lessons) # Render the lesson directory template
 
 
+@tutorial_bp.route('/lessons/api/search', methods=['GET'], strict_slashes=False)
+def lessons_search():
+    # Ranked search over the tutorial lessons, used by the lesson directory search box
+    query = request.args.get('q', '', type=str)[:100] # Cap query length
+    limit = max(1, min(request.args.get('limit', 50, type=int), 100)) # Clamp number of results
+    return jsonify({"query": query, "results": get_processor().search(query, limit=limit)})
+
 @tutorial_bp.route('/lessons/api/quiz/<lesson_slug>', methods=['GET'], strict_slashes=False)
 def get_quizzes(lesson_slug):
     # Validate slug to prevent directory traversal attacks
@@ -169,6 +177,13 @@ def get_quizzes(lesson_slug):
     if not os.path.realpath(path).startswith(os.path.realpath(base_dir)):
         abort(400, description="Invalid path.")
 
+    # Quiz data only depends on the quiz file (and the transforms, covered by the release id)
+    digest = get_processor().source_digest("quizzes", lesson_slug)
+    etag = http_cache.make_etag(http_cache.release_id(), digest) if digest else None
+    if etag:
+        cached = http_cache.not_modified(etag, private=False)
+        if cached: return cached
+
     try:
         data = quiz_utils.load_quiz_data(lesson_slug)
     except Exception:
@@ -177,7 +192,9 @@ def get_quizzes(lesson_slug):
     if not data:
         return jsonify({"error": "Quiz not found."}), 404
 
-    return jsonify(data) # Return the quiz data as JSON
+    response = jsonify(data) # Return the quiz data as JSON
+    if etag: http_cache.apply_cache_headers(response, etag, private=False)
+    return response
 
 @tutorial_bp.route('/lessons/api/audio', methods=['GET', 'OPTIONS'], strict_slashes=False)
 @tutorial_bp.route('/lessons/api/audio/', methods=['GET', 'OPTIONS'], strict_slashes=False)
@@ -3,52 +3,21 @@ document.addEventListener("DOMContentLoaded", () => {
     const searchInput = document.getElementById("lesson-search-input");
     const emptyBox = document.querySelector(".lesson-empty");
 
-    // Build searchable data from lesson items
-    const lessonsData = Array.from(items).map(item => { // Map DOM elements to data objects
-        const content = item.dataset.content || "";
-        const keywords = item.dataset.keywords || "";
-
-        // Objects include slug, title, summary, content, and the original element
-        return {
-            slug: item.dataset.slug,
-            title: item.dataset.title || "",
-            summary: item.dataset.summary || "",
-            content: content,
-            keywords: keywords,
-            element: item
-        };
-    });
+    // Search is ranked on the server (BM25 over title, keywords, summary and content),
+    // so the page only needs each lesson's slug. See lesson_search.py.
+    let searchController = null; // Aborts the previous search request when the query changes
 
-    const fuseOptions = {
-        // The weight attribute allows us to order results by possible relevance.
-        // Higher weight = more likely to be the intended match.
-        /* This is a very simple configuration, however, sufficient for the basic
-            searching of small lesson datasets. */
-
-        keys: [
-            { name: "title", weight: 2 }, // Title is the most important factor in search relevance
-            { name: "keywords", weight: 1.75 }, // Keywords are likely the romaji of important parts of a lesson, so they are also very important for relevance
-            { name: "summary", weight: 1.5 }, // Less important, but still very relevant as it gives a brief overview of the lesson content
-            { name: "content", weight: 1 } // Least important, as it may contain a lot of text that isn't directly relevant to the search query.
-        ],
-
-        // Fuzzy search allows for typos and partial matches to deliver a result.
-        // This means that users can find lessons even if they don't type the exact words present.
-
-        threshold: 0.6,              // 0.6 / 1 => Somewhat strict, restricts irrelevant results
-        ignoreLocation: true,        // Search entire string, not just beginning
-        minMatchCharLength: 1,       // Match single characters
-        includeScore: true,          // Include score within HTML. Required because we sort by score.
-        useExtendedSearch: false,    /* This settings allows for the use of special characters in the search
-                                        query for advanced searching (e.g. quotes for exact matches). This is
-                                        unnecessary due to how small the search grid is, thus it is disabled as
-                                        it unnecessarily makes the search slower. */
-        findAllMatches: false,       // Stops at the first match as we only need to know if it matches or not.
-        shouldSort: true             // Sorts by score / relevance
-    };
+    const fetchResults = async (query) => {
+        if (searchController) searchController.abort();
+        searchController = new AbortController();
 
-    // Initialize Fuse.js for fuzzy search on lessons
-    const fuse = new Fuse(lessonsData, fuseOptions);
+        const url = `${lessonSearchUrl}?q=${encodeURIComponent(query)}`;
+        const response = await fetch(url, { signal: searchController.signal });
+        if (!response.ok) throw new Error(`Search failed with status ${response.status}`);
+
+        const data = await response.json();
+        return data.results || [];
+    };
 
     // Add click event listeners to lesson items
     // If a lesson item is clicked, navigate to the lesson page.
@@ -95,10 +64,12 @@ document.addEventListener("DOMContentLoaded", () => {
         searchInput.addEventListener("input", (e) => {
             clearTimeout(debounceTimer);
 
-            debounceTimer = setTimeout(() => {
-                const query = e.target.value.trim(); // Get trimmed search query
+            debounceTimer = setTimeout(async () => {
+                const query = e.target.value.trimStart(); // Trailing space is kept, it marks the last word as complete
+
+                if (!query.trim()) {
+                    if (searchController) searchController.abort(); // Ignore any search still in flight
 
-                if (!query) {
                     // Reset to original order when search is empty
                     items.forEach(item => {
                         item.style.display = "";
@@ -113,23 +84,31 @@ document.addEventListener("DOMContentLoaded", () => {
                     return;
                 }
 
-                const results = fuse.search(query);
-                const resultMap = new Map(results.map(r => [r.item.slug, r.score || 1]));
+                let results;
+                try {
+                    results = await fetchResults(query);
+                } catch (err) {
+                    if (err.name === "AbortError") return; // Superseded by a newer query
+                    console.error(err);
+                    return; // Keep the current view if the search fails
+                }
+
+                // Results are sorted best first, so the rank is used as the display order
+                const resultMap = new Map(results.map((r, rank) => [r.slug, rank]));
 
                 // Show matching items with sorted order, hide others
                 items.forEach(item => {
                     const score = resultMap.get(item.dataset.slug);
                     if (score !== undefined) {
                         item.style.display = "";
-                        // Use score as order (multiply by 1000 for finer granularity)
-                        item.style.order = String(Math.floor(score * 1000));
+                        item.style.order = String(score); // Rank, best match first
                     } else {
                         item.style.display = "none";
                         item.style.order = "9999"; // Push non-matching items to the end (9999 is arbitrary large number)
                     }
                 });
 
-                // Sort categories by their best (lowest) score
+                // Sort categories by their best (lowest) rank
                 const separators = document.querySelectorAll(".lesson-category-separator");
 
                 separators.forEach(sep => {
@@ -141,8 +120,8 @@ document.addEventListener("DOMContentLoaded", () => {
                         .filter(score => score !== undefined);
 
                     if (visibleScores.length > 0) {
-                        const bestScore = Math.min(...visibleScores); // Best (lowest) score in this category
-                        sep.style.order = String(Math.floor(bestScore * 1000)); // Set order based on best score
+                        const bestScore = Math.min(...visibleScores); // Best (lowest) rank in this category
+                        sep.style.order = String(bestScore); // Set order based on best rank
                     } else {
                         sep.style.order = "9999"; // No matches in this category
                     }
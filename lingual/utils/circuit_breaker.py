@@ -0,0 +1,75 @@
+"""
+Circuit breaker, for failing fast while an upstream service is down.
+
+After `failure_threshold` consecutive failures the circuit opens and calls are rejected without
+being attempted. Once `reset_timeout` seconds have passed, one trial call is let through
+("half open"): its success closes the circuit, its failure opens it again.
+"""
+
+import threading
+import time
+
+CLOSED = "closed"       # Calls go through
+OPEN = "open"           # Calls are rejected
+HALF_OPEN = "half_open" # One trial call is in progress, others are rejected
+
+class CircuitBreaker:
+    """
+    Tracks the health of an upstream service. Callers ask `allow()` before a call and report its outcome.
+
+    :param failure_threshold: Consecutive failures that open the circuit.
+    :param reset_timeout: Seconds the circuit stays open before a trial call is allowed.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        if failure_threshold < 1:
+            raise ValueError("Circuit breaker failure threshold must be at least 1.")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened = 0.0 # time.monotonic() when the circuit last opened
+        self._lock = threading.Lock()
+
+        # Counters
+        self.trips = 0 # Times the circuit opened
+        self.rejected = 0 # Calls refused while open
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened >= self.reset_timeout:
+                return HALF_OPEN # A trial call would be allowed now
+            return self._state
+
+    def allow(self) -> bool:
+        """ Returns True if a call may be attempted. The caller must then report it with `record_success` or `record_failure`. """
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened >= self.reset_timeout:
+                self._state = HALF_OPEN # This caller makes the trial call
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state != OPEN and (self._state == HALF_OPEN or self._failures >= self.failure_threshold):
+                # Only a trip starts the reset timeout, late failures of calls made before it don't extend it
+                self.trips += 1
+                self._state = OPEN
+                self._opened = time.monotonic()
+
+    def retry_after(self) -> float:
+        """ Seconds until a trial call will be allowed, 0 if calls are allowed now. """
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened))
@@ -0,0 +1,283 @@
+"""
+Adds custom `flask` CLI commands for maintaining lesson content, quizzes and kanji data
+"""
+
+import json
+import time
+import click
+import frontmatter
+from flask.cli import AppGroup
+
+lessons_cli = AppGroup("lessons", help="Lesson content tools.")
+quizzes_cli = AppGroup("quizzes", help="Quiz tools.")
+kanji_cli = AppGroup("kanji", help="Kanji data tools.")
+
+def _iter_strings(data):
+    """ Yields every string in a nested JSON structure (quiz files). """
+    if isinstance(data, dict):
+        for value in data.values():
+            yield from _iter_strings(value)
+    elif isinstance(data, list):
+        for value in data:
+            yield from _iter_strings(value)
+    elif isinstance(data, str):
+        yield data
+
+def _time_per_pass(transform, texts: list[str], rounds: int) -> float:
+    """ Returns the average milliseconds taken to transform every text once. """
+    for text in texts: transform(text) # Warm up (compiles engine and regex caches)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            transform(text)
+    return (time.perf_counter() - start) / rounds * 1000
+
+@lessons_cli.command("benchmark")
+@click.option("--rounds", default=30, show_default=True, help="Number of passes over the corpus.")
+def benchmark_command(rounds: int):
+    """ Benchmarks apply_transforms against running every transformer unconditionally, on every lesson corpus (grammar and tutorial). """
+    from flask import current_app
+    from lingual.utils.lesson_bundle import get_lesson_processors
+
+    with current_app.test_request_context(): # Link transforms use url_for
+        for code, processor in get_lesson_processors().items():
+            lessons = [frontmatter.load(path).content for path in sorted((processor.data_root / "lessons").glob("*.md"))] # type: ignore
+            quizzes = []
+            for path in sorted((processor.data_root / "quizzes").glob("*.json")):
+                with path.open("r", encoding="utf-8") as f:
+                    quizzes.extend(_iter_strings(json.load(f)))
+
+            def run_all(text: str, transformers=processor.transformers) -> str:
+                for transform in transformers: # No marker check, as before apply_transforms had one
+                    text = transform(text)
+                return text
+
+            for name, texts in ((f"{code} lessons", lessons), (f"{code} quiz strings", quizzes)):
+                if not texts:
+                    continue
+                chars = sum(len(text) for text in texts)
+                sequential = _time_per_pass(run_all, texts, rounds)
+                pipeline = _time_per_pass(processor.apply_transforms, texts, rounds)
+                click.echo(
+                    f"{name}: {len(texts)} items, {chars} chars | "
+                    f"sequential {sequential:.2f} ms ({chars / sequential / 1000:.1f} M chars/s) | "
+                    f"apply_transforms {pipeline:.2f} ms ({chars / pipeline / 1000:.1f} M chars/s) | "
+                    f"{sequential / pipeline:.2f}x"
+                )
+
+@lessons_cli.command("build")
+@click.option("--force", is_flag=True, help="Re-render every lesson, even if its source hasn't changed.")
+def build_command(force: bool):
+    """ Pre-renders all lessons and quizzes into the lesson bundle served at startup, and updates the saved lesson indexes. """
+    from pathlib import Path
+    from flask import current_app
+    from lingual.utils.lesson_bundle import build_bundle, get_lesson_processors, read_bundle
+
+    for processor in get_lesson_processors().values():
+        processor.use_bundle(None) # Render from source, not from the bundle attached at startup
+
+    path = Path(current_app.config["LESSON_BUNDLE_PATH"])
+    with current_app.test_request_context(): # Link transforms use url_for
+        stats = build_bundle(path, force=force)
+        for processor in get_lesson_processors().values():
+            processor.index.refresh(force=True) # Saved lesson indexes match the sources, so workers start with them current
+
+    bundle = read_bundle(path)
+    click.echo(
+        f"Built lesson bundle {bundle['version'] if bundle else '?'} at {path}: "
+        f"{stats['rendered']} rendered, {stats['reused']} unchanged, {stats['removed']} removed."
+    )
+
+@lessons_cli.command("profile")
+@click.option("--rounds", default=5, show_default=True, help="Number of times every lesson and quiz is rendered.")
+@click.option("--limit", default=25, show_default=True, help="Number of rows to print.")
+def profile_command(rounds: int, limit: int):
+    """ Renders every lesson and quiz with instrumentation enabled and prints the slowest stages. """
+    from flask import current_app
+    from lingual.utils.lesson_bundle import get_lesson_processors
+    from lingual.utils.lesson_profiler import PROFILER
+
+    was_enabled = PROFILER.enabled
+    PROFILER.enabled = True
+    PROFILER.reset()
+    try:
+        with current_app.test_request_context(): # Link transforms use url_for
+            for processor in get_lesson_processors().values():
+                for _ in range(rounds):
+                    # Render from source, bypassing the bundle and the render cache
+                    for path in sorted((processor.data_root / "lessons").glob("*.md")):
+                        processor.render(path.stem)
+                    for path in sorted((processor.data_root / "quizzes").glob("*.json")):
+                        processor.render_quiz(path.stem)
+    finally:
+        PROFILER.enabled = was_enabled
+
+    rows = PROFILER.report()
+    click.echo(f"{'stage':<48} {'count':>7} {'total ms':>10} {'mean ms':>9} {'p95 ms':>9} {'max ms':>9} {'mean size':>10}")
+    for row in rows[:limit]:
+        click.echo(
+            f"{row['name'][:48]:<48} {row['count']:>7} {row['total_ms']:>10.2f} {row['mean_ms']:>9.3f} "
+            f"{row['p95_ms']:>9.3f} {row['max_ms']:>9.3f} {row['mean_size']:>10.0f}"
+        )
+    if len(rows) > limit:
+        click.echo(f"... {len(rows) - limit} more (use --limit)")
+
+@quizzes_cli.command("sessions")
+@click.option("--purge", is_flag=True, help="Remove expired quiz sessions first.")
+def sessions_command(purge: bool):
+    """ Shows the size of the quiz session store. """
+    from lingual.utils.quiz_sessions import get_store
+
+    store = get_store()
+    if purge:
+        click.echo(f"Removed {store.purge_expired()} expired quiz session(s).")
+    for key, value in store.stats().items():
+        click.echo(f"{key:<12} {value}")
+
+@kanji_cli.command("migrate")
+@click.option("--directory", type=click.Path(exists=True, file_okay=False), help="Directory of per-character JSON files. Defaults to the bundled kanji data.")
+def migrate_command(directory: str | None):
+    """ Imports per-character kanji JSON files into the kanji store. Kanji already in the store are kept. """
+    from lingual.modules.nihongo.utils.kanji_processor import DATA_DIRECTORY, get_store
+
+    store = get_store()
+    imported = store.migrate(directory or DATA_DIRECTORY)
+    click.echo(f"Imported {imported} kanji into {store.path} ({len(store)} cached).")
+
+@kanji_cli.command("export")
+@click.option("--output", type=click.Path(dir_okay=False), default=None, help="Snapshot file to write. Defaults to KANJI_SNAPSHOT_PATH.")
+def export_command(output: str | None):
+    """ Writes every kanji in the kanji store to a versioned snapshot file, for offline mode (KANJI_OFFLINE). """
+    from flask import current_app
+    from lingual.modules.nihongo.utils.kanji_processor import get_store
+    from lingual.modules.nihongo.utils.kanji_snapshot import export_snapshot
+
+    path = output or current_app.config["KANJI_SNAPSHOT_PATH"]
+    snapshot = export_snapshot(get_store(), path)
+    click.echo(f"Exported {len(snapshot['kanji'])} kanji to {path} (snapshot {snapshot['version']}).")
+
+@kanji_cli.command("import")
+@click.argument("path", required=False, type=click.Path(exists=True, dir_okay=False))
+def import_command(path: str | None):
+    """ Loads a kanji snapshot file (default KANJI_SNAPSHOT_PATH) into the kanji store, replacing records that differ. """
+    from flask import current_app
+    from lingual.modules.nihongo.utils.kanji_processor import get_store
+    from lingual.modules.nihongo.utils.kanji_snapshot import import_snapshot, read_verified_snapshot
+
+    path = path or current_app.config["KANJI_SNAPSHOT_PATH"]
+    try:
+        snapshot = read_verified_snapshot(path) # Checks the format and every record's hash before writing anything
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    store = get_store()
+    written = import_snapshot(store, snapshot)
+    click.echo(f"Imported {written} of {len(snapshot['kanji'])} kanji from snapshot {snapshot['version']} into {store.path} ({len(store)} cached).")
+
+def _read_kanji_list(path: str) -> list[str]:
+    """ Reads kanji from a JSON file (a list of kanji, or an object keyed by kanji like prescribed_kanji.json) or a plain text file. """
+    with open(path, "r", encoding="utf-8") as file:
+        if path.endswith(".json"):
+            return list(json.load(file))
+        return [char for char in file.read() if not char.isspace()]
+
+def _write_checkpoint(path, state: dict) -> None:
+    """ Saves prefetch progress atomically, so an interrupted write never leaves a corrupt checkpoint. """
+    import os
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(state, file, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+@kanji_cli.command("prefetch")
+@click.option("--file", "files", multiple=True, type=click.Path(exists=True, dir_okay=False), help="Extra kanji list (JSON list/object or text). Can be repeated.")
+@click.option("--kanji", "extra", default="", help="Extra kanji to fetch, e.g. --kanji 猫犬.")
+@click.option("--no-prescribed", is_flag=True, help="Don't include the prescribed kanji.")
+@click.option("--rate", default=60.0, show_default=True, help="Maximum WaniKani requests per minute.")
+@click.option("--batch-size", default=None, type=click.IntRange(1, 1000), help="Kanji per request. Defaults to FETCH_BATCH_SIZE.")
+@click.option("--checkpoint", type=click.Path(dir_okay=False), default=None, help="Progress file, used to resume an interrupted run.")
+@click.option("--restart", is_flag=True, help="Ignore any saved progress.")
+@click.option("--api-url", envvar="WANIKANI_API_URL", default=None, help="WaniKani subjects endpoint (e.g. a local stub server).")
+@click.option("--deadline", default=60.0, show_default=True, help="Seconds each request may take, retries included.")
+def prefetch_command(files: tuple[str, ...], extra: str, no_prescribed: bool, rate: float, batch_size: int | None,
+                     checkpoint: str | None, restart: bool, api_url: str | None, deadline: float):
+    """ Downloads every missing kanji (and the subject IDs of cached ones) from WaniKani into the kanji store, so workers never fetch on demand. """
+    import os
+    from lingual.modules.nihongo.utils.kanji_processor import DATA_DIRECTORY, FETCH_BATCH_SIZE, Kanji, get_client, get_store, validate_kanji
+    from lingual.utils.token_bucket import TokenBucket
+
+    # Collect the wanted kanji, in order and without duplicates
+    wanted: list[str] = [] if no_prescribed else [kanji for kanji, _ in Kanji.get_prescribed_kanji()]
+    for path in files:
+        wanted.extend(_read_kanji_list(path))
+    wanted.extend(extra)
+
+    targets = []
+    for kanji in dict.fromkeys(wanted):
+        try:
+            targets.append(validate_kanji(kanji))
+        except ValueError:
+            click.echo(f"Skipping invalid kanji {kanji!r}.", err=True)
+
+    # Resume from the checkpoint: kanji already in the store are done, and known misses aren't retried
+    checkpoint_path = checkpoint or str(DATA_DIRECTORY.parent / "kanji.prefetch.json")
+    state = {"fetched": 0, "requests": 0, "seconds": 0.0, "not_found": []}
+    if not restart and os.path.exists(checkpoint_path):
+        with open(checkpoint_path, "r", encoding="utf-8") as file:
+            state.update(json.load(file))
+        click.echo(f"Resuming: {state['fetched']} kanji fetched so far.")
+
+    # Cached kanji without a subject ID (imported from files) are fetched again, so the kanji graph can link them
+    cached = get_store().digests(targets)
+    linked = get_store().subject_ids(targets)
+    not_found = set(state["not_found"])
+    pending = [kanji for kanji in targets if kanji not in linked and kanji not in not_found]
+    click.echo(f"{len(targets)} kanji wanted, {len(cached)} cached ({len(cached) - len(linked)} without a subject ID), {len(pending)} to fetch.")
+    if not pending:
+        if os.path.exists(checkpoint_path): os.remove(checkpoint_path)
+        return
+
+    limiter = TokenBucket.per_minute(rate, burst=1) # Evenly spaced requests
+    size = batch_size or FETCH_BATCH_SIZE
+    start = time.perf_counter()
+    run_fetched = 0
+
+    for position in range(0, len(pending), size):
+        chunk = pending[position:position + size]
+        requests_before = limiter.acquired
+        chunk_start = time.perf_counter()
+        try:
+            fetched = Kanji._fetch_many_kanji_data(chunk, limiter=limiter, api_url=api_url, deadline=deadline)
+        except Exception as e:
+            _write_checkpoint(checkpoint_path, state)
+            raise click.ClickException(f"Prefetch stopped: {e}. Run the command again to resume.")
+
+        run_fetched += len(fetched)
+        state["fetched"] += len(fetched)
+        state["requests"] += limiter.acquired - requests_before
+        state["seconds"] += time.perf_counter() - chunk_start
+        state["not_found"].extend(kanji for kanji in chunk if kanji not in fetched)
+        _write_checkpoint(checkpoint_path, state)
+
+        elapsed = time.perf_counter() - start
+        click.echo(f"[{min(position + size, len(pending))}/{len(pending)}] {run_fetched} fetched, {run_fetched / elapsed:.1f} kanji/s")
+
+    os.remove(checkpoint_path) # Finished, nothing to resume
+    click.echo(
+        f"Fetched {state['fetched']} kanji in {state['requests']} request(s) and {state['seconds']:.1f}s "
+        f"({state['fetched'] / state['seconds'] if state['seconds'] else 0:.1f} kanji/s, {limiter.waited:.1f}s rate limited)."
+    )
+    if state["not_found"]:
+        click.echo(f"Not found on WaniKani: {''.join(state['not_found'])}")
+
+    client = get_client().stats()
+    click.echo(
+        f"HTTP: {client['requests']} attempt(s), {client['retries']} retried, p50 {client['latency']['p50_ms']:.0f} ms, "
+        f"p95 {client['latency']['p95_ms']:.0f} ms."
+    )
+
+def init_app(app):
+    # Register the custom CLI command groups with the app
+    app.cli.add_command(lessons_cli)
+    app.cli.add_command(quizzes_cli)
+    app.cli.add_command(kanji_cli)
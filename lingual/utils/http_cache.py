@@ -0,0 +1,78 @@
+"""
+Conditional GET helpers (ETag / 304 Not Modified) and Cache-Control headers for content endpoints.
+
+ETags are derived from the content hash of the source files a response is built from, plus a release id
+that changes whenever the application code or templates change, so a deploy never serves a stale 304.
+Checking `If-None-Match` before doing any work means repeat visits skip rendering entirely.
+"""
+
+import hashlib
+import threading
+from pathlib import Path
+from flask import Response, request
+from lingual.utils.render_cache import Stamp, source_stamp
+
+PACKAGE_ROOT = Path(__file__).resolve().parents[1] # lingual/
+KANJI_MAX_AGE = 86400 # Kanji records rarely change, browsers may reuse them for a day without revalidating
+
+_release_id: str | None = None
+_digests: dict[Path, tuple[Stamp, str]] = {} # Content hash of each file, valid while its stamp is unchanged
+_digests_lock = threading.Lock()
+
+def release_id() -> str:
+    """ Identifies the deployed code and templates. Computed once per process, identical across workers of the same release. """
+    global _release_id
+    if _release_id is None:
+        stamps = sorted(
+            (str(path.relative_to(PACKAGE_ROOT)), source_stamp(path))
+            for suffix in ("*.py", "*.html")
+            for path in PACKAGE_ROOT.rglob(suffix)
+        )
+        _release_id = hashlib.sha256(repr(stamps).encode("utf-8")).hexdigest()[:16]
+    return _release_id
+
+def file_digest(path: Path | str) -> str | None:
+    """ Returns the content hash of a file, or None if it doesn't exist. Only re-hashed when the file changes. """
+    path = Path(path)
+    stamp = source_stamp(path)
+    if stamp is None:
+        return None
+
+    cached = _digests.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    try:
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+    with _digests_lock:
+        _digests[path] = (stamp, digest)
+    return digest
+
+def make_etag(*parts: object) -> str:
+    """ Builds a strong ETag from the given parts (hashes, ids, versions). """
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:32]
+
+def apply_cache_headers(response: Response, etag: str, max_age: int = 0, private: bool = True) -> Response:
+    """
+    Sets the ETag and Cache-Control headers on a response.
+
+    :param max_age: Seconds the browser may reuse the response without revalidating. 0 revalidates on every use.
+    :param private: Only allow the browser (not shared caches) to store the response, for per-user or login-only content.
+    """
+    response.set_etag(etag)
+    response.cache_control.private = private or None
+    response.cache_control.public = (not private) or None
+    if max_age:
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+def not_modified(etag: str, max_age: int = 0, private: bool = True) -> Response | None:
+    """ Returns a 304 response if the client already has this version, otherwise None. """
+    if not request.if_none_match.contains(etag):
+        return None
+    return apply_cache_headers(Response(status=304), etag, max_age=max_age, private=private)
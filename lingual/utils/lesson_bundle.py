@@ -0,0 +1,207 @@
+"""
+Ahead-of-time lesson bundle.
+
+`flask lessons build` renders every lesson (HTML and `Lesson` metadata) and quiz file of each
+lesson processor into one versioned JSON bundle. At startup the bundle is attached to the
+processors, which then serve from it instead of rendering markdown at request time.
+
+Every entry records the hash and stamp (mtime and size) of its source file. Builds only re-render sources
+whose hash changed, and at startup entries that no longer match the file on disk are rendered live instead.
+A source is only re-hashed when its stamp differs from the recorded one (e.g. after a fresh checkout), and
+attached entries are trusted until the next start, so serving them touches no files.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import asdict
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any
+import markdown
+from lingual.utils.lesson_processor import BaseLessonProcessor
+from lingual.utils.render_cache import Stamp, source_stamp
+
+BUNDLE_FORMAT = 2 # Bump when the bundle layout changes, older bundles are then rebuilt from scratch
+
+def get_lesson_processors() -> dict[str, BaseLessonProcessor]:
+    """ Returns every lesson processor that is bundled, keyed by app code. """
+    from lingual.modules.nihongo.utils.grammar_lesson_processor import get_processor as get_nihongo_processor
+    from lingual.modules.tutorial.utils.lessons_processor import get_processor as get_tutorial_processor
+
+    processors: list[BaseLessonProcessor] = [get_nihongo_processor(), get_tutorial_processor()]
+    return {processor.language.app_code: processor for processor in processors}
+
+def source_hash(path: Path) -> str:
+    """ Returns the content hash of a source file. """
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+def source_matches(path: Path, entry: dict) -> tuple[bool, Stamp]:
+    """
+    Returns whether a bundle entry was built from the current content of a source file, and the file's stamp.
+
+    The file is only hashed if its stamp differs from the one recorded in the entry.
+    """
+    stamp = source_stamp(path)
+    if stamp is None:
+        return False, None
+    if entry.get("stamp") is not None and tuple(entry["stamp"]) == stamp:
+        return True, stamp
+    return entry.get("hash") == source_hash(path), stamp
+
+def renderer_fingerprint(processor: BaseLessonProcessor) -> str:
+    """ Identifies how a processor renders content. If it changes, every entry of the processor is re-rendered. """
+    transformers = [getattr(transform, "name", None) or getattr(transform, "__qualname__", repr(transform)) for transform in processor.transformers]
+    return f"{type(processor).__name__}:{markdown.__version__}:{','.join(transformers)}"
+
+def _encode_value(value: Any) -> dict:
+    """ Encodes values JSON can't hold, i.e. YAML dates in lesson metadata, tagged with their type. """
+    if isinstance(value, datetime): # Before date, datetime is a subclass of it
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    raise TypeError(f"Cannot bundle value of type {type(value).__name__}.")
+
+def _decode_value(obj: dict) -> Any:
+    """ Restores values encoded by `_encode_value`, so bundled metadata equals live metadata. """
+    if len(obj) == 1:
+        if "__datetime__" in obj: return datetime.fromisoformat(obj["__datetime__"])
+        if "__date__" in obj: return date.fromisoformat(obj["__date__"])
+    return obj
+
+def read_bundle(path: Path) -> dict | None:
+    """ Reads a bundle from disk. Returns None if it doesn't exist or was built with another format. """
+    if not path.exists():
+        return None
+
+    with path.open("r", encoding="utf-8") as f:
+        bundle = json.load(f, object_hook=_decode_value)
+
+    if bundle.get("format") != BUNDLE_FORMAT:
+        return None
+    return bundle
+
+def write_bundle(path: Path, bundle: dict) -> None:
+    """ Writes the bundle atomically, so running workers never read a half-written file. """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f"{path.name}.tmp")
+    with temp_path.open("w", encoding="utf-8") as f:
+        json.dump(bundle, f, ensure_ascii=False, default=_encode_value)
+    os.replace(temp_path, path)
+
+def build_bundle(path: Path, force: bool = False) -> dict[str, int]:
+    """
+    Builds (or incrementally updates) the bundle at the given path.
+
+    Must be run inside a request context, as link transforms use `url_for`.
+
+    :param force: Re-render every source, even if its hash hasn't changed.
+    :return: Counts of rendered, reused and removed entries.
+    """
+    previous = None if force else read_bundle(path)
+    previous_sections: dict[str, Any] = previous["processors"] if previous else {}
+    stats = {"rendered": 0, "reused": 0, "removed": 0}
+
+    sections: dict[str, Any] = {}
+    for app_code, processor in get_lesson_processors().items():
+        fingerprint = renderer_fingerprint(processor)
+        old = previous_sections.get(app_code, {})
+        if old.get("renderer") != fingerprint:
+            old = {} # Rendering changed, nothing can be reused
+
+        lessons: dict[str, Any] = {}
+        old_lessons = old.get("lessons", {})
+        for lesson_path in sorted((processor.data_root / "lessons").glob("*.md")):
+            slug = lesson_path.stem
+            unchanged, stamp = source_matches(lesson_path, old_lessons.get(slug, {}))
+            if unchanged:
+                lessons[slug] = {**old_lessons[slug], "stamp": stamp}
+                stats["reused"] += 1
+                continue
+
+            rendered = processor.render(slug)
+            lessons[slug] = {
+                "hash": source_hash(lesson_path),
+                "stamp": stamp,
+                "meta": rendered["meta"],
+                "content": rendered["content"],
+                "lesson": asdict(processor.parse_lesson(slug)),
+            }
+            stats["rendered"] += 1
+
+        quizzes: dict[str, Any] = {}
+        old_quizzes = old.get("quizzes", {})
+        for quiz_path in sorted((processor.data_root / "quizzes").glob("*.json")):
+            slug = quiz_path.stem
+            unchanged, stamp = source_matches(quiz_path, old_quizzes.get(slug, {}))
+            if unchanged:
+                quizzes[slug] = {**old_quizzes[slug], "stamp": stamp}
+                stats["reused"] += 1
+                continue
+
+            quizzes[slug] = {
+                "hash": source_hash(quiz_path),
+                "stamp": stamp,
+                "data": processor.render_quiz(slug),
+            }
+            stats["rendered"] += 1
+
+        stats["removed"] += len(set(old_lessons) - set(lessons)) + len(set(old_quizzes) - set(quizzes))
+        sections[app_code] = {
+            "renderer": fingerprint,
+            "lessons": lessons,
+            "quizzes": quizzes,
+        }
+
+    # The version changes whenever any rendered entry changes, so it can be used for cache busting
+    version = hashlib.sha256(json.dumps(
+        {app_code: [section["renderer"], sorted((slug, entry["hash"]) for kind in ("lessons", "quizzes") for slug, entry in section[kind].items())]
+         for app_code, section in sections.items()},
+        sort_keys=True,
+    ).encode("utf-8")).hexdigest()[:16]
+
+    write_bundle(path, {
+        "format": BUNDLE_FORMAT,
+        "version": version,
+        "processors": sections,
+    })
+    return stats
+
+def attach_bundle(bundle: dict, logger=None) -> int:
+    """
+    Attaches a bundle to the lesson processors, skipping entries whose source changed since the build (see `source_matches`).
+
+    :return: Number of stale entries skipped.
+    """
+    stale = 0
+    for app_code, processor in get_lesson_processors().items():
+        section = bundle["processors"].get(app_code)
+        if not section or section.get("renderer") != renderer_fingerprint(processor):
+            processor.use_bundle(None, bundle["version"]) # Built by an older renderer, serve live
+            continue
+
+        entries: dict[str, dict] = {"lessons": {}, "quizzes": {}}
+        for kind, suffix in (("lessons", ".md"), ("quizzes", ".json")):
+            for slug, entry in section[kind].items():
+                if source_matches(processor.data_root / kind / f"{slug}{suffix}", entry)[0]:
+                    entries[kind][slug] = entry
+                else:
+                    stale += 1
+                    if logger: logger.warning(f"Lesson bundle entry '{app_code}/{kind}/{slug}' is stale, rendering it live.")
+
+        processor.use_bundle(entries, bundle["version"])
+    return stale
+
+def init_app(app):
+    # Serve lessons from the pre-built bundle, if one has been built
+    path = Path(app.config["LESSON_BUNDLE_PATH"])
+    try:
+        bundle = read_bundle(path)
+    except (OSError, ValueError) as e:
+        app.logger.warning(f"Could not read lesson bundle '{path}': {str(e)}")
+        return
+
+    if bundle is None:
+        return # No bundle built, lessons are rendered on demand
+
+    attach_bundle(bundle, app.logger)
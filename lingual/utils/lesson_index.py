@@ -0,0 +1,199 @@
+"""
+Persistent, metadata-only index of a lesson processor's lessons.
+
+Holds each lesson's category, title, summary, keywords and plain search text (the `Lesson` record),
+so directory pages, quiz forms and search never parse lesson files. Only lessons whose source file
+changed are re-parsed, and the index is saved to disk so workers start with it already built.
+
+Checks run at most once every `check_interval` seconds and stat map.json and every lesson file, so lessons
+added, removed or edited in place show up without a restart. When a lesson bundle is attached, checks compare
+the bundle version instead and touch no files.
+"""
+
+import json
+import os
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+from lingual.utils.render_cache import source_stamp
+
+if TYPE_CHECKING:
+    from lingual.utils.lesson_processor import BaseLessonProcessor, Lesson
+
+INDEX_FORMAT = 1 # Bump when the saved layout changes, older files are then ignored
+
+class LessonIndex:
+    """
+    Index of lesson metadata for one processor.
+
+    Sources are checked for changes at most once every `check_interval` seconds,
+    so listing lessons between checks is a dictionary read with no file I/O.
+    A check stats every lesson file, but only re-parses the ones that changed.
+
+    :param processor: Processor whose lessons are indexed.
+    :param path: File the index is saved to, or None to keep it in memory only.
+    :param check_interval: Minimum seconds between checks for changed source files. 0 checks on every read.
+    """
+
+    def __init__(self, processor: "BaseLessonProcessor", path: Path | None = None, check_interval: float = 2.0):
+        self.processor = processor
+        self.path = path
+        self.check_interval = check_interval
+        self.version = 0 # Incremented whenever the indexed lessons change
+
+        self._entries: dict[str, dict[str, Any]] = {} # slug -> {"stamp": ..., "lesson": Lesson}
+        self._map: dict[str, list[str]] = {} # category -> slugs, as in map.json
+        self._map_stamp: Any = None
+        self._categories: list[dict[str, Any]] | None = None # Built from the entries on first read after a change
+        self._bundle_version: str | None = None # Bundle version at the last scan, None if no bundle was attached
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+        self._read()
+
+    def categories(self) -> list[dict[str, Any]]:
+        """ Returns the lessons grouped by category, in map.json order. """
+        self.refresh()
+        categories = self._categories
+        if categories is None:
+            with self._lock:
+                categories = self._categories = [
+                    {
+                        "category": category,
+                        "lessons": [self._entries[slug]["lesson"] for slug in slugs if slug in self._entries],
+                    }
+                    for category, slugs in self._map.items()
+                ]
+        return categories
+
+    def get(self, slug: str) -> "Lesson | None":
+        """ Returns the indexed lesson for a slug, or None if it isn't indexed. """
+        self.refresh()
+        entry = self._entries.get(slug)
+        return entry["lesson"] if entry else None
+
+    def category_of(self, slug: str) -> str | None:
+        """ Returns the category a lesson is listed under in map.json. """
+        self.refresh()
+        for category, slugs in self._map.items():
+            if slug in slugs:
+                return category
+        return None
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Re-parses lessons whose source changed since they were indexed.
+
+        :param force: Check every source file, even if the check interval hasn't passed or the bundle is unchanged.
+        :return: True if the index changed.
+        """
+        if not force and time.monotonic() - self._checked_at < self.check_interval:
+            return False
+
+        with self._lock:
+            if not force and time.monotonic() - self._checked_at < self.check_interval:
+                return False # Another thread refreshed while this one waited
+            bundle_version = self.processor.bundle_version if self.processor.bundle is not None else None
+            changed = False
+            if force or bundle_version is None or bundle_version != self._bundle_version: # Bundled lessons are trusted until the next start
+                changed = self._refresh()
+                self._bundle_version = bundle_version
+            self._checked_at = time.monotonic()
+
+        if changed:
+            self._write()
+        return changed
+
+    def _refresh(self) -> bool:
+        """ Updates changed entries by checking every source file. Must be called with the lock held. """
+        from flask import current_app
+        changed = False
+
+        map_path = self.processor.data_root / "map.json"
+        map_stamp = source_stamp(map_path)
+        if map_stamp != self._map_stamp:
+            lesson_map: dict[str, list[str]] = {}
+            if map_stamp is not None:
+                with map_path.open("r", encoding="utf-8") as f:
+                    lesson_map = json.load(f)
+            self._map, self._map_stamp = lesson_map, map_stamp
+            changed = True
+
+        seen: set[str] = set()
+        for lesson_path in (self.processor.data_root / "lessons").glob("*.md"):
+            slug = lesson_path.stem
+            seen.add(slug)
+            stamp = source_stamp(lesson_path)
+            entry = self._entries.get(slug)
+            if entry is not None and entry["stamp"] == stamp:
+                continue # Unchanged
+
+            try:
+                lesson = self.processor.read_lesson(slug)
+            except Exception as e:
+                current_app.logger.warning(f"Failed to index lesson '{slug}': {str(e)}")
+                self._entries.pop(slug, None)
+                continue
+
+            self._entries[slug] = {"stamp": stamp, "lesson": lesson}
+            changed = True
+
+        for slug in set(self._entries) - seen: # Lesson files that were removed
+            del self._entries[slug]
+            changed = True
+
+        if changed:
+            self._categories = None
+            self.version += 1
+        return changed
+
+    def _read(self) -> None:
+        """ Loads the saved index, if there is one. Stale entries are re-parsed on the first refresh. """
+        from lingual.utils.lesson_processor import Lesson
+
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return # Unreadable, rebuilt on the first refresh
+
+        if saved.get("format") != INDEX_FORMAT:
+            return
+
+        self._map = saved["map"]
+        self._map_stamp = tuple(saved["map_stamp"]) if saved["map_stamp"] else None
+        self._entries = {
+            slug: {"stamp": tuple(entry["stamp"]) if entry["stamp"] else None, "lesson": Lesson(**entry["lesson"])}
+            for slug, entry in saved["lessons"].items()
+        }
+
+    def _write(self) -> None:
+        """ Saves the index atomically, so other workers never read a half-written file. """
+        if self.path is None:
+            return
+
+        with self._lock:
+            saved = {
+                "format": INDEX_FORMAT,
+                "map": self._map,
+                "map_stamp": self._map_stamp,
+                "lessons": {slug: {"stamp": entry["stamp"], "lesson": asdict(entry["lesson"])} for slug, entry in self._entries.items()},
+            }
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp") # Per process, as workers may save at the same time
+            with temp_path.open("w", encoding="utf-8") as f:
+                json.dump(saved, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            # Saving only speeds up the next start, so a read-only data directory is not an error
+            from flask import current_app
+            current_app.logger.warning(f"Could not save lesson index '{self.path}': {str(e)}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
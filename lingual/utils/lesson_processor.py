@@ -1,12 +1,19 @@
 from dataclasses import dataclass, field
 from pathlib import Path
-from functools import lru_cache
 from flask import current_app, url_for
 import frontmatter
-import markdown
 import re
+import time
 from typing import Any
+from lingual.utils import http_cache
 from lingual.utils.languages import Language
+from lingual.utils.markdown_pool import render_markdown
+from lingual.utils.lesson_index import LessonIndex
+from lingual.utils.lesson_search import LessonSearch
+from lingual.utils.lesson_profiler import PROFILER
+from lingual.utils.question_index import QuestionIndex
+from lingual.utils.render_cache import RenderCache, Stamp, source_stamp
+from lingual.utils.transform_engine import MarkupRule, Transformer, marker_pattern
 from werkzeug.routing import BuildError
 from markupsafe import escape
 
@@ -46,156 +53,171 @@ class BaseLessonProcessor:
     def __init__(self, language: Language, data_root: Path):
         self.language: Language = language
         self.data_root: Path = data_root
-        self.transformers = [ # Languages can add on to this list
-            self.transform_links,
-            self.transform_quizzes,
-            self.transform_notes,
-            self.transform_formatting,
-            self.transform_blocks,
-            self.transform_spoilers,
+        self.transformers: list[Transformer] = [ # Languages can add on to this list
+            MarkupRule(LINK_RE, self._link_repl, triggers=("[",), name="links"),
+            MarkupRule(QUIZ_RE, self._quiz_repl, triggers=("~quizzes:",), name="quizzes"),
+            MarkupRule(NOTE_RE, self._note_repl, triggers=("/i", "/w", "/t"), name="notes"),
+            MarkupRule(FORMAT_RE, self._format_repl, triggers=("::",), name="formatting"),
+            MarkupRule(BLOCK_RE, self._block_repl, triggers=(":::",), name="blocks"),
+            MarkupRule(SPOILER_RE, self._spoiler_repl, triggers=("||",), name="spoilers"),
         ]
+        self.transformers_version: int = 0 # Bumped by add_transform, invalidates the cached markers
+        self._markers: tuple[int, re.Pattern | None] | None = None # (transformers_version, marker pattern), see `markers`
+        self.bundle: dict[str, dict] | None = None # Pre-rendered lessons and quizzes (see lesson_bundle), None renders live
+        self.bundle_version: str | None = None # Version of the attached bundle
+        self._cache: RenderCache | None = None # Rendered lessons, created from the app config on first use (see `cache`)
+        self._quiz_cache: RenderCache | None = None # Transformed quiz banks, created from the app config on first use (see `quiz_cache`)
+        self._index: LessonIndex | None = None # Lesson metadata, created from the app config on first use (see `index`)
+        self._search: LessonSearch | None = None # Search index, rebuilt when the lesson index changes
+        self.questions: QuestionIndex = QuestionIndex(self) # Flat index of quiz questions, for sampling quizzes
+
+    def _link_repl(self, match: re.Match) -> str:
+        label = escape(match.group(1)) # Displayed text for the link, escaped to prevent XSS. Can include markdown formatting.
+        target = match.group(2) # Either internal (route:slug#anchor) OR external (https://...)
+        raw_attrs = match.group(3) or "" # Optional raw attributes string (e.g. 'target="_blank" class="my-class" ) which will be parsed into HTML attributes.
+
+        href = "#" # Initial href value
+        attrs = "" # Initialise attributes string
+        rel_parts = set(["nofollow"]) # List to prevent duplicates. Forces nofollow for security.
+
+        # Test if the target is an internal link (route:slug#anchor)
+        internal_match = re.match(r'^(\w+):([\w\-]+)(?:#([\w\-]+))?$', target)
+        if internal_match:
+            route, slug, anchor = internal_match.groups()
+            try:
+                # Attempt to build the URL for the given route and slug, with optional anchor
+                href = url_for(f"{self.language.app_code}.{route}", slug=slug) # Build URL for route
+                if anchor: href += f"#{anchor}" # Append anchor if present
+            except BuildError:
+                # Build errors occur when the route or slug does not exist.
+                # Log a warning and return a non-functional link to avoid breaking the page, while indicating that there is an issue with the link configuration.
+                href = "#" # Fallback href to prevent broken links
+                current_app.logger.warning(f"Failed to build URL for route '{route}' with slug '{slug}'")
+
+        else: # Non-internal links are treated as external
+            href = target
+            rel_parts.update(["noopener", "noreferrer"]) # External links need stricter security defaults
+
+        if raw_attrs: # Raw attributes present
+            # Find :flag OR key="value" OR key=value pairs in the raw attributes
+            parts = re.findall(r'(:\w+|\w+="[^"]*"|\w+=[^\s}]+)', raw_attrs)
+
+            for part in parts: # Iterate through each part to parse attributes
+                # Custom flags
+                if part == ":newtab":
+                    # Indicate link should open in a new tab
+                    attrs += ' target="_blank"' # Open in new tab
+                    rel_parts.update(["noopener", "noreferrer"]) # Add security rel attributes for new tabs
+
+                # Normal attributes
+                elif "=" in part:
+                    key, value = part.split("=", 1)
+
+                    if key == 'rel':
+                        # Rel attributes need to be merged with the default and NOT overwritten
+                        rel_parts.update(value.strip('"').split()) # Add rel attributes to the set
+                    else:
+                        attrs += f' {key}={value}' # Add other attributes as-is (e.g. class="my-class")
 
-    def transform_links(self, text: str) -> str:
-        def repl(match):
-            label = escape(match.group(1)) # Displayed text for the link, escaped to prevent XSS. Can include markdown formatting.
-            target = match.group(2) # Either internal (route:slug#anchor) OR external (https://...)
-            raw_attrs = match.group(3) or "" # Optional raw attributes string (e.g. 'target="_blank" class="my-class" ) which will be parsed into HTML attributes.
-
-            href = "#" # Initial href value
-            attrs = "" # Initialise attributes string
-            rel_parts = set(["nofollow"]) # List to prevent duplicates. Forces nofollow for security.
-
-            # Test if the target is an internal link (route:slug#anchor)
-            internal_match = re.match(r'^(\w+):([\w\-]+)(?:#([\w\-]+))?$', target)
-            if internal_match:
-                route, slug, anchor = internal_match.groups()
-                try:
-                    # Attempt to build the URL for the given route and slug, with optional anchor
-                    href = url_for(f"{self.language.app_code}.{route}", slug=slug) # Build URL for route
-                    if anchor: href += f"#{anchor}" # Append anchor if present
-                except BuildError:
-                    # Build errors occur when the route or slug does not exist.
-                    # Log a warning and return a non-functional link to avoid breaking the page, while indicating that there is an issue with the link configuration.
-                    href = "#" # Fallback href to prevent broken links
-                    current_app.logger.warning(f"Failed to build URL for route '{route}' with slug '{slug}'")
-
-            else: # Non-internal links are treated as external
-                href = target
-                rel_parts.update(["noopener", "noreferrer"]) # External links need stricter security defaults
-
-            if raw_attrs: # Raw attributes present
-                # Find :flag OR key="value" OR key=value pairs in the raw attributes
-                parts = re.findall(r'(:\w+|\w+="[^"]*"|\w+=[^\s}]+)', raw_attrs)
-
-                for part in parts: # Iterate through each part to parse attributes
-                    # Custom flags
-                    if part == ":newtab":
-                        # Indicate link should open in a new tab
-                        attrs += ' target="_blank"' # Open in new tab
-                        rel_parts.update(["noopener", "noreferrer"]) # Add security rel attributes for new tabs
-
-                    # Normal attributes
-                    elif "=" in part:
-                        key, value = part.split("=", 1)
-
-                        if key == 'rel':
-                            # Rel attributes need to be merged with the default and NOT overwritten
-                            rel_parts.update(value.strip('"').split()) # Add rel attributes to the set
-                        else:
-                            attrs += f' {key}={value}' # Add other attributes as-is (e.g. class="my-class")
-
-                    # Standalone attributes (e.g. "disabled", "primary")
+                # Standalone attributes (e.g. "disabled", "primary")
+                else:
+                    if part != "rel":
+                        # Escape rel as a standalone attribute
+                        attrs += f' {part}'
                     else:
-                        if part != "rel":
-                            # Escape rel as a standalone attribute
-                            attrs += f' {part}'
-                        else:
-                            current_app.logger.warning(
-                                f"Invalid use of 'rel' in link attributes: '{raw_attrs}' (must be in the form rel=...)"
-                            )
+                        current_app.logger.warning(
+                            f"Invalid use of 'rel' in link attributes: '{raw_attrs}' (must be in the form rel=...)"
+                        )
+
+        # Default external behaviour (only if not overridden)
+        if re.match(r'^https?://', href):
+            if "target=" not in attrs: attrs += ' target="_blank"' # Default to opening external links in a new tab
+            rel_parts.update(["noopener", "noreferrer"]) # Default rel attributes for external links to prevent security vulnerabilities
+
+        rel = " ".join(sorted(rel_parts)) # Combine rel attributes into a single string, sorted for consistency
+
+        return f'<a href="{href}"{attrs} rel="{rel}">{label}</a>' # Return the final anchor tag with all attributes and the escaped label
+
+    def _quiz_repl(self, match: re.Match) -> str:
+        lesson, quiz, params = match.groups() # Separates str into a tuple including lesson, quiz, and params
+        attrs = "" # Additional data attributes
+        if params:
+            for param in params.split("&"):
+                if "=" in param:
+                    key, value = param.split("=", 1)
+                    attrs += f' data-{key}="{value}"' # Key-value attribute
+                else:
+                    attrs += f' data-{param}="true"' # Boolean attribute
+        return f'<div class="quiz" data-lesson="{lesson}" data-id="{quiz}"{attrs}></div>' # Quiz content dynamically loaded via JS
+
+    def _note_repl(self, match: re.Match) -> str:
+        # Deconstruct the regex match into components
+        note_type = match.group(1)
+        content = match.group(2)
+
+        mapping = {
+            "i": ("info", "Note"),
+            "w": ("warning", "Heads up"),
+            "t": ("tip", "Tip"),
+        }
 
-            # Default external behaviour (only if not overridden)
-            if re.match(r'^https?://', href):
-                if "target=" not in attrs: attrs += ' target="_blank"' # Default to opening external links in a new tab
-                rel_parts.update(["noopener", "noreferrer"]) # Default rel attributes for external links to prevent security vulnerabilities
+        # Get the corresponding CSS class and label for the note type, defaulting to "info" if the type is unrecognized
+        css_class, label = mapping.get(note_type, ("info", "Note"))
 
-            rel = " ".join(sorted(rel_parts)) # Combine rel attributes into a single string, sorted for consistency
+        return f'\n<div class="note {css_class}"><strong class="label">{label}:</strong><p>{content}</p></div>\n' # Return formatted HTML for the note block
 
-            return f'<a href="{href}"{attrs} rel="{rel}">{label}</a>' # Return the final anchor tag with all attributes and the escaped label
+    def _format_repl(self, match: re.Match) -> str:
+        # Deconstruct the regex match into components
+        formatting = match.group(1)
+        content = match.group(2)
 
-        return LINK_RE.sub(repl, text) # Replace markdown links with HTML anchor tags
+        # Handle formatting while parsing "escaped" content to prevent XSS
+        if formatting.lower() == "bold":
+            return f'<strong>{escape(content)}</strong>'
+        elif formatting.lower() == "italic":
+            return f'<em>{escape(content)}</em>'
 
-    def transform_quizzes(self, text: str) -> str:
-        def repl(match):
-            lesson, quiz, params = match.groups() # Separates str into a tuple including lesson, quiz, and params
-            attrs = "" # Additional data attributes
-            if params:
-                for param in params.split("&"):
-                    if "=" in param:
-                        key, value = param.split("=", 1)
-                        attrs += f' data-{key}="{value}"' # Key-value attribute
-                    else:
-                        attrs += f' data-{param}="true"' # Boolean attribute
-            return f'<div class="quiz" data-lesson="{lesson}" data-id="{quiz}"{attrs}></div>' # Quiz content dynamically loaded via JS
-
-        return QUIZ_RE.sub(repl, text) # Replace quiz markers with HTML divs
+        return f'<span style="color:{formatting}">{escape(content)}</span>' # Assume colour
 
-    def transform_notes(self, text: str) -> str:
-        def repl(match):
-            # Deconstruct the regex match into components
-            note_type = match.group(1)
-            content = match.group(2)
+    def _block_repl(self, match: re.Match) -> str:
+        block_type = match.group(1)
+        content = match.group(2)
+        return f'<div class="block {block_type}">{content}</div>' # Return formatted HTML for the block
 
-            mapping = {
-                "i": ("info", "Note"),
-                "w": ("warning", "Heads up"),
-                "t": ("tip", "Tip"),
-            }
+    def _spoiler_repl(self, match: re.Match) -> str:
+        content = match.group(1)
+        return f'<span class="spoiler" title="Click to reveal">{content}</span>'
 
-            # Get the corresponding CSS class and label for the note type, defaulting to "info" if the type is unrecognized
-            css_class, label = mapping.get(note_type, ("info", "Note"))
-
-            return f'\n<div class="note {css_class}"><strong class="label">{label}:</strong><p>{content}</p></div>\n' # Return formatted HTML for the note block
-
-        return NOTE_RE.sub(repl, text) # Replace note markers with styled HTML blocks based on their type (info, warning, tip)
-    
-    def transform_formatting(self, text: str):
-        def repl(match):
-            # Deconstruct the regex match into components
-            formatting = match.group(1)
-            content = match.group(2)
+    # Standalone transformers. The pipeline itself runs the registered rules (see apply_transforms),
+    # these apply a single transformation to a string and are kept for direct use.
+    def transform_links(self, text: str) -> str:
+        return LINK_RE.sub(self._link_repl, text) # Replace markdown links with HTML anchor tags
 
-            # Handle formatting while parsing "escaped" content to prevent XSS
-            if formatting.lower() == "bold":
-                return f'<strong>{escape(content)}</strong>'
-            elif formatting.lower() == "italic":
-                return f'<em>{escape(content)}</em>'
+    def transform_quizzes(self, text: str) -> str:
+        return QUIZ_RE.sub(self._quiz_repl, text) # Replace quiz markers with HTML divs
 
-            return f'<span style="color:{formatting}">{escape(content)}</span>' # Assume colour
+    def transform_notes(self, text: str) -> str:
+        return NOTE_RE.sub(self._note_repl, text) # Replace note markers with styled HTML blocks based on their type (info, warning, tip)
 
-        return FORMAT_RE.sub(repl, text) # Replace formatting markers with corresponding HTML tags
+    def transform_formatting(self, text: str) -> str:
+        return FORMAT_RE.sub(self._format_repl, text) # Replace formatting markers with corresponding HTML tags
 
     def transform_blocks(self, text: str) -> str:
-        def repl(match):
-            block_type = match.group(1)
-            content = match.group(2)
-            return f'<div class="block {block_type}">{content}</div>' # Return formatted HTML for the block
-
-        return BLOCK_RE.sub(repl, text) # Replace block markers with styled HTML blocks
+        return BLOCK_RE.sub(self._block_repl, text) # Replace block markers with styled HTML blocks
 
     def transform_spoilers(self, text: str) -> str:
-        def repl(match):
-            content = match.group(1)
-            return f'<span class="spoiler" title="Click to reveal">{content}</span>'
-        return SPOILER_RE.sub(repl, text) # Replace spoiler markers with styled HTML spans
+        return SPOILER_RE.sub(self._spoiler_repl, text) # Replace spoiler markers with styled HTML spans
 
-    def add_transform(self, transform) -> None:
+    def add_transform(self, transform: Transformer) -> None:
         """
         Languages call this to register new transformations.
 
         :param transform: Callable that takes and returns a string.
+                          Pass a `MarkupRule` so it is skipped when its markers are absent;
+                          any other callable always runs as its own pass in the registered position.
         """
         self.transformers.append(transform)
+        self.transformers_version += 1
 
     def normalise_keywords(self, raw: Any) -> list[str]:
         """ Normalise YAML keywords to a python list """
@@ -221,10 +243,28 @@ class BaseLessonProcessor:
 
         return cleaned # Returned cleaned keywords
 
+    @property
+    def markers(self) -> re.Pattern | None:
+        """ Pattern finding the start of any registered trigger (see `marker_pattern`), cached until a transformer is registered. """
+        if self._markers is None or self._markers[0] != self.transformers_version:
+            self._markers = (self.transformers_version, marker_pattern(self.transformers))
+        return self._markers[1]
+
     def apply_transforms(self, content: str) -> str:
-        """ Applies all registered transformations to the given content string in sequence."""
+        """ Applies all registered transformations to the given content string, returning it as-is if it has no markers. """
+        markers = self.markers
+        if markers is not None and markers.search(content) is None:
+            return content # No marker characters at all, nothing to do
+
+        profiling = PROFILER.enabled # Opt-in per-transformer timings (see lesson_profiler)
         for transform in self.transformers:
+            if not profiling:
+                content = transform(content)
+                continue
+            start = time.perf_counter()
             content = transform(content)
+            name = getattr(transform, "name", None) or getattr(transform, "__qualname__", repr(transform))
+            PROFILER.record(f"transform:{name}", time.perf_counter() - start, len(content))
         return content # Return the fully transformed content after applying all transformations
 
     def transform_data(self, data: Any) -> Any:
@@ -233,22 +273,116 @@ class BaseLessonProcessor:
 
             Used within quizzes 
         """
+        if PROFILER.enabled:
+            with PROFILER.measure("transform_data") as result:
+                transformed = self._transform_data(data)
+                result["size"] = len(str(transformed))
+            return transformed
+        return self._transform_data(data)
+
+    def _transform_data(self, data: Any) -> Any:
         if isinstance(data, dict):
-            return {key: self.transform_data(value) for key, value in data.items()}
+            return {key: self._transform_data(value) for key, value in data.items()}
         if isinstance(data, list):
-            return [self.transform_data(item) for item in data]
+            return [self._transform_data(item) for item in data]
         if isinstance(data, str):
             return self.apply_transforms(data)
         return data
 
-    # Cache up to 16 lessons in memory for performance
-    # Has the issue of not updating if lesson files change on disk,
-    # however, a "cache clear" mechanism can be implemented later.
-    @lru_cache(maxsize=16)
+    def use_bundle(self, entries: dict[str, dict] | None, version: str | None = None) -> None:
+        """ Serves lessons and quizzes from pre-rendered bundle entries ({"lessons": {...}, "quizzes": {...}}), or live if None. """
+        self.bundle = entries
+        self.bundle_version = version if entries is not None else None
+        # Drop anything rendered before the bundle was attached
+        if self._cache is not None: self._cache.clear()
+        if self._quiz_cache is not None: self._quiz_cache.clear()
+
+    def _bundled(self, kind: str, slug: str) -> dict | None:
+        """ Returns the bundle entry for a lesson or quiz, if one is attached.
+
+            Entries were checked against their source when the bundle was attached, and are trusted
+            from then on without touching the file (see lesson_bundle).
+        """
+        if self.bundle is None:
+            return None
+        return self.bundle.get(kind, {}).get(slug)
+
+    def source_digest(self, kind: str, slug: str) -> str | None:
+        """ Returns the content hash of a lesson or quiz source, or None if it doesn't exist.
+
+            Bundled entries return the hash recorded when the bundle was built, so no file is touched.
+        """
+        bundled = self._bundled(kind, slug)
+        if bundled is not None:
+            return bundled["hash"]
+        return http_cache.file_digest(self.data_root / kind / f"{slug}{'.md' if kind == 'lessons' else '.json'}")
+
+    @property
+    def cache(self) -> RenderCache:
+        """ Cache of rendered lessons, sized by LESSON_CACHE_SIZE and LESSON_CACHE_POLICY. Counters are available via `cache.stats()`. """
+        if self._cache is None:
+            self._cache = RenderCache(
+                maxsize=current_app.config.get("LESSON_CACHE_SIZE", 64),
+                policy=current_app.config.get("LESSON_CACHE_POLICY", "lru"),
+            )
+        return self._cache
+
+    @property
+    def quiz_cache(self) -> RenderCache:
+        """ Cache of transformed quiz banks, sized by QUIZ_CACHE_SIZE. Files are re-checked at most every QUIZ_CACHE_CHECK_SECONDS. """
+        if self._quiz_cache is None:
+            self._quiz_cache = RenderCache(
+                maxsize=current_app.config.get("QUIZ_CACHE_SIZE", 128),
+                revalidate_after=current_app.config.get("QUIZ_CACHE_CHECK_SECONDS", 2.0),
+            )
+        return self._quiz_cache
+
+    @property
+    def index(self) -> LessonIndex:
+        """ Metadata-only lesson index, saved under LESSON_INDEX_DIR and checked for changed sources every LESSON_INDEX_CHECK_SECONDS (see lesson_index). """
+        if self._index is None:
+            index_dir = current_app.config.get("LESSON_INDEX_DIR")
+            self._index = LessonIndex(
+                self,
+                path=Path(index_dir) / f"lessons.{self.language.app_code}.index.json" if index_dir else None,
+                check_interval=current_app.config.get("LESSON_INDEX_CHECK_SECONDS", 2.0),
+            )
+        return self._index
+
     def load(self, slug: str) -> dict:
         if not re.fullmatch(r"[A-Za-z0-9\-]+", slug):
             raise ValueError("Invalid lesson slug.")
 
+        bundled = self._bundled("lessons", slug)
+        if bundled is not None:
+            return self._loaded(slug, bundled) # Pre-rendered, no file I/O
+
+        path = self.data_root / "lessons" / f"{slug}.md"
+        stamp = source_stamp(path)
+        if stamp is None:
+            raise FileNotFoundError(f"Lesson not found: {path}")
+
+        # Cached until the lesson file changes on disk
+        return self.cache.get_or_render(slug, stamp, lambda: self._loaded(slug, self.render(slug)))
+
+    def _loaded(self, slug: str, rendered: dict) -> dict:
+        return {
+            "meta": rendered["meta"],       # YAML metadata
+            "content": rendered["content"], # HTML content
+            "slug": slug,                   # Lesson slug
+            "data_root": self.data_root,
+        }
+
+    def render(self, slug: str) -> dict:
+        """ Renders a lesson from its markdown source. Returns its metadata and HTML content. """
+        if PROFILER.enabled:
+            with PROFILER.measure(f"lesson:{self.language.app_code}/{slug}") as result:
+                rendered = self._render(slug)
+                result["size"] = len(rendered["content"])
+            return rendered
+        return self._render(slug)
+
+    def _render(self, slug: str) -> dict:
         path = self.data_root / "lessons" / f"{slug}.md"
         if not path.exists():
             raise FileNotFoundError(f"Lesson not found: {path}")
@@ -257,20 +391,66 @@ class BaseLessonProcessor:
         content = self.apply_transforms(post.content) # Applies custom transformations
 
         # Convert MD to HTML
-        html = markdown.markdown( 
+        start = time.perf_counter()
+        html = render_markdown( 
             content,
-            extensions=MARKDOWN_EXTENSIONS,  # Install extensions
-            output_format="html5",           # type: ignore -> HTML5 output
+            extensions=MARKDOWN_EXTENSIONS,  # Install extensions (converter is reused, see markdown_pool)
+            output_format="html5",           # HTML5 output
+            record=PROFILER.record if PROFILER.enabled else None, # Per-extension timings (see markdown_pool)
         )
+        if PROFILER.enabled: PROFILER.record("markdown", time.perf_counter() - start, len(html))
 
         return {
             "meta": post.metadata,  # YAML metadata
             "content": html,        # HTML content
-            "slug": slug,           # Lesson slug
-            "data_root": self.data_root,
         }
-    
+
+    def load_quiz_data(self, slug: str) -> dict | None:
+        """ Returns the transformed quiz data for a lesson, or None if the lesson has no quizzes.
+
+            The data is cached and shared between requests, so callers must copy anything they modify.
+        """
+        if not re.fullmatch(r"[A-Za-z0-9\-]+", slug):
+            return None # Not a valid quiz file name
+
+        bundled = self._bundled("quizzes", slug)
+        if bundled is not None:
+            return bundled["data"] # Pre-rendered, no file I/O
+
+        path = self.data_root / "quizzes" / f"{slug}.json"
+        return self.quiz_cache.get_or_render_file(slug, path, lambda stamp: self._load_quiz_data(slug, stamp))
+
+    def _load_quiz_data(self, slug: str, stamp: Stamp) -> dict | None:
+        if stamp is None:
+            return None # No quizzes for this lesson
+        return self.render_quiz(slug)
+
+    def render_quiz(self, slug: str) -> dict | None:
+        """ Loads a quiz file and applies the transformations to every string in it. """
+        path = self.data_root / "quizzes" / f"{slug}.json"
+        if not path.exists():
+            return None
+
+        import json
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f) # Load the raw quiz data from the JSON file
+
+        return self.transform_data(data) # Convert raw MD strings into HTML
+
     def get_lesson(self, slug: str) -> "Lesson":
+        lesson = self.index.get(slug) # Indexed metadata, no file I/O
+        if lesson is not None:
+            return lesson
+        return self.read_lesson(slug)
+
+    def read_lesson(self, slug: str) -> "Lesson":
+        """ Reads a lesson's metadata from the bundle, or parses it from its source file. """
+        bundled = self._bundled("lessons", slug)
+        if bundled is not None:
+            return Lesson(**bundled["lesson"]) # Pre-parsed metadata
+        return self.parse_lesson(slug)
+
+    def parse_lesson(self, slug: str) -> "Lesson":
         # Load just the metadata and raw markdown content for search
         lesson_path = self.data_root / "lessons" / f"{slug}.md"
         if not lesson_path.exists(): raise LessonFetchException(f"Lesson file '{slug}' not found.")
@@ -327,45 +507,26 @@ class BaseLessonProcessor:
             query_tags=" ".join(keywords),
         )
 
-    @lru_cache(maxsize=16) # Cache the list of lessons for performance, since it is used frequently for quizzes and navigation.
     def get_lessons(self) -> list[dict[str, list["Lesson"]]]:
-        """ Loads all lessons and organizes them by category based on the map.json file.
+        """ Returns all lessons organised by category based on the map.json file.
             Returns a list of dictionaries with category names and their corresponding lessons.
             Each lesson includes its slug, title, summary, and plain text content for search indexing.
-        """
-        lesson_slugs_path = self.data_root / "map.json"
 
-        if lesson_slugs_path.exists():
-            import json
-            with open(lesson_slugs_path, "r", encoding="utf-8") as f:
-                slug_data = json.load(f)
-        else:
-            slug_data = {}
-
-        categories: list[dict[str, list["Lesson"]]] = []
-
-        for category_name, slugs in slug_data.items(): # Iterate through each category
-            category_lessons: list[Lesson] = [] # Lessons in this category
-
-            for slug in slugs:
-                # Iterate through slugs and attempt to load each lesson, logging any issues
-                try:
-                    category_lessons.append(self.get_lesson(slug))
-                except LessonFetchException as e:
-                    current_app.logger.warning(
-                        f"Failed to load lesson '{slug}' in category '{category_name}': {str(e)}"
-                    )
-                except Exception as e:
-                    current_app.logger.warning(
-                        f"An unknown error occured while fetching '{slug}' in category '{category_name}': {str(e)}"
-                    )
-
-            categories.append({
-                "category": category_name,
-                "lessons": category_lessons
-            })
-
-        return categories # Return the list of categories with their lessons
+            Served from the lesson index, which only re-parses lessons whose files changed.
+        """
+        return self.index.categories()
+
+    def search(self, query: str, limit: int = 20) -> list[dict[str, Any]]:
+        """ Ranked search over the listed lessons (see lesson_search). Returns slug, title, summary, category and score. """
+        categories = self.get_lessons() # Also picks up edited lessons
+        search = self._search
+        if search is None or search.version != self.index.version:
+            search = self._search = LessonSearch(
+                [lesson for group in categories for lesson in group["lessons"]],
+                categories={lesson.slug: group["category"] for group in categories for lesson in group["lessons"]},
+                version=self.index.version,
+            )
+        return search.search(query, limit)
 
 @dataclass
 class Lesson:
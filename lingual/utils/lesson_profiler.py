@@ -0,0 +1,112 @@
+"""
+Opt-in timing instrumentation for the lesson pipeline.
+
+When enabled (LESSON_PROFILING), every custom markup transformer, `transform_data` call, markdown conversion
+(also broken down per markdown extension, see markdown_pool) and whole lesson render records its wall time and
+output size into in-process histograms. When disabled, the pipeline only pays for one attribute check per call.
+
+Results are available from `PROFILER.report()`, the /debug/lesson-profile endpoint (debug mode only) and `flask lessons profile`.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+# Histogram bucket upper bounds, in microseconds: 1µs, 2µs, 4µs ... ~1s
+BUCKET_BOUNDS = [2 ** power for power in range(21)]
+
+class Histogram:
+    """ Log-scale histogram of durations, with output sizes. """
+
+    __slots__ = ("count", "total", "minimum", "maximum", "size_total", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0 # Seconds
+        self.minimum = float("inf")
+        self.maximum = 0.0
+        self.size_total = 0 # Characters of output
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1) # Last bucket holds anything slower than the largest bound
+
+    def add(self, seconds: float, size: int = 0) -> None:
+        self.count += 1
+        self.total += seconds
+        self.size_total += size
+        if seconds < self.minimum: self.minimum = seconds
+        if seconds > self.maximum: self.maximum = seconds
+
+        micros = seconds * 1_000_000
+        for position, bound in enumerate(BUCKET_BOUNDS):
+            if micros <= bound:
+                self.buckets[position] += 1
+                return
+        self.buckets[-1] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """ Approximate percentile in seconds (upper bound of the bucket it falls in). """
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for position, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                bound = BUCKET_BOUNDS[position] / 1_000_000 if position < len(BUCKET_BOUNDS) else self.maximum
+                return min(bound, self.maximum)
+        return self.maximum
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "min_ms": self.minimum * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(0.5) * 1000,
+            "p95_ms": self.percentile(0.95) * 1000,
+            "max_ms": self.maximum * 1000,
+            "mean_size": self.size_total / self.count if self.count else 0.0,
+            "buckets_us": dict(zip([*map(str, BUCKET_BOUNDS), "inf"], self.buckets)),
+        }
+
+class LessonProfiler:
+    """ Collects named histograms. Names are prefixed by kind, e.g. "transform:furigana" or "lesson:nihongo/te-form". """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._histograms: dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, size: int = 0) -> None:
+        """ Adds one measurement to the named histogram. """
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.add(seconds, size)
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[dict[str, int]]:
+        """ Times the block. Set `result["size"]` inside the block to record the output size. """
+        result = {"size": 0}
+        start = time.perf_counter()
+        try:
+            yield result
+        finally:
+            self.record(name, time.perf_counter() - start, result["size"])
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def report(self, prefix: str = "") -> list[dict[str, Any]]:
+        """ Returns every histogram (optionally only names starting with prefix), slowest total time first. """
+        with self._lock:
+            rows = [{"name": name, **histogram.to_dict()} for name, histogram in self._histograms.items() if name.startswith(prefix)]
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+PROFILER = LessonProfiler() # Process-wide profiler, enabled by init_app
+
+def init_app(app):
+    # Enable lesson pipeline instrumentation if configured
+    PROFILER.enabled = bool(app.config.get("LESSON_PROFILING", False))
@@ -0,0 +1,163 @@
+"""
+Ranked, server-side lesson search.
+
+An in-memory inverted index over each lesson's title, keywords, summary and plain content, ranked with BM25F
+(BM25 with per-field weights). Latin text is indexed as words; kana and kanji, which have no spaces, are indexed
+as overlapping character bigrams. Every query word must match, but a kana or kanji word only needs most of its
+bigrams (MIN_BIGRAM_OVERLAP), so inflected forms still match: 食べる (食べ, べる) finds 食べます through 食べ.
+The last query term also matches as a prefix, so results update while the user is still typing.
+"""
+
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Iterable
+
+# Field weights, mirroring the relevance order of the old client-side search
+FIELD_WEIGHTS = {
+    "title": 2.0,
+    "keywords": 1.75,
+    "summary": 1.5,
+    "content": 1.0,
+}
+
+# BM25 parameters: term frequency saturation and document length normalisation
+K1 = 1.2
+B = 0.75
+
+MAX_PREFIX_EXPANSIONS = 64 # Cap on the number of index terms a prefix query expands to
+MIN_BIGRAM_OVERLAP = 0.5 # Share of a kana or kanji word's bigrams a document must contain (at least one)
+
+TAG_RE = re.compile(r'<[^>]+>') # Titles and summaries are transformed, so may contain HTML (e.g. furigana)
+TOKEN_RE = re.compile(r'[a-z0-9]+|[぀-ヿ㐀-䶿一-鿿豈-﫿々ー]+')
+CJK_RE = re.compile(r'[぀-ヿ㐀-䶿一-鿿豈-﫿々ー]')
+
+def tokenise_words(text: str) -> list[list[str]]:
+    """ Splits text into words, each as its index terms: a lowercase Latin word, or the character bigrams of a kana and kanji run. """
+    text = unicodedata.normalize("NFKC", TAG_RE.sub(" ", text)).lower() # NFKC folds full-width letters and half-width kana
+
+    words: list[list[str]] = []
+    for run in TOKEN_RE.findall(text):
+        if not CJK_RE.match(run) or len(run) == 1:
+            words.append([run]) # Latin words, and single characters (e.g. particles) as unigrams
+        else:
+            words.append([run[i:i + 2] for i in range(len(run) - 1)])
+    return words
+
+def tokenise(text: str) -> list[str]:
+    """ Splits text into index terms: lowercase words for Latin text, character bigrams for kana and kanji. """
+    return [term for word in tokenise_words(text) for term in word]
+
+class LessonSearch:
+    """
+    Inverted index over a list of lessons.
+
+    :param lessons: `Lesson` records to index.
+    :param categories: Category of each lesson slug, returned with results.
+    :param version: Version of the lesson index this was built from, used to detect when to rebuild.
+    """
+
+    def __init__(self, lessons: Iterable[Any], categories: dict[str, str] | None = None, version: int = 0):
+        self.version = version
+        self._docs: list[dict[str, Any]] = [] # Result payload of each document
+        self._lengths: list[float] = [] # Weighted length of each document
+        self._postings: dict[str, list[tuple[int, float]]] = defaultdict(list) # term -> [(document, weighted term frequency)]
+
+        categories = categories or {}
+        for doc_id, lesson in enumerate(lessons):
+            frequencies: dict[str, float] = defaultdict(float)
+            length = 0.0
+            for field, weight in FIELD_WEIGHTS.items():
+                value = getattr(lesson, field, "")
+                terms = tokenise(" ".join(value) if isinstance(value, list) else value or "")
+                for term in terms:
+                    frequencies[term] += weight
+                length += weight * len(terms)
+
+            for term, frequency in frequencies.items():
+                self._postings[term].append((doc_id, frequency))
+            self._lengths.append(length)
+            self._docs.append({
+                "slug": lesson.slug,
+                "title": lesson.title,
+                "summary": lesson.summary,
+                "category": categories.get(lesson.slug),
+            })
+
+        self._postings = dict(self._postings)
+        self._terms: list[str] = sorted(self._postings) # Sorted vocabulary for prefix lookups
+        self._average_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+
+    def _idf(self, term: str) -> float:
+        """ Inverse document frequency, BM25 variant that is never negative. """
+        count = len(self._postings.get(term, ()))
+        total = len(self._docs)
+        return math.log(1 + (total - count + 0.5) / (count + 0.5))
+
+    def _score_term(self, term: str) -> dict[int, float]:
+        """ BM25 contribution of one term to every document containing it. """
+        idf = self._idf(term)
+        scores: dict[int, float] = {}
+        for doc_id, frequency in self._postings.get(term, ()):
+            norm = K1 * (1 - B + B * self._lengths[doc_id] / self._average_length)
+            scores[doc_id] = idf * frequency * (K1 + 1) / (frequency + norm)
+        return scores
+
+    def _expand(self, prefix: str) -> list[str]:
+        """ Returns the index terms starting with the prefix. """
+        start = bisect_left(self._terms, prefix)
+        matches: list[str] = []
+        for term in self._terms[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def _score_prefix(self, prefix: str) -> dict[int, float]:
+        """ Like `_score_term`, scoring each document by its best matching expansion of the prefix. """
+        scores: dict[int, float] = {}
+        for expansion in self._expand(prefix):
+            for doc_id, score in self._score_term(expansion).items():
+                if score > scores.get(doc_id, 0.0):
+                    scores[doc_id] = score
+        return scores
+
+    def search(self, query: str, limit: int = 20) -> list[dict[str, Any]]:
+        """
+        Returns the lessons matching every word of the query, best match first.
+
+        Kana and kanji words match on most of their bigrams (see MIN_BIGRAM_OVERLAP), scoring by the ones found.
+        The last term also matches as a prefix, unless the query ends with a space.
+        """
+        words = [list(dict.fromkeys(word)) for word in dict.fromkeys(tuple(word) for word in tokenise_words(query))] # Unique, in order
+        if not words or not self._docs:
+            return []
+
+        complete = query[-1:].isspace() # The user has finished typing the last word
+        totals: dict[int, float] | None = None
+        for position, word in enumerate(words):
+            scores: dict[int, float] = {}
+            matched: dict[int, int] = {} # Terms of the word found in each document
+            for offset, term in enumerate(word):
+                last = position == len(words) - 1 and offset == len(word) - 1
+                for doc_id, score in (self._score_term(term) if complete or not last else self._score_prefix(term)).items():
+                    scores[doc_id] = scores.get(doc_id, 0.0) + score
+                    matched[doc_id] = matched.get(doc_id, 0) + 1
+
+            required = max(1, math.ceil(len(word) * MIN_BIGRAM_OVERLAP)) # 1 for Latin words and unigrams, i.e. all of it
+            scores = {doc_id: score for doc_id, score in scores.items() if matched[doc_id] >= required}
+            if totals is None:
+                totals = scores
+            else:
+                totals = {doc_id: total + scores[doc_id] for doc_id, total in totals.items() if doc_id in scores} # Every word must match
+
+            if not totals:
+                return []
+
+        ranked = sorted(totals.items(), key=lambda item: (-item[1], item[0])) # type: ignore -> totals is set for a non-empty query
+        return [{**self._docs[doc_id], "score": round(score, 4)} for doc_id, score in ranked[:limit]]
+
+    def __len__(self) -> int:
+        return len(self._docs)
@@ -0,0 +1,117 @@
+"""
+Pooled, reusable Markdown converters.
+
+`markdown.markdown()` builds a new `Markdown` instance, and instantiates and registers every extension,
+on each call. Here each thread keeps one pre-configured converter per extension set, which is reset
+between documents, so rendering only pays for parsing. Converters are never shared between threads,
+so this is safe under threaded workers (e.g. gunicorn's gthread).
+
+When a `record` callback is passed (lesson profiling), a separate converter is used whose processors
+are timed and attributed to the extension that registered them ("core" for Markdown's own). After each
+document, every processor's time is reported as `markdown:<extension>/<processor>`, and each extension's
+total as `markdown:<extension>`. Times are exclusive: a processor's time excludes the processors it calls
+(e.g. the inline patterns run by the core InlineProcessor, or the blocks nested in a blockquote).
+"""
+
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Iterable
+import markdown
+
+_local = threading.local() # Per-thread converters: {(extensions, output_format, record): Markdown}
+
+Recorder = Callable[[str, float, int], None] # record(name, seconds, size), e.g. PROFILER.record
+
+# Registries of a converter holding processors, with the method each processor is run through
+PROCESSOR_REGISTRIES = (
+    ("preprocessors", "run"),
+    ("parser.blockprocessors", "run"),
+    ("treeprocessors", "run"),
+    ("inlinePatterns", "handleMatch"),
+    ("postprocessors", "run"),
+)
+
+class _ProcessorTimer:
+    """ Accumulates the exclusive time of each wrapped processor while a document is converted. """
+
+    def __init__(self):
+        self.totals: dict[str, float] = defaultdict(float) # "extension/Processor" -> seconds
+        self._children = [0.0] # Time spent in nested wrapped calls, per active call
+
+    def wrap(self, label: str, func: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            self._children.append(0.0)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self.totals[label] += elapsed - self._children.pop()
+                self._children[-1] += elapsed
+        return timed
+
+    def flush(self, record: Recorder) -> None:
+        """ Reports and resets the accumulated times. """
+        extensions: dict[str, float] = defaultdict(float)
+        for label, seconds in self.totals.items():
+            record(f"markdown:{label}", seconds, 0)
+            extensions[label.split("/", 1)[0]] += seconds
+        for extension, seconds in extensions.items():
+            record(f"markdown:{extension}", seconds, 0)
+        self.totals.clear()
+
+def _processors(converter: markdown.Markdown) -> list[tuple[object, str]]:
+    """ Every registered processor of a converter, with the name of the method it is run through. """
+    processors = []
+    for path, method in PROCESSOR_REGISTRIES:
+        registry = converter
+        for attribute in path.split("."):
+            registry = getattr(registry, attribute)
+        processors.extend((processor, method) for processor in registry) # type: ignore -> Registries are iterable
+    return processors
+
+def _timed_converter(extensions: tuple[str, ...], output_format: str) -> markdown.Markdown:
+    """ Builds a converter whose processors are timed, registering extensions one at a time to attribute processors to them. """
+    converter = markdown.Markdown(output_format=output_format) # type: ignore -> Literal output formats
+    # Processors are kept referenced, as ids of processors an extension replaces could otherwise be reused
+    owners = {id(processor): (processor, "core") for processor, _ in _processors(converter)}
+    for extension in extensions:
+        converter.registerExtensions([extension], {})
+        for processor, _ in _processors(converter):
+            owners.setdefault(id(processor), (processor, extension))
+
+    timer = _ProcessorTimer()
+    for processor, method in _processors(converter):
+        label = f"{owners[id(processor)][1]}/{type(processor).__name__}"
+        setattr(processor, method, timer.wrap(label, getattr(processor, method)))
+    converter._timer = timer # type: ignore -> Read back by render_markdown
+    return converter
+
+def render_markdown(text: str, extensions: Iterable[str] = (), output_format: str = "html5", record: Recorder | None = None) -> str:
+    """
+    Converts markdown to HTML, equivalent to `markdown.markdown(text, extensions=..., output_format=...)`.
+
+    :param record: Optional callback receiving the time spent in each extension's processors (see module docstring).
+    """
+    key = (tuple(extensions), output_format, record)
+
+    converters: dict | None = getattr(_local, "converters", None)
+    if converters is None:
+        converters = _local.converters = {}
+
+    # Taken out of the pool while in use, so a nested render on the same thread gets its own converter
+    converter = converters.pop(key, None)
+    if converter is None and record is not None:
+        converter = _timed_converter(key[0], output_format)
+    elif converter is None:
+        converter = markdown.Markdown(extensions=list(key[0]), output_format=output_format) # type: ignore -> Literal output formats
+
+    html = converter.reset().convert(text) # Not returned to the pool if conversion fails, as its state may be inconsistent
+    if record is not None: converter._timer.flush(record) # type: ignore -> Set by _timed_converter
+    converters[key] = converter
+    return html
+
+def clear_pool() -> None:
+    """ Drops the current thread's converters, e.g. after changing extension configuration. """
+    _local.converters = {}
@@ -0,0 +1,122 @@
+"""
+Flat index of quiz questions, for building quizzes without copying whole question banks.
+
+Each lesson's transformed quiz data (see `BaseLessonProcessor.load_quiz_data`) is indexed once into a tuple of
+`QuestionRef`s (lesson, group, offset and a stable id). The index for a lesson is rebuilt only when the processor
+hands back different quiz data, i.e. when the quiz file changed or the lesson bundle was swapped.
+
+Sampling only touches the questions it picks: picking k questions from L lessons costs O(k + L log L), however
+large the banks are. Questions are spread evenly across lessons (stratified), and a seed makes a quiz reproducible.
+"""
+
+import hashlib
+import json
+import random
+import threading
+from typing import Any, Iterable, NamedTuple
+
+class QuestionRef(NamedTuple):
+    """ Position of one question in a lesson's quiz data. """
+    lesson: str # Lesson slug
+    group: str  # Quiz group id within the lesson's quiz file
+    offset: int # Index of the question in the group's bank
+    id: str     # Stable id, derived from the lesson, group and question content
+
+def question_id(lesson: str, group: str, question: Any) -> str:
+    """ Returns a short content hash identifying a question. Unchanged as long as the question itself is unchanged. """
+    content = json.dumps([lesson, group, question], ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=8).hexdigest()
+
+class QuestionIndex:
+    """
+    Per-processor index of quiz questions.
+
+    :param processor: Lesson processor whose `load_quiz_data` provides the (cached) quiz data.
+    """
+
+    def __init__(self, processor):
+        self.processor = processor
+        self._lessons: dict[str, tuple[dict, tuple[QuestionRef, ...]]] = {} # Slug -> (quiz data it was built from, refs)
+        self._ids: dict[str, QuestionRef] = {} # Question id -> ref, for every indexed lesson
+        self._lock = threading.Lock()
+
+    def questions(self, lesson: str) -> tuple[QuestionRef, ...]:
+        """ Returns the indexed questions of a lesson, empty if it has no quiz data. """
+        data = self.processor.load_quiz_data(lesson)
+        if not data:
+            return ()
+
+        indexed = self._lessons.get(lesson)
+        if indexed is not None and indexed[0] is data:
+            return indexed[1] # Quiz data unchanged since it was indexed
+
+        refs = self._build(lesson, data)
+        with self._lock:
+            previous = self._lessons.get(lesson)
+            if previous is not None:
+                for ref in previous[1]:
+                    self._ids.pop(ref.id, None)
+            self._lessons[lesson] = (data, refs)
+            self._ids.update((ref.id, ref) for ref in refs)
+        return refs
+
+    @staticmethod
+    def _build(lesson: str, data: dict) -> tuple[QuestionRef, ...]:
+        refs: list[QuestionRef] = []
+        seen: dict[str, int] = {} # Identical questions in one lesson get a numbered suffix so ids stay unique
+        for group_id, group in data.items():
+            for offset, question in enumerate(group.get("bank", [])):
+                base_id = question_id(lesson, group_id, question)
+                count = seen.get(base_id, 0)
+                seen[base_id] = count + 1
+                refs.append(QuestionRef(lesson, group_id, offset, f"{base_id}-{count}" if count else base_id))
+        return tuple(refs)
+
+    def get(self, question_id: str) -> QuestionRef | None:
+        """ Looks up an indexed question by id. """
+        return self._ids.get(question_id)
+
+    def resolve(self, ref: QuestionRef) -> dict | None:
+        """ Returns the question a ref points to, or None if its lesson's quiz data no longer has it at that position. """
+        self.questions(ref.lesson) # Re-indexes the lesson if its quiz data changed
+        if self._ids.get(ref.id) != ref:
+            return None # The question was edited, moved or removed, so the offset may point at another one
+
+        data = self.processor.load_quiz_data(ref.lesson)
+        try:
+            return data[ref.group]["bank"][ref.offset] # type: ignore -> Missing data is handled below
+        except (TypeError, KeyError, IndexError):
+            return None
+
+    def sample(self, lessons: Iterable[str], count: int, seed: int | None = None) -> list[QuestionRef]:
+        """
+        Picks up to `count` distinct questions from the lessons, in random order.
+
+        Lessons are represented as evenly as their bank sizes allow: each gets an equal share,
+        and lessons with fewer questions than their share pass the rest on to the others.
+        """
+        rng = random.Random(seed)
+        banks = [refs for refs in map(self.questions, dict.fromkeys(lessons)) if refs] # Unique lessons, in order
+        if count <= 0 or not banks:
+            return []
+
+        picked: list[QuestionRef] = []
+        remaining = count
+        banks.sort(key=len) # Smallest first, so their leftover share can be handed on
+        for position, refs in enumerate(banks):
+            share = remaining // (len(banks) - position)
+            if len(refs) <= share:
+                picked.extend(refs) # Whole bank fits in its share
+                remaining -= len(refs)
+                continue
+
+            # Every remaining bank is larger than the share: give each the share, and one extra to `extra` random banks
+            rest = banks[position:]
+            extra = set(rng.sample(range(len(rest)), remaining - share * len(rest)))
+            for rest_position, rest_refs in enumerate(rest):
+                take = share + (rest_position in extra)
+                picked.extend(rest_refs[offset] for offset in rng.sample(range(len(rest_refs)), take))
+            break
+
+        rng.shuffle(picked)
+        return picked
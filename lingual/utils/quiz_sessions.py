@@ -0,0 +1,275 @@
+"""
+Storage for users' active quizzes, between generating a quiz and playing it.
+
+Two backends are available, chosen with QUIZ_SESSION_BACKEND:
+
+- "memory": per-process LRU with expiry. Fast, but each worker has its own sessions,
+  so only suitable for a single worker (e.g. the development server).
+- "sqlite": a SQLite file shared by every worker on the host (QUIZ_SESSION_DB_PATH).
+
+Both expire sessions QUIZ_SESSION_TTL_SECONDS after they were saved and keep at most QUIZ_SESSION_MAX sessions,
+dropping the least recently used first. Counters are available from `stats()`.
+"""
+
+import json
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Hashable
+from flask import current_app
+
+class QuizSessionStore(ABC):
+    """
+    Base class for quiz session backends. Sessions are JSON-serialisable dicts keyed by user id.
+
+    :param ttl: Seconds a session is kept after it was saved.
+    :param maxsize: Maximum number of sessions, least recently used are dropped first. None for unbounded.
+    """
+
+    backend = "base"
+
+    def __init__(self, ttl: float = 3 * 60 * 60, maxsize: int | None = 10_000):
+        if ttl <= 0:
+            raise ValueError("Quiz session TTL must be positive.")
+        if maxsize is not None and maxsize < 1:
+            raise ValueError("Quiz session store size must be at least 1.")
+        self.ttl = ttl
+        self.maxsize = maxsize
+
+        # Counters (per process)
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0 # Sessions dropped because their TTL passed
+        self.evictions = 0 # Sessions dropped to stay within maxsize
+
+    @abstractmethod
+    def get(self, user_id: Hashable) -> dict | None:
+        """ Returns the user's active quiz session, or None if there is none or it expired. """
+        ...
+
+    @abstractmethod
+    def put(self, user_id: Hashable, session: dict) -> None:
+        """ Saves the user's quiz session, replacing any previous one and restarting its TTL. """
+        ...
+
+    @abstractmethod
+    def delete(self, user_id: Hashable) -> None:
+        """ Removes the user's quiz session, if any. """
+        ...
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """ Removes every expired session. Returns how many were removed. """
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def stats(self) -> dict[str, Any]:
+        """ Returns the store counters, e.g. for logging or a debug page. """
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+class MemoryQuizSessionStore(QuizSessionStore):
+    """
+    Per-process quiz sessions, in an LRU ordered dict with expiry times.
+
+    Expired sessions are dropped when looked up, and all of them at most once every `purge_interval` seconds when a session is saved.
+    """
+
+    backend = "memory"
+
+    def __init__(self, ttl: float = 3 * 60 * 60, maxsize: int | None = 10_000, purge_interval: float = 60.0):
+        super().__init__(ttl, maxsize)
+        self.purge_interval = purge_interval
+        self._last_purge = 0.0
+        self._sessions: OrderedDict[Hashable, tuple[float, dict]] = OrderedDict() # User id -> (expiry, session), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, user_id: Hashable) -> dict | None:
+        with self._lock:
+            entry = self._sessions.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                del self._sessions[user_id]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._sessions.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user_id: Hashable, session: dict) -> None:
+        with self._lock:
+            self._sessions.pop(user_id, None)
+            now = time.monotonic()
+            self._sessions[user_id] = (now + self.ttl, session)
+            if now - self._last_purge >= self.purge_interval:
+                self._last_purge = now
+                self._purge_expired()
+            while self.maxsize is not None and len(self._sessions) > self.maxsize:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, user_id: Hashable) -> None:
+        with self._lock:
+            self._sessions.pop(user_id, None)
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._purge_expired()
+
+    def _purge_expired(self) -> int:
+        """ Must be called with the lock held. """
+        now = time.monotonic()
+        expired = [user_id for user_id, (expiry, _) in self._sessions.items() if expiry <= now]
+        for user_id in expired:
+            del self._sessions[user_id]
+        self.expired += len(expired)
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+class SQLiteQuizSessionStore(QuizSessionStore):
+    """
+    Quiz sessions in a SQLite file, shared by every worker process on the host.
+
+    Each thread uses its own connection. WAL mode lets workers read while another one writes.
+    Expired sessions are purged, and the least recently used dropped beyond `maxsize`, at most once
+    every `purge_interval` seconds when a session is saved.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, path: Path | str, ttl: float = 3 * 60 * 60, maxsize: int | None = 10_000, purge_interval: float = 60.0):
+        super().__init__(ttl, maxsize)
+        self.path = Path(path)
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._last_purge = 0.0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS quiz_sessions ("
+                "user_id TEXT PRIMARY KEY, "
+                "payload TEXT NOT NULL, "
+                "expires REAL NOT NULL, "
+                "used REAL NOT NULL)" # Last access, for least recently used eviction
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS quiz_sessions_expires ON quiz_sessions (expires)")
+            connection.execute("CREATE INDEX IF NOT EXISTS quiz_sessions_used ON quiz_sessions (used)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """ Returns this thread's connection, opening it on first use (or after a fork). """
+        connection = getattr(self._local, "connection", None)
+        if connection is None or getattr(self._local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None) # Autocommit, transactions are explicit
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, user_id: Hashable) -> dict | None:
+        now = time.time() # Wall clock, as it is compared across processes
+        connection = self._connect()
+        row = connection.execute(
+            "SELECT payload FROM quiz_sessions WHERE user_id = ? AND expires > ?",
+            (str(user_id), now)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        connection.execute("UPDATE quiz_sessions SET used = ? WHERE user_id = ?", (now, str(user_id)))
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, user_id: Hashable, session: dict) -> None:
+        now = time.time()
+        payload = json.dumps(session, ensure_ascii=False, separators=(",", ":"))
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "INSERT OR REPLACE INTO quiz_sessions (user_id, payload, expires, used) VALUES (?, ?, ?, ?)",
+                (str(user_id), payload, now + self.ttl, now)
+            )
+            if now - self._last_purge >= self.purge_interval:
+                self._last_purge = now
+                self.expired += connection.execute("DELETE FROM quiz_sessions WHERE expires <= ?", (now,)).rowcount
+                if self.maxsize is not None:
+                    self.evictions += connection.execute(
+                        "DELETE FROM quiz_sessions WHERE user_id IN ("
+                        "SELECT user_id FROM quiz_sessions ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                        (self.maxsize,)
+                    ).rowcount
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def delete(self, user_id: Hashable) -> None:
+        self._connect().execute("DELETE FROM quiz_sessions WHERE user_id = ?", (str(user_id),))
+
+    def purge_expired(self) -> int:
+        removed = self._connect().execute("DELETE FROM quiz_sessions WHERE expires <= ?", (time.time(),)).rowcount
+        self.expired += removed
+        return removed
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM quiz_sessions WHERE expires > ?", (time.time(),)).fetchone()[0]
+
+    def stats(self) -> dict[str, Any]:
+        stats = super().stats()
+        stats["path"] = str(self.path)
+        try:
+            stats["bytes"] = self.path.stat().st_size
+        except OSError:
+            stats["bytes"] = 0
+        return stats
+
+BACKENDS = {
+    "memory": MemoryQuizSessionStore,
+    "sqlite": SQLiteQuizSessionStore,
+}
+
+def create_store(config) -> QuizSessionStore:
+    """ Creates the quiz session store described by the app config. """
+    backend = config.get("QUIZ_SESSION_BACKEND", "memory")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown quiz session backend '{backend}'. Expected one of: {', '.join(BACKENDS)}.")
+
+    options = {
+        "ttl": config.get("QUIZ_SESSION_TTL_SECONDS", 3 * 60 * 60),
+        "maxsize": config.get("QUIZ_SESSION_MAX", 10_000) or None, # 0 for unbounded
+    }
+    if backend == "sqlite":
+        options["path"] = config["QUIZ_SESSION_DB_PATH"]
+    return BACKENDS[backend](**options)
+
+def get_store() -> QuizSessionStore:
+    """ Returns the current app's quiz session store. """
+    return current_app.extensions["quiz_sessions"]
+
+def init_app(app):
+    # Create the quiz session store for the configured backend
+    app.extensions["quiz_sessions"] = create_store(app.config)
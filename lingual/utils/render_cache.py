@@ -0,0 +1,170 @@
+"""
+Size-bounded cache for rendered content that is invalidated when its source file changes.
+
+Entries are stored with the "stamp" of their source file (modification time and size). A lookup
+with a different stamp is treated as a miss, so an edited file is re-rendered and nothing else is.
+Hot paths can skip the stamp check for a short time after a file was last checked (`revalidate_after`).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Hashable
+
+Stamp = tuple[int, int] | None # (mtime_ns, size) of a source file, None if it doesn't exist
+
+POLICIES = ("lru", "lfu", "fifo") # Supported eviction policies
+
+def source_stamp(path: Path | str) -> Stamp:
+    """ Returns a cheap fingerprint of a file that changes whenever the file is edited. """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+class RenderCache:
+    """
+    Thread-safe cache of rendered content keyed by slug and validated by source stamp.
+
+    :param maxsize: Maximum number of entries. None for unbounded, 0 disables caching.
+    :param policy: Eviction policy, one of "lru" (least recently used), "lfu" (least frequently used) or "fifo".
+    :param revalidate_after: For `get_or_render_file`, seconds an entry is trusted before its file is checked again.
+                             0 checks the file on every lookup.
+    """
+
+    def __init__(self, maxsize: int | None = 64, policy: str = "lru", revalidate_after: float = 0.0):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown cache policy '{policy}'. Expected one of: {', '.join(POLICIES)}.")
+        if maxsize is not None and maxsize < 0:
+            raise ValueError("Cache size cannot be negative.")
+
+        self.maxsize = maxsize
+        self.policy = policy
+        self.revalidate_after = revalidate_after
+        self._entries: OrderedDict[Hashable, tuple[Stamp, Any]] = OrderedDict() # Ordered by insertion (or use, for LRU)
+        self._checked: dict[Hashable, float] = {} # When each entry's file was last checked, for get_or_render_file
+        self._uses: dict[Hashable, int] = {} # Use counts, for LFU
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0 # Misses caused by the source changing
+
+    def get(self, key: Hashable, stamp: Stamp, default: Any = None) -> Any:
+        """ Returns the cached value if it was rendered from a source with the same stamp. """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            if entry[0] != stamp: # Source changed since the value was rendered
+                del self._entries[key]
+                self._uses.pop(key, None)
+                self._checked.pop(key, None)
+                self.misses += 1
+                self.invalidations += 1
+                return default
+
+            self.hits += 1
+            if self.policy == "lru":
+                self._entries.move_to_end(key)
+            elif self.policy == "lfu":
+                self._uses[key] += 1
+            return entry[1]
+
+    def put(self, key: Hashable, stamp: Stamp, value: Any) -> None:
+        """ Stores a rendered value, evicting entries if the cache is full. """
+        if self.maxsize == 0:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._entries[key] = (stamp, value)
+                if self.policy != "fifo": self._entries.move_to_end(key) # FIFO keeps the original insertion order
+                return
+
+            while self.maxsize is not None and len(self._entries) >= self.maxsize:
+                self._evict()
+
+            self._entries[key] = (stamp, value)
+            if self.policy == "lfu":
+                self._uses[key] = 1
+
+    def get_or_render(self, key: Hashable, stamp: Stamp, render: Callable[[], Any]) -> Any:
+        """ Returns the cached value, or renders, caches and returns it. """
+        missing = object()
+        value = self.get(key, stamp, missing)
+        if value is missing:
+            value = render() # Rendered outside the lock, so slow renders don't block other lessons
+            self.put(key, stamp, value)
+        return value
+
+    def get_or_render_file(self, key: Hashable, path: Path | str, render: Callable[[Stamp], Any]) -> Any:
+        """
+        Returns the cached value rendered from a file, or renders, caches and returns it.
+
+        Within `revalidate_after` seconds of the last check, a cached value is returned without touching the file.
+        `render` receives the file's stamp (None if it doesn't exist).
+        """
+        checked = self._checked.get(key)
+        if checked is not None and time.monotonic() - checked < self.revalidate_after:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    if self.policy == "lru":
+                        self._entries.move_to_end(key)
+                    elif self.policy == "lfu":
+                        self._uses[key] += 1
+                    return entry[1]
+
+        stamp = source_stamp(path)
+        value = self.get_or_render(key, stamp, lambda: render(stamp))
+        if key in self._entries:
+            self._checked[key] = time.monotonic()
+        return value
+
+    def _evict(self) -> None:
+        """ Removes one entry according to the policy. Must be called with the lock held. """
+        if self.policy == "lfu":
+            key = min(self._entries, key=lambda k: self._uses.get(k, 0)) # Ties go to the oldest entry
+            del self._entries[key]
+            self._uses.pop(key, None)
+        else:
+            key, _ = self._entries.popitem(last=False) # Oldest (FIFO) or least recently used (LRU)
+        self._checked.pop(key, None)
+        self.evictions += 1
+
+    def clear(self) -> None:
+        """ Removes every entry. Counters are kept. """
+        with self._lock:
+            self._entries.clear()
+            self._uses.clear()
+            self._checked.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """ Returns the cache counters, e.g. for logging or a debug page. """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "policy": self.policy,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
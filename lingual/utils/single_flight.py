@@ -0,0 +1,83 @@
+"""
+Request coalescing ("single flight"): concurrent calls for the same key share one execution.
+
+The first caller for a key runs the work; callers arriving while it is in flight wait for
+its result (or exception) instead of repeating it.
+"""
+
+import threading
+from typing import Any, Callable, Hashable, Iterable
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+class SingleFlight:
+    """ Coalesces concurrent work per key within a process. Counters show how many calls were shared. """
+
+    def __init__(self):
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+        # Counters
+        self.executed = 0 # Keys this process did the work for
+        self.shared = 0 # Keys that waited for another caller's work
+
+    def do(self, key: Hashable, work: Callable[[], Any], timeout: float | None = None) -> Any:
+        """ Runs `work()` unless a call for the key is already in flight, in which case its result is returned. """
+        return self.do_many([key], lambda keys: {key: work()}, timeout)[key]
+
+    def do_many(self, keys: Iterable[Hashable], work: Callable[[list], dict], timeout: float | None = None) -> dict:
+        """
+        Runs `work(owned_keys)` once for the keys that aren't already in flight, and waits for the others.
+        `work` returns a dict of key to result; keys it leaves out get None.
+
+        :param timeout: Seconds to wait for other callers' work. TimeoutError is raised if it takes longer.
+        """
+        owned: list[Hashable] = []
+        waiting: dict[Hashable, _Call] = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                call = self._calls.get(key)
+                if call is None:
+                    self._calls[key] = _Call()
+                    owned.append(key)
+                else:
+                    waiting[key] = call
+            self.executed += len(owned)
+            self.shared += len(waiting)
+
+        results: dict = {}
+        if owned:
+            try:
+                produced = work(owned)
+            except BaseException as e:
+                self._finish(owned, {}, e)
+                raise
+            self._finish(owned, produced, None)
+            results.update((key, produced.get(key)) for key in owned)
+
+        for key, call in waiting.items():
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"Timed out waiting for in-flight work on {key!r}.")
+            if call.error is not None:
+                raise call.error
+            results[key] = call.result
+        return results
+
+    def _finish(self, keys: list, produced: dict, error: BaseException | None) -> None:
+        """ Publishes results to waiting callers and lets new calls for the keys start. """
+        with self._lock:
+            calls = [self._calls.pop(key) for key in keys]
+        for key, call in zip(keys, calls):
+            call.result = produced.get(key)
+            call.error = error
+            call.done.set()
+
+    def in_flight(self) -> int:
+        """ Number of keys currently being worked on. """
+        return len(self._calls)
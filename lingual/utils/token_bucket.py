@@ -0,0 +1,73 @@
+"""
+Token bucket rate limiter, for staying within an upstream API's request-rate limit.
+"""
+
+import threading
+import time
+
+class TokenBucket:
+    """
+    Allows `rate` acquisitions per second on average, with bursts of up to `capacity`.
+
+    :param rate: Tokens added per second.
+    :param capacity: Maximum tokens held, i.e. the largest burst. Defaults to one second's worth (at least 1).
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError("Token bucket rate must be positive.")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity # Start full
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        # Counters
+        self.acquired = 0
+        self.waited = 0.0 # Total seconds spent waiting for tokens
+
+    @classmethod
+    def per_minute(cls, requests: float, burst: float | None = None) -> "TokenBucket":
+        """ Bucket for a limit given in requests per minute (as most APIs document it). """
+        return cls(requests / 60, burst)
+
+    def _refill(self) -> None:
+        """ Must be called with the lock held. """
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """ Takes tokens if available right now. Returns False instead of waiting. """
+        with self._lock:
+            self._refill()
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            self.acquired += 1
+            return True
+
+    def acquire(self, tokens: float = 1, timeout: float | None = None) -> float | None:
+        """
+        Takes tokens, waiting until they are available. Returns the seconds waited.
+
+        :param timeout: Longest wait in seconds. Returns None without taking tokens if they won't be available in time.
+        """
+        if tokens > self.capacity:
+            raise ValueError("Cannot acquire more tokens than the bucket holds.")
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.acquired += 1
+                    self.waited += waited
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+                if timeout is not None and waited + delay > timeout:
+                    self.waited += waited
+                    return None # Fail now rather than sleep past the timeout
+            time.sleep(delay) # Sleep outside the lock so other threads can check in
+            waited += delay
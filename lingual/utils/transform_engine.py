@@ -0,0 +1,67 @@
+"""
+Markup rules for the custom lesson markup.
+
+Every markup transformer (links, quizzes, notes, formatting, blocks, spoilers, furigana, ...)
+is described by a `MarkupRule`: a compiled pattern, its replacement and the literal trigger(s)
+every match contains. Lesson processors run the rules in registration order, but return a string
+untouched if it contains none of the trigger characters (most quiz strings). Otherwise every rule runs.
+
+Note: fusing all rules into one alternation regex, scanning lead characters (e.g. the kanji of
+漢字[かんじ]) back from each trigger in Python, and skipping rules whose triggers are absent were all
+measured no faster than one `pattern.sub` per rule on the lesson corpus. CPython's regex engine scans a
+literal-prefixed pattern about as fast as a substring check, so the rules run as separate passes.
+"""
+
+import re
+from typing import Callable, Iterable
+
+Transformer = Callable[[str], str] # Any callable that takes and returns a string
+
+class MarkupRule:
+    """
+    A markup transformer made of a compiled pattern and its replacement.
+
+    Rules are callable (a plain `pattern.sub`), so they can be used anywhere a `str -> str` transformer is expected.
+
+    :param pattern: Compiled regex for the marker.
+    :param repl: Replacement passed to `pattern.sub` (callable or template string).
+    :param triggers: Literal substrings, one of which every match contains (e.g. "::" for ::bold{text}).
+    :param name: Human-readable name, used for debugging and instrumentation.
+    """
+
+    __slots__ = ("pattern", "repl", "triggers", "name")
+
+    def __init__(
+            self,
+            pattern: re.Pattern,
+            repl: Callable[[re.Match], str] | str,
+            triggers: Iterable[str],
+            name: str | None = None
+        ):
+        self.pattern = pattern
+        self.repl = repl
+        self.triggers: tuple[str, ...] = tuple(triggers)
+        self.name: str = name or getattr(repl, "__name__", "rule")
+
+        if not self.triggers:
+            raise ValueError(f"MarkupRule '{self.name}' needs at least one trigger.")
+
+    def __call__(self, text: str) -> str:
+        return self.pattern.sub(self.repl, text)
+
+    def __repr__(self) -> str:
+        return f"MarkupRule({self.name!r}, triggers={self.triggers!r})"
+
+def marker_pattern(transformers: Iterable[Transformer]) -> re.Pattern | None:
+    """
+    Returns a pattern finding any character that starts a trigger of the transformers.
+
+    A string it doesn't find anything in cannot contain markup. None if a transformer isn't a `MarkupRule`,
+    as a plain callable may change any string.
+    """
+    chars: set[str] = set()
+    for transform in transformers:
+        if not isinstance(transform, MarkupRule):
+            return None
+        chars.update(trigger[0] for trigger in transform.triggers)
+    return re.compile(f"[{''.join(re.escape(char) for char in sorted(chars))}]") # Searched in C, stops at the first marker
@@ -0,0 +1,158 @@
+"""
+Shared fixtures. The app is configured from the environment at import time, so every path it
+writes to (databases, indexes, bundles) is pointed at a temporary directory before `lingual` is imported.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlencode, urlparse
+import pytest
+
+TEMP_DIR = Path(tempfile.mkdtemp(prefix="lingual-tests-"))
+
+os.environ.update({
+    "SECRET_KEY": "test",
+    "ALLOW_SEND_EMAILS": "false",
+    "SQLALCHEMY_DATABASE_URI": f"sqlite:///{TEMP_DIR / 'lingual.db'}",
+    "LESSON_INDEX_DIR": str(TEMP_DIR / "index"),
+    "LESSON_BUNDLE_PATH": str(TEMP_DIR / "lessons.bundle.json"), # No bundle, lessons render live
+    "QUIZ_SESSION_DB_PATH": str(TEMP_DIR / "quiz_sessions.db"),
+    "KANJI_DB_PATH": str(TEMP_DIR / "kanji.db"),
+    "WANIKANI_API_KEY": "test", # Never sent: WaniKani calls go to a local stub or are patched out
+    "WANIKANI_API_URL": "http://127.0.0.1:9/v2/subjects", # Nothing listens here
+})
+
+from lingual import create_app
+
+@pytest.fixture(scope="session")
+def app():
+    app = create_app()
+    app.config.update(TESTING=True, LOGIN_DISABLED=True)
+    return app
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+@pytest.fixture()
+def tutorial_processor(tmp_path):
+    """ A tutorial lesson processor reading a copy of the tutorial lessons, so tests can edit them. """
+    import shutil
+    from lingual.modules.tutorial.utils.lessons_processor import TutorialLessonProcessor
+
+    processor = TutorialLessonProcessor()
+    processor.data_root = Path(shutil.copytree(processor.data_root, tmp_path / "lessons"))
+    return processor
+
+@pytest.fixture()
+def kanji_store(tmp_path, monkeypatch):
+    """ An empty kanji store and in-memory cache, replacing the shared ones for the test. """
+    from lingual.modules.nihongo.utils import kanji_processor
+    from lingual.modules.nihongo.utils.kanji_store import KanjiStore
+    from lingual.utils.render_cache import RenderCache
+
+    store = KanjiStore(tmp_path / "kanji.db")
+    monkeypatch.setattr(kanji_processor, "_store", store)
+    monkeypatch.setattr(kanji_processor, "_records", RenderCache(maxsize=kanji_processor.CACHE_SIZE, policy="lru"))
+    return store
+
+class WaniKaniStub:
+    """
+    Local stand-in for the WaniKani subjects endpoint, serving `subjects` (kanji to record) over HTTP.
+
+    Results are paged `page_size` subjects at a time via `next_url`, like WaniKani. Responses queued in
+    `errors` ((status, headers) tuples) are sent first, and every request after the first `fail_after`
+    pages gets `fail_status`. Requests after the first `hold_after` pages wait until `release` is set.
+    `served` lists every kanji sent back, in order.
+    """
+
+    def __init__(self, subjects: dict[str, dict], page_size: int = 100):
+        self.subjects = subjects
+        self.ids = {kanji: 1000 + number for number, kanji in enumerate(subjects)}
+        self.page_size = page_size
+        self.errors: list[tuple[int, dict]] = []
+        self.fail_after: int | None = None
+        self.fail_status = 401
+        self.hold_after: int | None = None
+        self.release = threading.Event()
+        self.requests: list[dict] = [] # Query of every request, including refused ones
+        self.pages = 0 # Pages of subjects sent
+        self.served: list[str] = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v2/subjects"
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                query = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+                status, headers, body = stub.respond(query)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def respond(self, query: dict) -> tuple[int, dict, bytes]:
+        if self.hold_after is not None and self.pages >= self.hold_after:
+            self.release.wait(timeout=5)
+        with self._lock:
+            self.requests.append(query)
+            if self.errors:
+                status, headers = self.errors.pop(0)
+                return status, headers, b"{}"
+            if self.fail_after is not None and self.pages >= self.fail_after:
+                return self.fail_status, {}, b"{}"
+
+            matches = [kanji for kanji in query.get("slugs", "").split(",") if kanji in self.subjects]
+            after = int(query.get("page_after_id", 0))
+            page = [kanji for kanji in matches if self.ids[kanji] > after][:self.page_size]
+            next_url = None
+            if page and page[-1] != matches[-1]:
+                next_url = f"{self.url}?{urlencode({**query, 'page_after_id': self.ids[page[-1]]})}"
+            self.pages += 1
+            self.served.extend(page)
+
+        body = {
+            "data": [{"id": self.ids[kanji], "object": "kanji", "data": self.subjects[kanji]} for kanji in page],
+            "pages": {"next_url": next_url, "per_page": self.page_size},
+        }
+        return 200, {"Content-Type": "application/json"}, json.dumps(body).encode("utf-8")
+
+def kanji_subject(kanji: str, meaning: str = "", **fields) -> dict:
+    """ A WaniKani kanji record, as served by the stub. """
+    return {
+        "characters": kanji, "slug": kanji, "document_url": f"https://www.wanikani.com/kanji/{kanji}",
+        "meanings": [{"meaning": meaning or kanji, "primary": True, "accepted_answer": True}],
+        "readings": [{"reading": "ねこ", "type": "kunyomi", "primary": True, "accepted_answer": True}],
+        **fields,
+    }
+
+@pytest.fixture()
+def wanikani(kanji_store, monkeypatch):
+    """ A WaniKani stub serving a few kanji, with the app's client pointed at it and an empty kanji store. """
+    from lingual.modules.nihongo.utils import kanji_processor
+    from lingual.utils.single_flight import SingleFlight
+
+    stub = WaniKaniStub({kanji: kanji_subject(kanji, meaning) for kanji, meaning in {
+        "猫": "Cat", "犬": "Dog", "鳥": "Bird", "魚": "Fish", "馬": "Horse", "牛": "Cow", "羊": "Sheep",
+    }.items()})
+    monkeypatch.setattr(kanji_processor, "API_URL", stub.url)
+    monkeypatch.setattr(kanji_processor, "_client", None) # A fresh client and circuit breaker
+    monkeypatch.setattr(kanji_processor, "_in_flight", SingleFlight())
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
@@ -0,0 +1,47 @@
+import copy
+import json
+from lingual.modules.nihongo.utils import quiz_utils
+from lingual.modules.nihongo.utils.grammar_lesson_processor import get_processor
+
+def _lessons(app) -> list[str]:
+    with app.test_request_context():
+        return [slug for slug in quiz_utils.get_selected_grammar_lessons() if quiz_utils.load_quiz_data(slug)]
+
+def _ids(quiz_data: dict) -> list[str]:
+    return [question["id"] for question in quiz_data["bank"]]
+
+def test_session_holds_ordered_question_ids(app):
+    lessons = _lessons(app)[:5]
+    with app.test_request_context():
+        session = quiz_utils.sample_grammar_quiz(lessons, 20, seed=42)
+        refs = get_processor().questions.sample(lessons, 20, seed=42)
+    assert set(session) == {"seed", "lessons", "questions"} # No question text or title
+    assert session["questions"] == [ref.id for ref in refs]
+    assert set(session["lessons"]) <= set(lessons)
+
+def test_expanding_keeps_the_session_order(app):
+    lessons = _lessons(app)[:5]
+    with app.test_request_context():
+        session = quiz_utils.sample_grammar_quiz(lessons, 20, seed=42)
+        quiz_data = quiz_utils.expand_grammar_quiz(json.loads(json.dumps(session))) # As read back from a session store
+    assert quiz_data["title"] == "Grammar Quiz" and quiz_data["seed"] == 42
+    assert _ids(quiz_data) == session["questions"]
+    assert {question["source_lesson"] for question in quiz_data["bank"]} <= set(lessons)
+
+def test_editing_a_bank_mid_quiz_does_not_reshuffle_the_session(app, monkeypatch):
+    lessons = _lessons(app)[:5]
+    with app.test_request_context():
+        session = quiz_utils.sample_grammar_quiz(lessons, 20, seed=42)
+        first = quiz_utils.expand_grammar_quiz(session)["bank"][0]
+
+        # Edit the first question's lesson: a new question at the front of its group, and the first question removed
+        processor = get_processor()
+        edited = copy.deepcopy(processor.load_quiz_data(first["source_lesson"]))
+        bank = edited[first["source_group"]]["bank"]
+        bank.insert(0, {"question": "New question"})
+        bank.remove({key: value for key, value in first.items() if key not in ("id", "source_lesson", "source_group")})
+        load_quiz_data = processor.load_quiz_data
+        monkeypatch.setattr(processor, "load_quiz_data", lambda slug: edited if slug == first["source_lesson"] else load_quiz_data(slug))
+
+        quiz_data = quiz_utils.expand_grammar_quiz(session)
+    assert _ids(quiz_data) == session["questions"][1:] # Only the removed question is dropped, nothing else moves
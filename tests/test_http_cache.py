@@ -0,0 +1,50 @@
+import pytest
+from lingual.utils import http_cache
+
+@pytest.fixture()
+def release(monkeypatch):
+    """ Lets a test simulate a deploy by changing the release id. """
+    monkeypatch.setattr(http_cache, "_release_id", "release-1")
+    return lambda value: monkeypatch.setattr(http_cache, "_release_id", value)
+
+def test_make_etag_is_stable_and_distinct():
+    assert http_cache.make_etag("a", 1) == http_cache.make_etag("a", 1)
+    assert http_cache.make_etag("a", 1) != http_cache.make_etag("a1")
+
+def test_file_digest_follows_edits(tmp_path):
+    path = tmp_path / "quiz.json"
+    assert http_cache.file_digest(path) is None
+    path.write_text("1")
+    first = http_cache.file_digest(path)
+    path.write_text("22")
+    assert http_cache.file_digest(path) != first
+
+def test_quiz_endpoint_revalidates_with_304(client, release):
+    response = client.get("/tutorial/lessons/api/quiz/getting-started")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert "public" in response.headers["Cache-Control"]
+
+    cached = client.get("/tutorial/lessons/api/quiz/getting-started", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert cached.data == b""
+
+def test_deploy_invalidates_etags(client, release):
+    etag = client.get("/tutorial/lessons/api/quiz/getting-started").headers["ETag"]
+    release("release-2")
+    response = client.get("/tutorial/lessons/api/quiz/getting-started", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+def test_kanji_etags_include_the_release(client, release):
+    for url in ("/nihongo/kanji/api/一", "/nihongo/kanji/api/batch?kanji=一二", "/nihongo/kanji/api/prescribed"):
+        response = client.get(url)
+        assert response.status_code == 200, url
+        etag = response.headers["ETag"]
+        assert response.headers["Cache-Control"] == f"private, max-age={http_cache.KANJI_MAX_AGE}"
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304, url
+
+        release(f"release-{url}") # New code may render the same records differently
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 200, url
+        release("release-1")
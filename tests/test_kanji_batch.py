@@ -0,0 +1,38 @@
+import json
+from lingual.modules.nihongo.utils import kanji_processor
+from lingual.modules.nihongo.utils.kanji_processor import Kanji
+
+BATCH_URL = "/nihongo/kanji/api/batch"
+
+def test_uncached_kanji_are_fetched_in_one_request(client, wanikani):
+    response = client.post(BATCH_URL, json={"kanji": ["猫", "犬", "鳥", "ゑ"]})
+    assert response.status_code == 200
+    data = response.get_json()["data"]
+    assert list(data) == ["猫", "犬", "鳥"] # ゑ isn't on WaniKani
+    assert data["犬"]["meanings"] == [{"meaning": "Dog", "primary": True}]
+    assert len(wanikani.requests) == 1
+    assert wanikani.requests[0]["slugs"] == "猫,犬,鳥,ゑ" and wanikani.requests[0]["types"] == "kanji"
+
+    # Now cached, and ゑ is remembered as missing
+    assert client.post(BATCH_URL, json={"kanji": ["猫", "犬", "鳥", "ゑ"]}).get_json()["data"].keys() == data.keys()
+    assert len(wanikani.requests) == 1
+
+def test_cached_kanji_are_not_requested(client, wanikani, kanji_store):
+    kanji_store.put("猫", {"characters": "猫", "meanings": []})
+    client.post(BATCH_URL, json={"kanji": ["猫", "犬"]})
+    assert [query["slugs"] for query in wanikani.requests] == ["犬"]
+
+def test_requests_are_chunked_and_paged(wanikani, kanji_store, monkeypatch):
+    monkeypatch.setattr(kanji_processor, "FETCH_BATCH_SIZE", 4)
+    wanikani.page_size = 2
+    fetched = Kanji._fetch_many_kanji_data(list("猫犬鳥魚馬牛羊"))
+    assert list(fetched) == list("猫犬鳥魚馬牛羊")
+    assert [query["slugs"] for query in wanikani.requests] == ["猫,犬,鳥,魚"] * 2 + ["馬,牛,羊"] * 2 # Two pages per chunk
+    assert sorted(wanikani.served) == sorted("猫犬鳥魚馬牛羊") # Nothing served twice
+    assert kanji_store.all_records()["猫"][1] == wanikani.ids["猫"] # Subject IDs are kept
+
+def test_batch_payload_is_validated(client, wanikani):
+    assert client.post(BATCH_URL, json={"kanji": "猫"}).status_code == 400
+    response = client.post(BATCH_URL, data=json.dumps({"kanji": ["猫", 5, "猫"]}), content_type="application/json")
+    assert list(response.get_json()["data"]) == ["猫"]
+    assert len(wanikani.requests) == 1
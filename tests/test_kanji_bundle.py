@@ -0,0 +1,40 @@
+import gzip
+import json
+from lingual.modules.nihongo.utils.kanji_bundle import get_prescribed_bundle
+from lingual.modules.nihongo.utils import kanji_processor
+from lingual.modules.nihongo.utils.kanji_processor import Kanji
+
+BUNDLE_URL = "/nihongo/kanji/api/prescribed"
+
+def _cache_prescribed(store, count: int = 2, meaning: str = "Meaning") -> list[str]:
+    prescribed = [kanji for kanji, _ in Kanji.get_prescribed_kanji()[:count]]
+    store.put_many({kanji: {"characters": kanji, "meanings": [{"meaning": meaning, "primary": True}], "readings": []} for kanji in prescribed})
+    return prescribed
+
+def test_bundle_is_reused_until_a_record_changes(kanji_store):
+    prescribed = _cache_prescribed(kanji_store)
+    bundle = get_prescribed_bundle()
+    assert get_prescribed_bundle() is bundle
+    assert bundle.count == 2
+    assert json.loads(bundle.body)["data"][prescribed[0]]["primary"] == "Meaning"
+    assert gzip.decompress(bundle.gzipped) == bundle.body
+
+    _cache_prescribed(kanji_store, meaning="Changed")
+    kanji_processor._records.clear() # As in a worker that hasn't parsed the records yet
+    rebuilt = get_prescribed_bundle()
+    assert rebuilt.etag != bundle.etag
+    assert json.loads(rebuilt.body)["data"][prescribed[0]]["primary"] == "Changed"
+
+def test_endpoint_revalidates_each_encoding(client, kanji_store):
+    _cache_prescribed(kanji_store)
+    plain = client.get(BUNDLE_URL)
+    zipped = client.get(BUNDLE_URL, headers={"Accept-Encoding": "gzip"})
+    assert plain.status_code == zipped.status_code == 200
+    assert zipped.headers["Content-Encoding"] == "gzip" and "Accept-Encoding" in zipped.headers["Vary"]
+    assert gzip.decompress(zipped.data) == plain.data
+    assert zipped.headers["ETag"] != plain.headers["ETag"]
+
+    for response, headers in ((plain, {}), (zipped, {"Accept-Encoding": "gzip"})):
+        revalidated = client.get(BUNDLE_URL, headers={**headers, "If-None-Match": response.headers["ETag"]})
+        assert revalidated.status_code == 304 and not revalidated.data
+    assert client.get(BUNDLE_URL, headers={"If-None-Match": zipped.headers["ETag"]}).status_code == 200 # Other encoding
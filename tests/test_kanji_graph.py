@@ -0,0 +1,65 @@
+import json
+from lingual.modules.nihongo.utils import kanji_graph
+from lingual.modules.nihongo.utils.kanji_graph import KanjiGraph
+from lingual.modules.nihongo.utils.kanji_processor import Kanji
+
+def _records() -> dict:
+    # Subject IDs: 大 1, 太 2, 犬 3, 天 4; radical 100 is shared by all four, radical 101 by 太 and 犬
+    return {
+        "大": ({"component_subject_ids": [100], "visually_similar_subject_ids": [2, 3], "amalgamation_subject_ids": [500, 501]}, 1),
+        "太": ({"component_subject_ids": [100, 101], "visually_similar_subject_ids": [], "amalgamation_subject_ids": [500]}, 2),
+        "犬": ({"component_subject_ids": [100, 101], "visually_similar_subject_ids": [1]}, 3),
+        "天": ({"component_subject_ids": [100], "visually_similar_subject_ids": [1, 999]}, 4),
+    }
+
+def test_related_kanji_are_ranked():
+    graph = KanjiGraph(_records())
+    assert graph.visually_similar("大") == ["太", "犬", "天"] # Listed by 大, then listing 大
+    assert graph.visually_similar("天") == ["大"] # Unknown subject 999 is skipped
+    assert graph.linking(101, "components") == ["太", "犬"]
+    related = graph.related("太", limit=2)
+    assert related["shared_components"] == ["犬", "大"] # 犬 shares two radicals
+    assert related["shared_vocabulary"] == ["大"]
+    assert graph.related("x") == {"visually_similar": [], "shared_components": [], "shared_vocabulary": []}
+
+def test_similar_kanji_need_subject_ids():
+    records = {kanji: (data, None) for kanji, (data, _) in _records().items()} # As imported from files
+    assert KanjiGraph(records).visually_similar("大") == []
+
+def test_fetched_kanji_link_through_their_subject_ids(wanikani, kanji_store):
+    wanikani.subjects["猫"]["visually_similar_subject_ids"] = [wanikani.ids["犬"]]
+    Kanji.fetch_many(["猫", "犬"])
+    graph = KanjiGraph(kanji_store.all_records())
+    assert graph.visually_similar("猫") == ["犬"] and graph.visually_similar("犬") == ["猫"]
+
+def test_migrated_subjects_keep_their_ids(kanji_store, tmp_path):
+    (tmp_path / "猫.json").write_text(json.dumps({"id": 42, "object": "kanji", "data": {"slug": "猫"}}), encoding="utf-8")
+    (tmp_path / "犬.json").write_text(json.dumps({"slug": "犬"}), encoding="utf-8")
+    assert kanji_store.migrate(tmp_path) == 2
+    assert kanji_store.all_records() == {"犬": ({"slug": "犬"}, None), "猫": ({"slug": "猫"}, 42)}
+    assert kanji_store.subject_ids(["猫", "犬"]) == {"猫": 42}
+
+def test_prefetch_backfills_subject_ids(app, wanikani, kanji_store, tmp_path):
+    kanji_store.put("猫", {"slug": "猫"}) # Imported from a file, no subject ID
+    kanji_store.put_many({"犬": {"slug": "犬"}}, {"犬": wanikani.ids["犬"]})
+    result = app.test_cli_runner().invoke(args=[
+        "kanji", "prefetch", "--no-prescribed", "--kanji", "猫犬", "--rate", "60000",
+        "--api-url", wanikani.url, "--checkpoint", str(tmp_path / "prefetch.json")
+    ])
+    assert result.exit_code == 0, result.output
+    assert "(1 without a subject ID), 1 to fetch" in result.output
+    assert wanikani.served == ["猫"]
+    assert kanji_store.subject_ids(["猫", "犬"]) == {"猫": wanikani.ids["猫"], "犬": wanikani.ids["犬"]}
+
+def test_graph_checks_the_store_at_most_every_interval(kanji_store, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(kanji_graph.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(kanji_graph, "_graph", None)
+    kanji_store.put("猫", {"slug": "猫"})
+    graph = kanji_graph.get_graph()
+    assert "猫" in graph
+
+    kanji_store.put("犬", {"slug": "犬"})
+    assert kanji_graph.get_graph() is graph # Not checked yet
+    now[0] += 10
+    assert "犬" in kanji_graph.get_graph()
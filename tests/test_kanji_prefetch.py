@@ -0,0 +1,49 @@
+import json
+import time
+import pytest
+
+@pytest.fixture()
+def prefetch(app, wanikani, tmp_path):
+    checkpoint = tmp_path / "prefetch.json"
+
+    def run(*args: str):
+        return app.test_cli_runner().invoke(args=[
+            "kanji", "prefetch", "--no-prescribed", "--rate", "60000", "--deadline", "5",
+            "--api-url", wanikani.url, "--checkpoint", str(checkpoint), *args
+        ])
+
+    run.checkpoint = checkpoint
+    return run
+
+def test_prefetch_pages_through_results(prefetch, wanikani, kanji_store):
+    wanikani.page_size = 2
+    result = prefetch("--kanji", "猫犬鳥魚馬")
+    assert result.exit_code == 0, result.output
+    assert kanji_store.characters() == sorted("猫犬鳥魚馬")
+    assert len(wanikani.requests) == 3 # One batch, three pages
+    assert not prefetch.checkpoint.exists() # Finished, nothing to resume
+
+def test_prefetch_waits_out_rate_limits(prefetch, wanikani, kanji_store):
+    wanikani.errors = [(429, {"Retry-After": "0.3"})]
+    start = time.perf_counter()
+    result = prefetch("--kanji", "猫犬")
+    assert result.exit_code == 0, result.output
+    assert time.perf_counter() - start >= 0.3
+    assert len(wanikani.requests) == 2 # Retried once, after the requested wait
+    assert set(kanji_store.characters()) == {"猫", "犬"}
+
+def test_interrupted_prefetch_resumes_without_refetching(prefetch, wanikani, kanji_store):
+    wanikani.fail_after = 1 # The API key stops working after the first batch
+    result = prefetch("--kanji", "猫ゑ犬鳥魚馬", "--batch-size", "2")
+    assert result.exit_code != 0 and "resume" in result.output
+    state = json.loads(prefetch.checkpoint.read_text(encoding="utf-8"))
+    assert state["fetched"] == 1 and state["not_found"] == ["ゑ"]
+    assert kanji_store.characters() == ["猫"]
+
+    wanikani.fail_after = None
+    result = prefetch("--kanji", "猫ゑ犬鳥魚馬", "--batch-size", "2")
+    assert result.exit_code == 0, result.output
+    assert "Resuming: 1 kanji fetched so far." in result.output
+    assert sorted(wanikani.served) == sorted("猫犬鳥魚馬") # Every kanji fetched exactly once
+    assert all("ゑ" not in query["slugs"] for query in wanikani.requests[1:]) # Known misses aren't asked for again
+    assert not prefetch.checkpoint.exists()
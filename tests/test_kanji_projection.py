@@ -0,0 +1,45 @@
+import json
+import pytest
+from lingual.modules.nihongo.utils import kanji_projection
+from lingual.modules.nihongo.utils.kanji_processor import Kanji
+from lingual.modules.nihongo.utils.kanji_projection import DEFAULT_FIELDS, parse_fields, project
+
+RECORD = {
+    "characters": "上", "level": 1, "meaning_mnemonic": "...", "document_url": "https://www.wanikani.com/kanji/上",
+    "meanings": [{"meaning": "Above", "primary": True, "accepted_answer": True}],
+    "readings": [{"reading": "じょう", "type": "onyomi", "primary": True, "accepted_answer": True}],
+}
+
+def test_fields_are_normalised():
+    assert parse_fields("") == parse_fields(None) == tuple(sorted(DEFAULT_FIELDS))
+    assert parse_fields(" level , characters,level") == parse_fields("characters,level") == tuple(sorted({*DEFAULT_FIELDS, "level"}))
+    assert parse_fields("level,all") is None
+    for value in ("Level", "a-b", ",".join(f"f{'x' * n}" for n in range(40))):
+        with pytest.raises(ValueError):
+            parse_fields(value)
+
+def test_projection_trims_records():
+    kanji = Kanji("上", RECORD, "digest-1")
+    projected = project(kanji)
+    assert projected == {
+        "characters": "上", "document_url": RECORD["document_url"],
+        "meanings": [{"meaning": "Above", "primary": True}], "readings": [{"reading": "じょう", "type": "onyomi", "primary": True}],
+    }
+    assert project(kanji) is projected # Built once per record
+    assert project(kanji, parse_fields("level,missing"))["level"] == 1
+    assert project(kanji, None) is RECORD
+    assert project(Kanji("上", {**RECORD, "characters": "x"}, "digest-2"))["characters"] == "x" # New record, new projection
+
+def test_encoding_is_compact():
+    assert kanji_projection.encode({"kanji": "上", "list": [1, 2]}) == '{"kanji":"上","list":[1,2]}'.encode("utf-8")
+
+def test_etags_follow_the_field_set_and_format(client, monkeypatch):
+    def etag(query: str = "") -> str:
+        return client.get(f"/nihongo/kanji/api/一{query}").headers["ETag"]
+
+    default = etag()
+    assert etag("?fields=level,slug") == etag("?fields=slug,,level") # Same fields, same payload
+    assert len({default, etag("?fields=level"), etag("?fields=all")}) == 3
+    monkeypatch.setattr(kanji_projection, "PAYLOAD_FORMAT", kanji_projection.PAYLOAD_FORMAT + 1)
+    assert etag() != default
+    assert json.loads(client.get("/nihongo/kanji/api/batch?kanji=一&fields=all").data)["data"]["一"]["slug"] == "一"
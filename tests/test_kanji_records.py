@@ -0,0 +1,46 @@
+import pytest
+from lingual.modules.nihongo.utils import kanji_processor
+from lingual.modules.nihongo.utils.kanji_processor import Kanji
+from lingual.utils.render_cache import RenderCache
+
+RECORD = {
+    "characters": "上",
+    "meanings": [{"meaning": "Above", "primary": True}, {"meaning": "Up", "primary": False}],
+    "readings": [
+        {"reading": "じょう", "type": "onyomi", "primary": True},
+        {"reading": "うえ", "type": "kunyomi", "primary": False},
+        {"reading": "あ", "type": "kunyomi", "primary": False},
+    ],
+    "stroke_count": 3,
+}
+
+def test_readings_are_split_once():
+    kanji = Kanji("上", RECORD, "digest")
+    assert [reading["reading"] for reading in kanji.kun_readings] == ["うえ", "あ"]
+    assert [reading["reading"] for reading in kanji.on_readings] == ["じょう"]
+    assert kanji.nanori_readings == []
+    assert kanji.get_primary_meaning() == "Above"
+    assert kanji.stroke_count == 3
+
+def test_records_are_slotted_and_immutable():
+    kanji = Kanji("上", RECORD)
+    assert not hasattr(kanji, "__dict__")
+    with pytest.raises(AttributeError):
+        kanji.primary_meaning = "Below" # type: ignore -> Immutable
+
+def test_lookups_share_one_parsed_record(kanji_store):
+    kanji_store.put("上", RECORD)
+    first = Kanji.get_kanji("上")
+    assert Kanji.get_kanji("上") is first
+    assert Kanji.get_cached(["上", "下", ""]) == {"上": first} # Uncached and invalid characters are left out
+    assert Kanji.cache_digests(["上", "下"]) == {"上": first.digest}
+
+def test_least_recently_used_records_are_dropped(kanji_store, monkeypatch):
+    monkeypatch.setattr(kanji_processor, "_records", RenderCache(maxsize=2, policy="lru"))
+    kanji_store.put_many({character: {**RECORD, "characters": character} for character in "一二三"})
+    first = Kanji.get_kanji("一")
+    Kanji.get_kanji("二")
+    assert Kanji.get_kanji("一") is first # Now most recently used
+    Kanji.get_kanji("三") # Drops 二
+    assert "二" not in kanji_processor._records and "一" in kanji_processor._records
+    assert Kanji.get_kanji("二").data == {**RECORD, "characters": "二"} # Read from the store again
@@ -0,0 +1,57 @@
+import logging
+import pytest
+from lingual.modules.nihongo.utils import kanji_processor
+from lingual.modules.nihongo.utils.kanji_processor import Kanji
+from lingual.modules.nihongo.utils.wanikani_client import WaniKaniClient
+from lingual.utils.circuit_breaker import CircuitBreaker
+
+@pytest.fixture()
+def stale(wanikani, kanji_store, monkeypatch):
+    """ A cached 猫 record that is already stale. Background refreshes are recorded instead of run. """
+    kanji_store.put("猫", {"slug": "猫", "meanings": [{"meaning": "Old", "primary": True}]})
+    monkeypatch.setattr(kanji_processor, "REFRESH_AFTER_SECONDS", -1)
+    queued = []
+    monkeypatch.setattr(Kanji, "refresh_later", staticmethod(queued.extend))
+    return queued
+
+def test_stale_records_are_served_while_refreshing(stale, wanikani):
+    assert Kanji.get_kanji("猫").primary_meaning == "Old" # Served straight away
+    assert stale == ["猫"] and wanikani.requests == []
+
+    refreshed = Kanji.refresh(stale)
+    assert refreshed["猫"].primary_meaning == "Cat"
+    assert Kanji.get_kanji("猫") is refreshed["猫"]
+
+def test_failed_refresh_keeps_the_stale_record(stale, wanikani, caplog):
+    wanikani.fail_after, wanikani.fail_status = 0, 503
+    kanji_processor._client = WaniKaniClient("test", max_retries=0)
+    with caplog.at_level(logging.ERROR):
+        assert Kanji.refresh(["猫"]) == {}
+    assert Kanji.get_kanji("猫").primary_meaning == "Old"
+    assert not caplog.records # An outage isn't an error worth logging
+    assert not kanji_processor._refreshing and not kanji_processor.get_store().leased(["猫"])
+
+def test_unexpected_refresh_errors_are_logged(stale, monkeypatch, caplog):
+    def broken(kanji_chars, **options):
+        raise RuntimeError("bug")
+
+    monkeypatch.setattr(Kanji, "_fetch_many_kanji_data", staticmethod(broken))
+    with caplog.at_level(logging.ERROR):
+        assert Kanji.refresh(["猫"]) == {}
+    assert [record.getMessage() for record in caplog.records] == ["Failed to refresh kanji 猫."]
+    assert Kanji.get_kanji("猫").primary_meaning == "Old"
+
+def test_lookups_fail_fast_while_wanikani_is_down(client, wanikani, kanji_store):
+    wanikani.fail_after, wanikani.fail_status = 0, 503
+    kanji_processor._client = WaniKaniClient("test", max_retries=0, breaker=CircuitBreaker(failure_threshold=1))
+    kanji_store.put("犬", {"slug": "犬", "meanings": []})
+
+    assert client.get("/nihongo/kanji/api/猫").status_code == 400 # The failure that opens the circuit
+    assert client.get("/nihongo/kanji/api/鳥").status_code == 503 # Rejected without calling WaniKani
+    assert len(wanikani.requests) == 1
+    assert client.get("/nihongo/kanji/api/犬").status_code == 200 # Cached kanji are still served
+
+def test_unknown_kanji_are_not_asked_for_again(wanikani):
+    assert Kanji.fetch_many(["ゑ"]) == {}
+    assert Kanji.fetch_many(["ゑ"]) == {}
+    assert len(wanikani.requests) == 1
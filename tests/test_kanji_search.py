@@ -0,0 +1,59 @@
+from lingual.modules.nihongo.utils import kanji_search
+from lingual.modules.nihongo.utils.kanji_search import KanjiSearch, kana_to_romaji, normalise
+
+def _entry(kanji: str, meanings: list[tuple[str, bool]], readings: list[tuple[str, str, bool]], auxiliary: list[tuple[str, str]] = ()) -> tuple:
+    data = {
+        "meanings": [{"meaning": meaning, "primary": primary} for meaning, primary in meanings],
+        "readings": [{"reading": reading, "type": kind, "primary": primary} for reading, kind, primary in readings],
+        "auxiliary_meanings": [{"meaning": meaning, "type": kind} for meaning, kind in auxiliary],
+    }
+    return kanji, {"primary": meanings[0][0], "type": "ACTIVE"}, data
+
+def _search() -> KanjiSearch:
+    return KanjiSearch([
+        _entry("一", [("One", True)], [("いち", "onyomi", True), ("ひと", "kunyomi", False)]),
+        _entry("大", [("Big", True), ("Large", False)], [("だい", "onyomi", True), ("おお.きい", "kunyomi", False)]),
+        _entry("人", [("Person", True)], [("じん", "onyomi", True), ("ひと", "kunyomi", False)], [("People", "whitelist"), ("Human", "blacklist")]),
+        _entry("日", [("Sun", True), ("Day", False)], [("にち", "onyomi", True), ("ひ", "kunyomi", False)]),
+        _entry("週", [("Week", True)], [("しゅう", "onyomi", True)]),
+    ])
+
+def _kanji(results: list[dict]) -> list[str]:
+    return [result["kanji"] for result in results]
+
+def test_romaji_and_normalising():
+    assert kana_to_romaji("しゅう") == "shuu" and kana_to_romaji("がっこう") == "gakkou" and kana_to_romaji("チョコ") == "choko"
+    assert normalise(" ＯＮＥ ") == "one" and normalise("オオ.キイ") == "おおきい"
+
+def test_exact_primary_matches_rank_first():
+    search = _search()
+    assert _kanji(search.search("ひと")) == ["一", "人"] # Both secondary readings, ties by character
+    assert _kanji(search.search("ひ"))[0] == "日" # Exact reading over the ひと prefixes
+    assert _kanji(search.search("big")) == ["大"]
+    assert search.search("large")[0]["score"] < search.search("big")[0]["score"]
+
+def test_meanings_readings_and_romaji_are_searchable():
+    search = _search()
+    assert _kanji(search.search("Peo")) == ["人"] # Whitelisted auxiliary meaning, by prefix
+    assert search.search("human") == [] # Blacklisted meanings aren't indexed
+    assert _kanji(search.search("シュウ")) == _kanji(search.search("shuu")) == ["週"]
+    assert _kanji(search.search("ookii")) == ["大"]
+    assert _kanji(search.search("日")) == ["日"] # A pasted kanji
+    assert search.search("") == [] and search.search("xyz") == []
+
+def test_index_checks_for_changes_at_most_every_interval(monkeypatch):
+    now = [1000.0]
+    versions = []
+    monkeypatch.setattr(kanji_search.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr("lingual.modules.nihongo.utils.kanji_bundle.prescribed_version", lambda: versions.append(1) or "v1")
+    monkeypatch.setattr(kanji_search, "_search", KanjiSearch([], version="v1"))
+    monkeypatch.setattr(kanji_search, "_checked", 0.0)
+
+    index = kanji_search.get_search()
+    assert kanji_search.get_search() is index and len(versions) == 1 # Checked once
+    now[0] += 10
+    assert kanji_search.get_search() is index and len(versions) == 2
+
+    monkeypatch.setattr("lingual.modules.nihongo.utils.kanji_bundle.prescribed_version", lambda: "v2")
+    now[0] += 10
+    assert kanji_search.get_search().version == "v2" # Rebuilt
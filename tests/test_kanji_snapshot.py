@@ -0,0 +1,64 @@
+import json
+import pytest
+from lingual.modules.nihongo.utils import kanji_graph, kanji_processor
+from lingual.modules.nihongo.utils.kanji_processor import Kanji
+from lingual.modules.nihongo.utils.kanji_snapshot import (
+    SNAPSHOT_FORMAT, export_snapshot, import_snapshot, load_snapshot, read_snapshot, read_verified_snapshot
+)
+from lingual.modules.nihongo.utils.kanji_store import KanjiStore
+
+@pytest.fixture()
+def exported(kanji_store, tmp_path):
+    kanji_store.put_many({"猫": {"slug": "猫", "visually_similar_subject_ids": [2]}, "犬": {"slug": "犬"}}, {"猫": 1, "犬": 2})
+    path = tmp_path / "kanji.snapshot.json"
+    return path, export_snapshot(kanji_store, path)
+
+@pytest.fixture()
+def offline(exported, monkeypatch):
+    """ Serves kanji from the exported snapshot, as with KANJI_OFFLINE. """
+    monkeypatch.setattr(kanji_processor, "_snapshot", None)
+    monkeypatch.setattr(kanji_graph, "_graph", None)
+    kanji_processor.use_snapshot(load_snapshot(exported[0]))
+    return exported[1]
+
+def test_export_is_deterministic(exported, kanji_store, tmp_path):
+    path, snapshot = exported
+    assert snapshot["format"] == SNAPSHOT_FORMAT and snapshot["kanji"]["猫"]["subject_id"] == 1
+    again = export_snapshot(kanji_store, tmp_path / "again.json")
+    assert again["version"] == snapshot["version"]
+    assert (tmp_path / "again.json").read_bytes() == path.read_bytes()
+
+    kanji_store.put("犬", {"slug": "犬", "level": 1})
+    assert export_snapshot(kanji_store, tmp_path / "changed.json")["version"] != snapshot["version"]
+
+def test_import_writes_only_changed_records(exported, tmp_path):
+    path, snapshot = exported
+    store = KanjiStore(tmp_path / "other.db")
+    store.put("犬", {"slug": "犬"})
+    assert import_snapshot(store, read_verified_snapshot(path)) == 1 # 犬 is identical
+    assert store.all_records()["猫"] == ({"slug": "猫", "visually_similar_subject_ids": [2]}, 1)
+
+def test_modified_or_foreign_snapshots_are_rejected(exported, tmp_path):
+    path, snapshot = exported
+    tampered = json.loads(path.read_text(encoding="utf-8"))
+    tampered["kanji"]["猫"]["data"]["slug"] = "x"
+    path.write_text(json.dumps(tampered), encoding="utf-8")
+    with pytest.raises(ValueError):
+        read_verified_snapshot(path)
+
+    path.write_text(json.dumps({**snapshot, "format": SNAPSHOT_FORMAT + 1}), encoding="utf-8")
+    assert read_snapshot(path) is None and read_snapshot(tmp_path / "missing.json") is None
+
+def test_offline_mode_never_calls_wanikani(offline, wanikani, kanji_store):
+    kanji_store.put("鳥", {"slug": "鳥"}) # In the store but not the snapshot
+    assert Kanji.get_kanji("猫").data["slug"] == "猫"
+    with pytest.raises(Exception):
+        Kanji.get_kanji("鳥")
+    assert set(Kanji.fetch_many(["猫", "犬", "鳥"])) == {"猫", "犬"}
+    assert set(Kanji.get_cached(["猫", "鳥"])) == {"猫"}
+    Kanji.refresh_later(["猫"])
+    assert wanikani.requests == [] and not kanji_processor._refreshing
+
+    graph = kanji_graph.get_graph()
+    assert graph.version == f"snapshot:{offline['version']}"
+    assert graph.visually_similar("猫") == ["犬"]
@@ -0,0 +1,62 @@
+import json
+from lingual.modules.nihongo.utils import kanji_store
+from lingual.modules.nihongo.utils.kanji_store import KanjiStore, encode_record
+
+def _record(character: str, meaning: str = "one") -> dict:
+    return {"characters": character, "slug": character, "meanings": [{"meaning": meaning, "primary": True}]}
+
+def test_put_and_get_many(tmp_path):
+    store = KanjiStore(tmp_path / "kanji.db")
+    digests = store.put_many({"一": _record("一"), "二": _record("二", "two")}, {"一": 440})
+    assert store.get("一") == _record("一")
+    assert store.get_many(["一", "二", "三"]) == {"一": _record("一"), "二": _record("二", "two")}
+    assert store.digests(["一", "三"]) == {"一": digests["一"]} == {"一": encode_record(_record("一"))[1]}
+    assert "一" in store and "三" not in store and len(store) == 2
+    assert store.all_records()["一"] == (_record("一"), 440)
+
+def test_rewrite_changes_digest_and_version_keeps_subject_id(tmp_path):
+    store = KanjiStore(tmp_path / "kanji.db")
+    store.put_many({"一": _record("一")}, {"一": 440})
+    digest, version = store.digests(["一"])["一"], store.version()
+    store.put("一", _record("一", "one!")) # Rewritten without a subject ID
+    assert store.digests(["一"])["一"] != digest
+    assert store.version() != version
+    assert store.all_records()["一"][1] == 440
+
+def test_large_batches_are_chunked(tmp_path, monkeypatch):
+    monkeypatch.setattr(kanji_store, "SQLITE_MAX_VARIABLES", 3)
+    store = KanjiStore(tmp_path / "kanji.db")
+    characters = [chr(0x4E00 + offset) for offset in range(10)]
+    store.put_many({character: _record(character) for character in characters})
+    assert set(store.get_many(characters + ["x"])) == set(characters)
+
+def test_seed_files_are_imported_once(tmp_path):
+    seeds = tmp_path / "seeds"
+    seeds.mkdir()
+    (seeds / "一.json").write_text(json.dumps(_record("一")), encoding="utf-8")
+    (seeds / "prescribed_kanji.json").write_text("{}", encoding="utf-8") # Not a kanji record
+
+    store = KanjiStore(tmp_path / "kanji.db", seed_directory=seeds)
+    assert store.characters() == ["一"]
+    store.put("一", _record("一", "fetched"))
+    assert store.migrate(seeds) == 0 # Stored records win over the files
+    assert store.get("一") == _record("一", "fetched")
+
+def test_leases_are_exclusive_until_released_or_expired(tmp_path):
+    store = KanjiStore(tmp_path / "kanji.db")
+    assert store.acquire_leases(["一", "二"], "a", ttl=60) == ["一", "二"]
+    assert store.acquire_leases(["二", "三"], "b", ttl=60) == ["三"] # 二 is held by a
+    assert store.leased(["一", "二", "三", "四"]) == {"一", "二", "三"}
+
+    store.release_leases(["一", "二"], "a")
+    store.release_leases(["三"], "a") # Not a's lease, kept
+    assert store.leased(["一", "二", "三"]) == {"三"}
+
+    store.acquire_leases(["四"], "a", ttl=-1) # Already expired
+    assert store.acquire_leases(["四"], "b", ttl=60) == ["四"]
+
+def test_not_found_expires(tmp_path):
+    store = KanjiStore(tmp_path / "kanji.db")
+    store.mark_not_found(["ゑ"], ttl=60)
+    store.mark_not_found(["ヰ"], ttl=-1)
+    assert store.not_found(["ゑ", "ヰ", "一"]) == {"ゑ"}
@@ -0,0 +1,52 @@
+import json
+
+BATCH_URL = "/nihongo/kanji/api/batch"
+NDJSON = {"Accept": "application/x-ndjson"}
+
+def _lines(response) -> list[dict]:
+    return [json.loads(line) for line in response.data.decode("utf-8").splitlines()]
+
+def test_cached_kanji_stream_before_fetched_ones(client, wanikani, kanji_store):
+    kanji_store.put("犬", {"characters": "犬", "meanings": []})
+    response = client.post(BATCH_URL, json={"kanji": ["猫", "犬", "ゑ", "犬", "!"]}, headers=NDJSON)
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson" and "Content-Encoding" not in response.headers
+    lines = _lines(response)
+    assert [line.get("kanji") for line in lines] == ["犬", "猫", None] # Deduplicated, cached first
+    assert lines[1]["data"]["meanings"] == [{"meaning": "Cat", "primary": True}]
+    assert lines[-1] == {"status": "done", "missing": ["ゑ", "!"]}
+    assert [query["slugs"] for query in wanikani.requests] == ["猫,ゑ,!"]
+
+def test_plain_json_is_still_the_default(client, wanikani):
+    response = client.get(f"{BATCH_URL}?kanji=猫犬")
+    assert response.mimetype == "application/json"
+    assert list(response.get_json()["data"]) == ["猫", "犬"]
+
+def test_stream_and_json_have_their_own_etags(client, wanikani):
+    client.get(f"{BATCH_URL}?kanji=猫犬") # Caches both
+    plain = client.get(f"{BATCH_URL}?kanji=猫犬")
+    streamed = client.get(f"{BATCH_URL}?kanji=猫犬", headers=NDJSON)
+    assert plain.headers["ETag"] != streamed.headers["ETag"]
+    assert "Accept" in streamed.headers["Vary"]
+    assert client.get(f"{BATCH_URL}?kanji=猫犬", headers={**NDJSON, "If-None-Match": streamed.headers["ETag"]}).status_code == 304
+
+def test_oversized_batches_are_refused(app, client, wanikani, monkeypatch):
+    monkeypatch.setitem(app.config, "KANJI_BATCH_MAX", 3)
+    assert client.post(BATCH_URL, json={"kanji": list("猫犬鳥魚")}).status_code == 413
+    assert client.post(BATCH_URL, json={"kanji": list("猫犬鳥猫犬")}).status_code == 200 # Duplicates don't count
+    assert client.get(f"{BATCH_URL}?kanji=猫犬鳥魚", headers=NDJSON).status_code == 413
+    assert len(wanikani.requests) == 1
+
+def test_fetched_kanji_stream_page_by_page(client, wanikani):
+    wanikani.page_size = 1
+    wanikani.hold_after = 1 # Later pages wait until the first kanji has been streamed
+    response = client.get(f"{BATCH_URL}?kanji=猫犬鳥", headers=NDJSON, buffered=False)
+    chunks = (chunk for chunk in response.response if chunk) # Skips the empty chunk of cached kanji
+    try:
+        assert json.loads(next(chunks))["kanji"] == "猫"
+        assert wanikani.served == ["猫"]
+    finally:
+        wanikani.release.set()
+    lines = [json.loads(line) for chunk in chunks for line in chunk.decode("utf-8").splitlines()]
+    assert [line.get("kanji") for line in lines] == ["犬", "鳥", None]
+    assert wanikani.pages == 3
@@ -0,0 +1,89 @@
+import os
+import pytest
+from lingual.utils import http_cache, lesson_bundle, lesson_processor
+from lingual.utils.lesson_bundle import attach_bundle, build_bundle, read_bundle
+
+@pytest.fixture()
+def bundled(app, tutorial_processor, tmp_path, monkeypatch):
+    """ Builds a bundle of the copied tutorial lessons. Returns the processor and the bundle path. """
+    monkeypatch.setattr(lesson_bundle, "get_lesson_processors", lambda: {"tutorial": tutorial_processor})
+    path = tmp_path / "lessons.bundle.json"
+    with app.test_request_context():
+        build_bundle(path)
+    return tutorial_processor, path
+
+def _count_hashes(monkeypatch) -> list:
+    hashed = []
+    source_hash = lesson_bundle.source_hash
+    monkeypatch.setattr(lesson_bundle, "source_hash", lambda path: hashed.append(path) or source_hash(path))
+    return hashed
+
+def test_attach_trusts_recorded_stamps(app, bundled, monkeypatch):
+    processor, path = bundled
+    hashed = _count_hashes(monkeypatch)
+    with app.app_context():
+        assert attach_bundle(read_bundle(path)) == 0
+    assert hashed == [] # Stamps match, nothing re-hashed
+    assert set(processor.bundle["lessons"]) == {"about-us", "for-developers", "getting-started"}
+
+def test_attach_rehashes_only_changed_stamps(app, bundled, monkeypatch):
+    processor, path = bundled
+    source = processor.data_root / "lessons" / "about-us.md"
+    os.utime(source, ns=(1, 1)) # Same content, new stamp (e.g. a fresh checkout)
+    hashed = _count_hashes(monkeypatch)
+    with app.app_context():
+        assert attach_bundle(read_bundle(path)) == 0
+    assert hashed == [source]
+
+def test_attach_skips_edited_sources(app, bundled):
+    processor, path = bundled
+    source = processor.data_root / "lessons" / "about-us.md"
+    source.write_text(source.read_text(encoding="utf-8") + "\nEdited.\n", encoding="utf-8")
+    with app.app_context():
+        assert attach_bundle(read_bundle(path)) == 1
+    assert "about-us" not in processor.bundle["lessons"]
+    with app.test_request_context():
+        assert "Edited." in processor.load("about-us")["content"] # Rendered live
+
+def test_bundled_lessons_are_served_without_file_io(app, bundled, monkeypatch):
+    processor, path = bundled
+    digests = {kind: processor.source_digest(kind, "getting-started") for kind in ("lessons", "quizzes")} # Hashed from the files
+    assert None not in digests.values()
+    with app.app_context():
+        attach_bundle(read_bundle(path))
+
+    def no_stat(path):
+        raise AssertionError(f"Source stamped while serving from the bundle: {path}")
+    monkeypatch.setattr(lesson_processor, "source_stamp", no_stat)
+    monkeypatch.setattr(http_cache, "source_stamp", no_stat)
+
+    assert {kind: processor.source_digest(kind, "getting-started") for kind in digests} == digests # Same ETags as live
+
+    with app.test_request_context():
+        assert processor.load("getting-started")["content"]
+        assert processor.load_quiz_data("getting-started")
+        assert processor.read_lesson("getting-started").slug == "getting-started"
+
+def test_bundled_meta_equals_live_meta(app, tutorial_processor, tmp_path, monkeypatch):
+    source = tutorial_processor.data_root / "lessons" / "about-us.md"
+    text = source.read_text(encoding="utf-8")
+    source.write_text(text.replace("---\n", "---\nupdated: 2024-05-01\nreviewed: 2024-05-01 12:30:00\nlevel: 2\n", 1), encoding="utf-8")
+    monkeypatch.setattr(lesson_bundle, "get_lesson_processors", lambda: {"tutorial": tutorial_processor})
+    path = tmp_path / "lessons.bundle.json"
+    with app.test_request_context():
+        live = tutorial_processor.render("about-us")["meta"]
+        build_bundle(path)
+        attach_bundle(read_bundle(path))
+        bundled = tutorial_processor.load("about-us")["meta"]
+    assert "about-us" in tutorial_processor.bundle["lessons"]
+    assert bundled == live and type(bundled["updated"]) is type(live["updated"])
+
+def test_rebuild_reuses_unchanged_entries(app, bundled, monkeypatch):
+    processor, path = bundled
+    version = read_bundle(path)["version"]
+    hashed = _count_hashes(monkeypatch)
+    with app.test_request_context():
+        stats = build_bundle(path)
+    assert stats == {"rendered": 0, "reused": 4, "removed": 0}
+    assert hashed == []
+    assert read_bundle(path)["version"] == version
@@ -0,0 +1,67 @@
+import json
+import pytest
+from lingual.utils import lesson_index
+from lingual.utils.lesson_index import LessonIndex
+
+@pytest.fixture()
+def index(app, tutorial_processor, tmp_path):
+    with app.test_request_context():
+        yield LessonIndex(tutorial_processor, path=tmp_path / "index.json", check_interval=0)
+
+def _count_stamps(monkeypatch) -> list:
+    stamped = []
+    source_stamp = lesson_index.source_stamp
+    monkeypatch.setattr(lesson_index, "source_stamp", lambda path: stamped.append(path) or source_stamp(path))
+    return stamped
+
+def _count_parses(processor, monkeypatch) -> list:
+    parsed = []
+    read_lesson = processor.read_lesson
+    monkeypatch.setattr(processor, "read_lesson", lambda slug: parsed.append(slug) or read_lesson(slug))
+    return parsed
+
+def _titles(index: LessonIndex) -> dict[str, list[str]]:
+    return {group["category"]: [lesson.title for lesson in group["lessons"]] for group in index.categories()}
+
+def test_checks_only_parse_changed_lessons(index, tutorial_processor, monkeypatch):
+    assert _titles(index)["getting-started"][0] == "About Lingual HSC"
+    parsed = _count_parses(tutorial_processor, monkeypatch)
+    index.categories()
+    index.get("about-us")
+    assert parsed == [] # Every file is stat-ed, none re-parsed
+
+def test_added_lessons_are_picked_up(index, tutorial_processor):
+    version = index.version
+    root = tutorial_processor.data_root
+    (root / "lessons" / "new-lesson.md").write_text("---\ntitle: New Lesson\nsummary: New.\n---\n\nBody\n", encoding="utf-8")
+    (root / "map.json").write_text(json.dumps({"development": ["for-developers", "new-lesson"]}), encoding="utf-8")
+    assert "New Lesson" in _titles(index)["development"]
+    assert index.version > version
+
+def test_in_place_edits_show_up_after_the_check_interval(app, tutorial_processor, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(lesson_index.time, "monotonic", lambda: now[0])
+    with app.test_request_context():
+        index = LessonIndex(tutorial_processor, check_interval=5)
+        index.categories()
+        source = tutorial_processor.data_root / "lessons" / "about-us.md"
+        source.write_text(source.read_text(encoding="utf-8").replace("title: About Lingual HSC", "title: Edited"), encoding="utf-8")
+        parsed = _count_parses(tutorial_processor, monkeypatch)
+        assert index.get("about-us").title == "About Lingual HSC" # Not checked yet
+        now[0] += 5
+        assert index.get("about-us").title == "Edited"
+        assert parsed == ["about-us"] # Only the edited lesson is re-parsed
+
+def test_bundle_version_replaces_file_checks(index, tutorial_processor, monkeypatch):
+    tutorial_processor.use_bundle({"lessons": {}, "quizzes": {}}, "v1")
+    index.categories()
+    stamped = _count_stamps(monkeypatch)
+    index.categories()
+    assert stamped == []
+
+def test_saved_index_is_reused(index, tutorial_processor, monkeypatch):
+    index.categories()
+    parsed = _count_parses(tutorial_processor, monkeypatch)
+    reloaded = LessonIndex(tutorial_processor, path=index.path, check_interval=0)
+    assert _titles(reloaded) == _titles(index)
+    assert parsed == [] # Every saved entry still matches its file
@@ -0,0 +1,65 @@
+import pytest
+from lingual.utils.lesson_processor import MARKDOWN_EXTENSIONS
+from lingual.utils.lesson_profiler import PROFILER, Histogram, LessonProfiler
+from lingual.utils.markdown_pool import render_markdown
+
+TEXT = "# Title\n\n| a | b |\n|---|---|\n| *1* | 2 |\n\n> quoted **text**\n"
+
+@pytest.fixture()
+def profiling():
+    was_enabled = PROFILER.enabled
+    PROFILER.enabled = True
+    PROFILER.reset()
+    yield PROFILER
+    PROFILER.enabled = was_enabled
+    PROFILER.reset()
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    for micros in (1, 3, 3, 100):
+        histogram.add(micros / 1_000_000, size=10)
+    row = histogram.to_dict()
+    assert row["count"] == 4
+    assert row["mean_size"] == 10
+    assert histogram.percentile(0.5) == pytest.approx(4 / 1_000_000) # Upper bound of the 3µs bucket
+    assert histogram.percentile(1.0) == pytest.approx(100 / 1_000_000)
+
+def test_report_filters_and_sorts_by_total():
+    profiler = LessonProfiler(enabled=True)
+    profiler.record("transform:links", 0.002)
+    profiler.record("transform:notes", 0.001)
+    profiler.record("markdown", 0.010)
+    assert [row["name"] for row in profiler.report("transform:")] == ["transform:links", "transform:notes"]
+
+def test_markdown_is_timed_per_extension():
+    recorded: dict[str, float] = {}
+    html = render_markdown(TEXT, extensions=MARKDOWN_EXTENSIONS, record=lambda name, seconds, size: recorded.update({name: seconds}))
+    assert html == render_markdown(TEXT, extensions=MARKDOWN_EXTENSIONS) # Timing doesn't change the output
+    assert {"markdown:core", "markdown:tables", "markdown:toc"} <= set(recorded)
+    assert "markdown:tables/TableProcessor" in recorded
+    assert recorded["markdown:toc"] == pytest.approx(sum(seconds for name, seconds in recorded.items() if name.startswith("markdown:toc/")))
+
+def test_lesson_render_records_pipeline_stages(app, profiling):
+    from lingual.utils.lesson_bundle import get_lesson_processors
+    processor = get_lesson_processors()["tutorial"]
+    with app.test_request_context():
+        processor.render("getting-started")
+    names = {row["name"] for row in profiling.report()}
+    assert {"lesson:tutorial/getting-started", "markdown", "markdown:core", "transform:links"} <= names
+
+def test_profile_endpoint_is_debug_only(app, client, profiling):
+    assert client.get("/debug/lesson-profile").status_code == 404 # Profiling on, but not in debug mode
+    app.debug = True
+    try:
+        response = client.get("/debug/lesson-profile")
+    finally:
+        app.debug = False
+    assert response.status_code == 200
+    assert "profile" in response.get_json()
+
+def test_processors_are_attributed_to_their_extension():
+    for _ in range(5): # Fresh converters each time (a new callback is a new pool key)
+        recorded: dict[str, float] = {}
+        render_markdown(TEXT, extensions=MARKDOWN_EXTENSIONS, record=lambda name, seconds, size: recorded.update({name: seconds}))
+        assert "markdown:toc/TocTreeprocessor" in recorded
+        assert not any(name.startswith("markdown:core/Toc") for name in recorded)
@@ -0,0 +1,60 @@
+from lingual.utils.lesson_processor import Lesson
+from lingual.utils.lesson_search import LessonSearch, tokenise
+
+def _lesson(slug: str, title: str, summary: str = "", content: str = "", keywords: list[str] | None = None) -> Lesson:
+    return Lesson(slug=slug, title=title, summary=summary, content=content, keywords=keywords or [], query_tags=" ".join(keywords or []))
+
+def _search() -> LessonSearch:
+    return LessonSearch([
+        _lesson("particles", "Particles", "Using は and が", "Particles mark the topic and subject."),
+        _lesson("verbs", "Verb conjugation", "Polite verbs", "食べる becomes 食べます in polite speech.", ["verbs", "masu"]),
+        _lesson("adjectives", "Adjectives", "Describing things", "Verbs are mentioned here once."),
+    ], categories={"verbs": "Grammar"})
+
+def test_tokenise_words_and_bigrams():
+    assert tokenise("Ｖerb <ruby>食べる</ruby>!") == ["verb", "食べ", "べる"]
+    assert tokenise("は") == ["は"]
+
+def test_title_and_keywords_outrank_content():
+    results = _search().search("verbs ")
+    assert [result["slug"] for result in results] == ["verbs", "adjectives"]
+    assert results[0]["score"] > results[1]["score"]
+    assert results[0]["category"] == "Grammar"
+
+def test_every_term_must_match():
+    assert [result["slug"] for result in _search().search("polite verbs ")] == ["verbs"]
+    assert _search().search("polite particles ") == []
+
+def test_last_term_matches_as_prefix_while_typing():
+    assert [result["slug"] for result in _search().search("conj")] == ["verbs"]
+    assert _search().search("conj ") == [] # Finished word, no prefix expansion
+
+def test_kana_and_kanji_match_by_bigram():
+    assert [result["slug"] for result in _search().search("食べます")] == ["verbs"]
+
+def test_inflected_forms_match_on_most_bigrams():
+    search = LessonSearch([
+        _lesson("taberu", "Eating", content="食べます is polite."),
+        _lesson("nomu", "Drinking", content="飲みます is polite."),
+    ])
+    assert [result["slug"] for result in search.search("食べる ")] == ["taberu"] # 食べ matches, べる doesn't
+    assert [result["slug"] for result in search.search("食べました ")] == ["taberu"] # 食べ, べま of 食べ, べま, まし, した
+    assert search.search("飲めない ") == [] # None of 飲め, めな, ない occur
+    assert search.search("食事 ") == [] # Words still all need a match
+
+def test_more_matching_bigrams_rank_higher():
+    search = LessonSearch([
+        _lesson("partial", "Partial", content="食べ物"),
+        _lesson("full", "Full", content="食べる"),
+    ])
+    assert [result["slug"] for result in search.search("食べる ")] == ["full", "partial"]
+
+def test_limit_and_empty_queries():
+    assert len(_search().search("verbs", limit=1)) == 1
+    assert _search().search("") == []
+    assert LessonSearch([]).search("verbs") == []
+
+def test_search_endpoint(client):
+    response = client.get("/nihongo/grammar/api/search?q=particle")
+    assert response.status_code == 200
+    assert response.get_json()["results"]
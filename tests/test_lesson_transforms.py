@@ -0,0 +1,33 @@
+import json
+import re
+from pathlib import Path
+import pytest
+from lingual.utils.lesson_bundle import get_lesson_processors
+from lingual.utils.transform_engine import MarkupRule
+
+# Lesson and quiz texts exercising every markup rule, with the output of the original (pre-MarkupRule) transformers
+GOLDEN = json.loads((Path(__file__).parent / "data" / "transforms.golden.json").read_text(encoding="utf-8"))
+
+@pytest.mark.parametrize("code", ["nihongo", "tutorial"])
+def test_apply_transforms_matches_golden_output(app, code):
+    processor = get_lesson_processors()[code]
+    with app.test_request_context(): # Link transforms use url_for
+        for source, expected in GOLDEN[code]:
+            assert processor.apply_transforms(source) == expected
+
+def test_golden_texts_cover_every_rule():
+    for code, processor in get_lesson_processors().items():
+        for rule in processor.transformers:
+            assert any(rule.pattern.search(source) for source, _ in GOLDEN[code]), f"{code}: {rule.name}"
+
+def test_markers_follow_registrations(app):
+    processor = type(get_lesson_processors()["tutorial"])()
+    assert processor.markers is not None
+    assert processor.apply_transforms("no markup here") == "no markup here"
+
+    processor.add_transform(MarkupRule(re.compile(r"@(\w+)"), r"<b>\1</b>", triggers=("@",), name="at"))
+    assert processor.apply_transforms("hi @there") == "hi <b>there</b>" # New trigger is picked up
+
+    processor.add_transform(str.upper) # Plain callables may change any string
+    assert processor.markers is None
+    assert processor.apply_transforms("no markup here") == "NO MARKUP HERE"
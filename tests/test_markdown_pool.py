@@ -0,0 +1,30 @@
+import threading
+import markdown
+from lingual.utils import markdown_pool
+from lingual.utils.lesson_processor import MARKDOWN_EXTENSIONS
+from lingual.utils.markdown_pool import clear_pool, render_markdown
+
+DOCUMENTS = [
+    "# Title\n\nSome *text* with a footnote[^1].\n\n[^1]: The note.\n",
+    "## Other\n\n| a | b |\n|---|---|\n| 1 | 2 |\n",
+    "# Title\n\n```\ncode\n```\n",
+]
+
+def test_matches_fresh_converters_across_documents():
+    clear_pool()
+    for text in DOCUMENTS * 2: # Footnotes and heading ids must not leak between documents
+        expected = markdown.markdown(text, extensions=MARKDOWN_EXTENSIONS, output_format="html5")
+        assert render_markdown(text, extensions=MARKDOWN_EXTENSIONS, output_format="html5") == expected
+
+def test_converter_is_reused_per_thread():
+    clear_pool()
+    render_markdown("a", extensions=["extra"])
+    converter = markdown_pool._local.converters[(("extra",), "html5", None)]
+    render_markdown("b", extensions=["extra"])
+    assert markdown_pool._local.converters[(("extra",), "html5", None)] is converter
+
+    other: list = []
+    thread = threading.Thread(target=lambda: other.append(render_markdown("c", extensions=["extra"]) and markdown_pool._local.converters))
+    thread.start()
+    thread.join()
+    assert other[0][(("extra",), "html5", None)] is not converter
@@ -0,0 +1,58 @@
+from collections import Counter
+from lingual.utils.question_index import QuestionIndex
+
+class FakeProcessor:
+    """ Serves quiz data from a dict. Replacing a lesson's data hands back a new object, like an edited quiz file. """
+
+    def __init__(self, quizzes: dict[str, dict]):
+        self.quizzes = quizzes
+
+    def load_quiz_data(self, slug: str) -> dict | None:
+        return self.quizzes.get(slug)
+
+def _bank(prefix: str, size: int) -> dict:
+    return {"main": {"title": prefix, "bank": [{"question": f"{prefix} {number}"} for number in range(size)]}}
+
+def _index() -> QuestionIndex:
+    return QuestionIndex(FakeProcessor({"small": _bank("small", 2), "medium": _bank("medium", 10), "large": _bank("large", 50)}))
+
+def test_ids_are_stable_and_unique():
+    index = QuestionIndex(FakeProcessor({"a": {"g": {"bank": [{"q": 1}, {"q": 1}, {"q": 2}]}}}))
+    refs = index.questions("a")
+    assert len({ref.id for ref in refs}) == 3
+    assert refs[1].id == f"{refs[0].id}-1" # Identical questions are numbered
+    assert [ref.id for ref in QuestionIndex(index.processor).questions("a")] == [ref.id for ref in refs]
+    assert index.get(refs[2].id) == refs[2]
+
+def test_seeded_sampling_is_reproducible():
+    lessons = ["small", "medium", "large"]
+    assert _index().sample(lessons, 12, seed=7) == _index().sample(lessons, 12, seed=7)
+    assert _index().sample(lessons, 12, seed=7) != _index().sample(lessons, 12, seed=8)
+
+def test_sampling_is_stratified_and_distinct():
+    picked = _index().sample(["small", "medium", "large"], 14, seed=1)
+    assert len(picked) == len(set(picked)) == 14
+    assert Counter(ref.lesson for ref in picked) == {"small": 2, "medium": 6, "large": 6} # Small bank's leftover share is passed on
+
+def test_sampling_caps_at_available_questions():
+    assert len(_index().sample(["small", "medium"], 100, seed=1)) == 12
+    assert _index().sample(["missing"], 5) == []
+    assert _index().sample(["small"], 0) == []
+
+def test_resolve_returns_the_question():
+    index = _index()
+    ref = index.questions("medium")[3]
+    assert index.resolve(ref) == {"question": "medium 3"}
+
+def test_resolve_rejects_edited_or_moved_questions():
+    index = _index()
+    edited, moved = index.questions("medium")[3], index.questions("medium")[5]
+
+    bank = _bank("medium", 10)
+    bank["main"]["bank"][3] = {"question": "rewritten"}
+    bank["main"]["bank"].insert(0, {"question": "new first question"})
+    index.processor.quizzes["medium"] = bank
+
+    assert index.resolve(edited) is None
+    assert index.resolve(moved) is None # Offset 5 now holds "medium 4"
+    assert index.resolve(index.get(moved.id)) == {"question": "medium 5"} # Re-indexed at its new offset
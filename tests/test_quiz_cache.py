@@ -0,0 +1,28 @@
+import json
+from lingual.utils import render_cache
+
+def test_quiz_banks_are_transformed_once(app, tutorial_processor):
+    with app.test_request_context():
+        first = tutorial_processor.load_quiz_data("getting-started")
+        assert first["intro"]["bank"]
+        assert tutorial_processor.load_quiz_data("getting-started") is first
+        assert tutorial_processor.quiz_cache.stats()["hits"] == 1
+
+def test_edited_quiz_files_are_reloaded_after_the_check_interval(app, tutorial_processor, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(render_cache.time, "monotonic", lambda: now[0])
+    path = tutorial_processor.data_root / "quizzes" / "getting-started.json"
+
+    with app.test_request_context():
+        tutorial_processor.load_quiz_data("getting-started")
+        path.write_text(json.dumps({"edited": {"title": "::bold{Edited}", "bank": []}}), encoding="utf-8")
+        assert "edited" not in tutorial_processor.load_quiz_data("getting-started") # Within QUIZ_CACHE_CHECK_SECONDS
+
+        now[0] += app.config["QUIZ_CACHE_CHECK_SECONDS"] + 1
+        data = tutorial_processor.load_quiz_data("getting-started")
+    assert data == {"edited": {"title": "<strong>Edited</strong>", "bank": []}} # Transformed on load
+
+def test_missing_and_invalid_quizzes(app, tutorial_processor):
+    with app.test_request_context():
+        assert tutorial_processor.load_quiz_data("no-such-lesson") is None
+        assert tutorial_processor.load_quiz_data("../map") is None
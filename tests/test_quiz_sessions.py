@@ -0,0 +1,77 @@
+import pytest
+from lingual.utils import quiz_sessions
+from lingual.utils.quiz_sessions import MemoryQuizSessionStore, QuizSessionStore, SQLiteQuizSessionStore, create_store
+
+@pytest.fixture()
+def clock(monkeypatch):
+    """ Controls both clocks the stores use (monotonic for memory, wall clock for SQLite). """
+    now = [1_000_000.0]
+    monkeypatch.setattr(quiz_sessions.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(quiz_sessions.time, "time", lambda: now[0])
+    return now
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path, clock):
+    def make(**options):
+        if request.param == "memory":
+            return MemoryQuizSessionStore(**options)
+        return SQLiteQuizSessionStore(tmp_path / "sessions.db", **options)
+    return make
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        QuizSessionStore() # type: ignore -> Abstract
+
+def test_put_get_delete(make_store):
+    store = make_store()
+    assert store.get(1) is None
+    store.put(1, {"seed": 5})
+    assert store.get(1) == {"seed": 5}
+    store.put(1, {"seed": 6}) # Replaces
+    assert store.get(1) == {"seed": 6}
+    store.delete(1)
+    assert store.get(1) is None
+    assert store.stats()["hits"] == 2 and store.stats()["misses"] == 2
+
+def test_sessions_expire(make_store, clock):
+    store = make_store(ttl=60)
+    store.put(1, {"seed": 5})
+    clock[0] += 59
+    assert store.get(1) == {"seed": 5}
+    clock[0] += 2
+    assert store.get(1) is None
+    assert len(store) == 0
+
+def test_purge_expired(make_store, clock):
+    store = make_store(ttl=60)
+    store.put(1, {})
+    store.put(2, {})
+    clock[0] += 61
+    assert store.purge_expired() == 2
+    assert store.stats()["expired"] == 2
+
+def test_least_recently_used_sessions_are_dropped(make_store, clock):
+    store = make_store(maxsize=2, purge_interval=0)
+    store.put(1, {})
+    clock[0] += 1
+    store.put(2, {})
+    clock[0] += 1
+    store.get(1) # 2 is now least recently used
+    clock[0] += 1
+    store.put(3, {})
+    assert store.get(2) is None
+    assert store.get(1) == {} and store.get(3) == {}
+    assert store.stats()["evictions"] == 1
+
+def test_sqlite_sessions_are_shared_between_workers(tmp_path, clock):
+    SQLiteQuizSessionStore(tmp_path / "sessions.db").put("7", {"seed": 1})
+    assert SQLiteQuizSessionStore(tmp_path / "sessions.db").get("7") == {"seed": 1}
+
+def test_create_store_from_config(tmp_path):
+    assert isinstance(create_store({}), MemoryQuizSessionStore)
+    store = create_store({"QUIZ_SESSION_BACKEND": "sqlite", "QUIZ_SESSION_DB_PATH": tmp_path / "s.db", "QUIZ_SESSION_MAX": 0})
+    assert isinstance(store, SQLiteQuizSessionStore) and store.maxsize is None
+    with pytest.raises(ValueError):
+        create_store({"QUIZ_SESSION_BACKEND": "redis"})
+    with pytest.raises(ValueError):
+        MemoryQuizSessionStore(ttl=0)
@@ -0,0 +1,87 @@
+import os
+import pytest
+from lingual.utils.render_cache import RenderCache, source_stamp
+
+def _filled(policy: str) -> RenderCache:
+    cache = RenderCache(maxsize=2, policy=policy)
+    cache.put("a", 1, "A")
+    cache.put("b", 1, "B")
+    return cache
+
+def test_lru_evicts_least_recently_used():
+    cache = _filled("lru")
+    assert cache.get("a", 1) == "A" # "b" is now least recently used
+    cache.put("c", 1, "C")
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.evictions == 1
+
+def test_fifo_evicts_oldest_regardless_of_use():
+    cache = _filled("fifo")
+    cache.get("a", 1)
+    cache.put("c", 1, "C")
+    assert "a" not in cache and "b" in cache
+
+def test_fifo_re_put_keeps_insertion_order():
+    cache = _filled("fifo")
+    cache.put("a", 1, "A2") # Re-rendered, still the oldest entry
+    cache.put("c", 1, "C")
+    assert "a" not in cache and "b" in cache and "c" in cache
+
+def test_lfu_evicts_least_used_oldest_first():
+    cache = _filled("lfu")
+    cache.get("a", 1)
+    cache.get("a", 1)
+    cache.put("c", 1, "C")
+    assert "b" not in cache
+    cache.put("d", 1, "D") # "c" (1 use) goes before "a" (3 uses)
+    assert "c" not in cache and "a" in cache
+
+def test_changed_stamp_invalidates():
+    cache = RenderCache(maxsize=4)
+    cache.put("a", (1, 10), "old")
+    assert cache.get("a", (2, 10)) is None
+    assert "a" not in cache
+    assert cache.stats()["invalidations"] == 1
+
+def test_get_or_render_renders_once_per_stamp():
+    cache = RenderCache(maxsize=4)
+    renders = []
+    render = lambda: renders.append(1) or len(renders)
+    assert cache.get_or_render("a", 1, render) == 1
+    assert cache.get_or_render("a", 1, render) == 1
+    assert cache.get_or_render("a", 2, render) == 2
+    assert cache.stats()["hits"] == 1
+
+def test_zero_size_disables_caching():
+    cache = RenderCache(maxsize=0)
+    cache.put("a", 1, "A")
+    assert len(cache) == 0
+
+def test_invalid_configuration():
+    with pytest.raises(ValueError):
+        RenderCache(policy="random")
+    with pytest.raises(ValueError):
+        RenderCache(maxsize=-1)
+
+def test_get_or_render_file_revalidates_after_interval(tmp_path, monkeypatch):
+    from lingual.utils import render_cache
+
+    path = tmp_path / "quiz.json"
+    path.write_text("1")
+    now = [100.0]
+    monkeypatch.setattr(render_cache.time, "monotonic", lambda: now[0])
+    cache = RenderCache(maxsize=4, revalidate_after=2.0)
+    render = lambda stamp: path.read_text()
+
+    assert cache.get_or_render_file("quiz", path, render) == "1"
+    path.write_text("22")
+    assert cache.get_or_render_file("quiz", path, render) == "1" # Trusted within the interval
+    now[0] += 2.5
+    assert cache.get_or_render_file("quiz", path, render) == "22"
+
+def test_source_stamp(tmp_path):
+    path = tmp_path / "lesson.md"
+    assert source_stamp(path) is None
+    path.write_text("abc")
+    os.utime(path, ns=(5, 5))
+    assert source_stamp(path) == (5, 3)
@@ -0,0 +1,88 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from lingual.modules.nihongo.utils.kanji_processor import Kanji
+from lingual.utils.single_flight import SingleFlight
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        first = pool.submit(flight.do, "key", work)
+        started.wait(5)
+        others = [pool.submit(flight.do, "key", work) for _ in range(3)]
+        time.sleep(0.05) # Let the others start waiting
+        release.set()
+        assert {future.result() for future in [first, *others]} == {"result"}
+    assert len(calls) == 1 and flight.executed == 1 and flight.shared == 3
+    assert flight.in_flight() == 0
+
+def test_do_many_only_runs_keys_not_in_flight():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    owned = []
+
+    def slow(keys):
+        owned.append(keys)
+        started.set()
+        release.wait(5)
+        return {key: key.upper() for key in keys}
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(flight.do_many, ["a", "b"], slow)
+        started.wait(5)
+        second = pool.submit(flight.do_many, ["b", "c"], lambda keys: owned.append(keys) or {"c": "C"})
+        time.sleep(0.05)
+        release.set()
+        assert second.result() == {"b": "B", "c": "C"}
+        assert first.result() == {"a": "A", "b": "B"}
+    assert owned == [["a", "b"], ["c"]]
+
+def test_errors_reach_every_waiter_and_timeouts_are_raised():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise ValueError("upstream")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        first = pool.submit(flight.do, "key", failing)
+        started.wait(5)
+        with pytest.raises(TimeoutError):
+            flight.do("key", failing, timeout=0.05)
+        waiter = pool.submit(flight.do, "key", failing)
+        time.sleep(0.05)
+        release.set()
+        for future in (first, waiter):
+            with pytest.raises(ValueError):
+                future.result()
+    assert flight.in_flight() == 0 # A failed call doesn't block later ones
+
+def test_concurrent_misses_fetch_once(wanikani):
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: Kanji.get_kanji("猫"), range(8)))
+    assert {record.data["slug"] for record in results} == {"猫"}
+    assert wanikani.served == ["猫"]
+
+def test_kanji_leased_by_another_worker_is_waited_for(wanikani, kanji_store):
+    kanji_store.acquire_leases(["犬"], "other-worker", ttl=5)
+
+    def other_worker():
+        kanji_store.put("犬", {"characters": "犬", "slug": "犬", "meanings": []})
+        kanji_store.release_leases(["犬"], "other-worker")
+
+    threading.Timer(0.1, other_worker).start()
+    fetched = Kanji.fetch_many(["犬", "猫"])
+    assert fetched["犬"].data["meanings"] == [] # The other worker's record
+    assert wanikani.served == ["猫"]
@@ -0,0 +1,101 @@
+import threading
+import time
+import pytest
+from lingual.modules.nihongo.utils.wanikani_client import WaniKaniClient, WaniKaniError, WaniKaniUnavailable, retry_after_seconds
+from lingual.utils import circuit_breaker
+from lingual.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from lingual.utils.token_bucket import TokenBucket
+
+@pytest.fixture()
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_success() # Resets the count
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+    assert breaker.trips == 1 and breaker.rejected == 1
+
+    clock[0] += 10
+    assert breaker.retry_after() == 20
+
+def test_breaker_lets_one_trial_call_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 30
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() and not breaker.allow() # Only the trial call
+    breaker.record_failure() # Trial failed, open again
+    assert breaker.state == OPEN and breaker.trips == 2
+
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+def test_late_failures_dont_extend_an_open_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 20
+    breaker.record_failure() # A call made before the breaker opened
+    assert breaker.retry_after() == 10 and breaker.trips == 1
+    clock[0] += 10
+    assert breaker.state == HALF_OPEN
+
+def test_retry_after_header():
+    assert retry_after_seconds("2") == 2.0
+    assert retry_after_seconds("soon") is None and retry_after_seconds(None) is None
+
+def test_transient_failures_are_retried(wanikani):
+    wanikani.errors = [(503, {}), (429, {"Retry-After": "0"})]
+    client = WaniKaniClient("test", backoff=0.01)
+    assert client.get(wanikani.url, params={"slugs": "猫"})["data"][0]["data"]["slug"] == "猫"
+    assert client.stats()["retries"] == 2 and client.stats()["statuses"] == {503: 1, 429: 1, 200: 1}
+
+def test_refused_requests_fail_without_tripping_the_breaker(wanikani):
+    wanikani.fail_after, wanikani.fail_status = 0, 404
+    client = WaniKaniClient("test", breaker=CircuitBreaker(failure_threshold=1))
+    with pytest.raises(WaniKaniError) as error:
+        client.get(wanikani.url)
+    assert error.value.status == 404 and len(wanikani.requests) == 1 # Not retried
+    assert client.breaker.state == CLOSED
+
+def test_open_breaker_fails_fast(wanikani):
+    wanikani.fail_after, wanikani.fail_status = 0, 503
+    client = WaniKaniClient("test", max_retries=0, breaker=CircuitBreaker(failure_threshold=1))
+    with pytest.raises(WaniKaniError):
+        client.get(wanikani.url)
+    with pytest.raises(WaniKaniUnavailable) as error:
+        client.get(wanikani.url)
+    assert error.value.retry_after > 0
+    assert len(wanikani.requests) == 1 # WaniKani wasn't called again
+
+def test_busy_client_waits_for_a_slot_within_the_deadline(wanikani):
+    client = WaniKaniClient("test", max_concurrent=1)
+    client._slots.acquire() # A call in progress
+    threading.Timer(0.1, client._slots.release).start()
+    assert client.get(wanikani.url, params={"slugs": "猫"}, deadline=5)["data"] # Waited for the slot
+
+    client._slots.acquire()
+    start = time.perf_counter()
+    with pytest.raises(WaniKaniUnavailable):
+        client.get(wanikani.url, deadline=0.2)
+    assert 0.2 <= time.perf_counter() - start < 1
+    assert client.stats()["rejected"] == 1 and len(wanikani.requests) == 1
+    client._slots.release()
+
+def test_rate_limit_wait_stays_within_the_deadline(wanikani):
+    client = WaniKaniClient("test")
+    limiter = TokenBucket(rate=0.1, capacity=1) # Next token in 10 seconds
+    assert client.get(wanikani.url, params={"slugs": "猫"}, limiter=limiter)["data"]
+    start = time.perf_counter()
+    with pytest.raises(WaniKaniError, match="deadline"):
+        client.get(wanikani.url, deadline=0.5, limiter=limiter)
+    assert time.perf_counter() - start < 0.5 # Failed without waiting for the token
+    assert len(wanikani.requests) == 1